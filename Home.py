@@ -1,9 +1,7 @@
 import streamlit as st
 import pandas as pd
-from utils.data_utils import get_dataset_files, get_dataset_rankings
-from utils.file_utils import format_file_types
-from utils.ui_utils import create_action_cell, apply_custom_css, create_ranking_selector, toggle_theme
-from migrate_data import main as migrate_main
+from utils.data_utils import ensure_database, query_datasets, count_datasets, get_file_types, get_org_stats
+from utils.ui_utils import apply_custom_css, create_dataset_table, create_resource_preview, toggle_theme
 
 # ตั้งค่าหน้าเว็บ
 st.set_page_config(
@@ -12,61 +10,18 @@ st.set_page_config(
     layout="wide"
 )
 
+# เตรียมฐานข้อมูลครั้งแรกของ process (migrate จาก JSON หรือสร้างข้อมูลตัวอย่าง)
+ensure_database()
+
 # ใส่ CSS
 apply_custom_css()
 
-# ฟังก์ชันสำหรับการ filter ข้อมูล
-@st.cache_data(ttl=3600)
-def get_dataset_ranking(package_id):
-    """ดึง ranking สูงสุดของชุดข้อมูล"""
-    try:
-        files = get_dataset_files(package_id)
-        if not files:
-            return 0
-        return max((f.get('ranking', 0) for f in files), default=0)
-    except Exception:
-        return 0
-
-@st.cache_data(ttl=3600)
-def filter_by_ranking(df, ranking_value):
-    """กรองข้อมูลตาม ranking"""
-    filtered = df.copy()
-    
-    # ดึง rankings ทั้งหมดในครั้งเดียว
-    package_ids = filtered['package_id'].tolist()
-    rankings = get_dataset_rankings(package_ids)
-    
-    # กรองข้อมูลตาม ranking
-    filtered['max_ranking'] = filtered['package_id'].map(rankings)
-    result = filtered[filtered['max_ranking'] == ranking_value].drop('max_ranking', axis=1)
-    return result
-
-@st.cache_data(ttl=3600)
-def get_unique_file_types(df):
-    """รวบรวมประเภทไฟล์ที่มีทั้งหมด"""
-    if df is None or 'file_types' not in df.columns:
-        return []
-    all_file_types = []
-    for types in df['file_types'].dropna():
-        all_file_types.extend([t.strip() for t in types.split(',')])
-    return sorted(list(set(all_file_types)))
-
-@st.cache_resource
-def initialize_data():
-    """โหลดและตรวจสอบข้อมูล"""
-    try:
-        success, message, df = migrate_main(silent=True)
-        if not success or df is None or df.empty:
-            st.error(f"ไม่สามารถโหลดข้อมูลได้: {message}")
-            st.stop()
-        return df
-    except Exception as e:
-        st.error(f"เกิดข้อผิดพลาดในการโหลดข้อมูล: {str(e)}")
-        st.stop()
-
-# โหลดข้อมูล
-with st.spinner("🔄 กำลังโหลดข้อมูล..."):
-    df = initialize_data()
+# ยอดรวมของแต่ละหน่วยงานจากตารางสรุป (อัพเดทพร้อมการเขียนข้อมูล ไม่ต้องคำนวณจาก catalog ทุก rerun)
+org_summary = pd.DataFrame(
+    get_org_stats(),
+    columns=['organization', 'dataset_count', 'resource_count']
+)
+org_names = sorted(org_summary['organization'].tolist())
 
 # หัวข้อหลัก
 st.title("⭐⭐⭐⭐ ข้อมูลเปิดภาครัฐคุณภาพสูง")
@@ -75,15 +30,11 @@ st.markdown("---")
 # แสดงภาพรวมข้อมูล
 col1, col2, col3 = st.columns(3)
 with col1:
-    st.metric("จำนวนชุดข้อมูลคุณภาพสูง", len(df))
+    st.metric("จำนวนชุดข้อมูลคุณภาพสูง", int(org_summary['dataset_count'].sum()))
 with col2:
-    # ตรวจสอบคอลัมน์ก่อนใช้งาน
-    if 'organization' in df.columns:
-        st.metric("จำนวนหน่วยงาน", df['organization'].nunique())
-    else:
-        st.error("ไม่พบคอลัมน์ 'organization' ในข้อมูล")
+    st.metric("จำนวนหน่วยงาน", len(org_names))
 with col3:
-    total_resources = df['resource_count'].sum()
+    total_resources = int(org_summary['resource_count'].sum())
     st.metric("จำนวนทรัพยากรทั้งหมด", total_resources)
 
 # ฟิลเตอร์ข้อมูล
@@ -91,11 +42,11 @@ st.subheader("🔍 ค้นหาและกรองข้อมูล")
 col1, col2, col3, col4, col5, col6 = st.columns(6)
 
 with col1:
-    search_term = st.text_input("ค้นหาจากชื่อชุดข้อมูล", "")
+    search_term = st.text_input("ค้นหาชุดข้อมูล", "", help="ค้นหาจากชื่อชุดข้อมูล หน่วยงาน และชื่อ/คำอธิบายไฟล์")
 with col2:
     selected_org = st.selectbox(
         "กรองตามหน่วยงาน",
-        ["ทั้งหมด"] + sorted(df['organization'].unique().tolist())
+        ["ทั้งหมด"] + org_names
     )
 with col3:
     # เพิ่มตัวกรองประเภทองค์กร
@@ -106,14 +57,14 @@ with col3:
     )
 with col4:
     # เพิ่มตัวกรองจังหวัด
-    provinces = ["ทั้งหมด"] + sorted([p for p in df['organization'].unique() if "จังหวัด" in p])
+    provinces = ["ทั้งหมด"] + [p for p in org_names if "จังหวัด" in p]
     selected_province = st.selectbox(
         "จังหวัด",
         provinces
     )
 with col5:
     # สร้างรายการประเภทไฟล์ทั้งหมดที่มี
-    unique_file_types = get_unique_file_types(df)
+    unique_file_types = get_file_types()
     
     selected_file_type = st.selectbox(
         "กรองตามประเภทไฟล์",
@@ -128,34 +79,21 @@ with col6:
         help="กรองข้อมูลตามระดับคุณภาพ"
     )
 
-# กรองข้อมูล
-filtered_df = df.copy()
-if search_term:
-    filtered_df = filtered_df[filtered_df['title'].str.contains(search_term, case=False, na=False)]
-if selected_org != "ทั้งหมด":
-    filtered_df = filtered_df[filtered_df['organization'] == selected_org]
-if selected_org_type != "ทั้งหมด":
-    filtered_df = filtered_df[filtered_df['organization'].str.contains(selected_org_type, case=False, na=False)]
-if selected_province != "ทั้งหมด":
-    filtered_df = filtered_df[filtered_df['organization'] == selected_province]
-if selected_file_type != "ทั้งหมด":
-    filtered_df = filtered_df[filtered_df['file_types'].str.contains(selected_file_type, case=False, na=False)]
-
-# กรองตาม ranking
-if ranking_filter != "ทั้งหมด":
-    ranking_value = len(ranking_filter)  # นับจำนวนดาว
-    filtered_df = filter_by_ranking(filtered_df, ranking_value)
+# เก็บตัวกรองไว้สำหรับสร้าง SQL query (ค่า None คือไม่กรอง)
+filters = {
+    'search': search_term or None,
+    'organization': selected_org if selected_org != "ทั้งหมด" else None,
+    'org_type': selected_org_type if selected_org_type != "ทั้งหมด" else None,
+    'province': selected_province if selected_province != "ทั้งหมด" else None,
+    'file_type': selected_file_type if selected_file_type != "ทั้งหมด" else None,
+    'ranking': len(ranking_filter) if ranking_filter != "ทั้งหมด" else None  # นับจำนวนดาว
+}
 
 # แสดงผลข้อมูลในรูปแบบตาราง
 st.subheader("📊 สรุปข้อมูลตามหน่วยงาน")
 
-# สร้างตารางสรุปข้อมูลหน่วยงาน
-org_summary = df.groupby('organization').agg({
-    'title': 'count',
-    'resource_count': 'sum'
-}).reset_index()
+# สร้างตารางสรุปข้อมูลหน่วยงาน (เรียงตามจำนวนชุดข้อมูลจากตารางสรุป)
 org_summary.columns = ['หน่วยงาน', 'จำนวนชุดข้อมูล', 'จำนวนทรัพยากร']
-org_summary = org_summary.sort_values('จำนวนชุดข้อมูล', ascending=False)
 
 # แสดงตารางสรุปหน่วยงาน
 edited_df = st.data_editor(
@@ -209,7 +147,7 @@ if selected_org_detail != "ทั้งหมด":
     st.subheader(f"📋 รายการข้อมูลของ {selected_org_detail}")
     
     # กรองข้อมูลเฉพาะหน่วยงานที่เลือก
-    org_data = filtered_df[filtered_df['organization'] == selected_org_detail].copy()
+    org_data = query_datasets({**filters, 'organization': selected_org_detail})
     
     # แสดงข้อมูลในรูปแบบตาราง
     st.dataframe(
@@ -223,7 +161,7 @@ if selected_org_detail != "ทั้งหมด":
         hide_index=True,
         use_container_width=True
     )
-
+    
     # เพิ่มลิงค์ไปยังหน้า organization_data
     st.link_button(
         "🔗 ดูข้อมูลเพิ่มเติม",
@@ -234,18 +172,42 @@ if selected_org_detail != "ทั้งหมด":
 
 st.markdown("---")
 
+# Initialize session state
+if 'sort_column' not in st.session_state:
+    st.session_state.sort_column = None
+if 'sort_ascending' not in st.session_state:
+    st.session_state.sort_ascending = True
+
+# คอลัมน์ที่ใช้เรียงลำดับ (ชื่อที่แสดง -> คอลัมน์ในฐานข้อมูล)
+sort_columns = {
+    'จำนวนทรัพยากร': 'resource_count',
+    'ประเภทไฟล์': 'file_types',
+    'ปรับปรุงล่าสุด': 'last_updated'
+}
+
+# จัดการการเรียงลำดับ (เรียกก่อน rerun เพื่อให้ query ใช้ลำดับใหม่ทั้งชุดข้อมูล)
+def toggle_sort(column):
+    if st.session_state.sort_column == column:
+        st.session_state.sort_ascending = not st.session_state.sort_ascending
+    else:
+        st.session_state.sort_column = column
+        st.session_state.sort_ascending = True
+
+# นับจำนวนรายการที่ตรงกับตัวกรอง
+total_rows = count_datasets(filters)
+
 # แสดงรายการชุดข้อมูล
-st.subheader(f"รายการชุดข้อมูล ({len(filtered_df)} รายการ)")
+st.subheader(f"รายการชุดข้อมูล ({total_rows} รายการ)")
 
 # กำหนดจำนวนรายการต่อหน้า
 rows_per_page = st.select_slider(
     "จำนวนรายการต่อหน้า",
-    options=[10, 20, 50, 100],
+    options=[10, 20, 50, 100, 200, 500],
     value=20
 )
 
 # คำนวณจำนวนหน้าทั้งหมด
-total_pages = len(filtered_df) // rows_per_page + (1 if len(filtered_df) % rows_per_page > 0 else 0)
+total_pages = total_rows // rows_per_page + (1 if total_rows % rows_per_page > 0 else 0)
 
 # เลือกหน้าที่ต้องการแสดง
 if total_pages > 0:
@@ -258,105 +220,43 @@ if total_pages > 0:
 else:
     page_number = 1
 
-# คำนวณ index เริ่มต้นและสิ้นสุดของข้อมูลที่จะแสดง
+# ดึงเฉพาะข้อมูลของหน้าที่แสดง (กรอง เรียงลำดับ และแบ่งหน้าใน SQL)
 start_idx = (page_number - 1) * rows_per_page
-end_idx = min(start_idx + rows_per_page, len(filtered_df))
-
-# เตรียมข้อมูลสำหรับแสดงในตาราง
-display_df = filtered_df.iloc[start_idx:end_idx].copy()
-
-# เปลี่ยนชื่อคอลัมน์ (เก็บ package_id และ url ไว้)
-new_column_names = {
-    'title': 'ชื่อชุดข้อมูล',
-    'organization': 'หน่วยงาน',
-    'resource_count': 'จำนวนทรัพยากร',
-    'file_types': 'ประเภทไฟล์',
-    'last_updated': 'ปรับปรุงล่าสุด',
-    'package_id': 'package_id',
-    'url': 'url'
-}
-display_df = display_df.rename(columns=new_column_names)
-
-# อัพเดทการแสดงผลประเภทไฟล์
-display_df['ประเภทไฟล์'] = display_df.apply(format_file_types, axis=1)
-
-# Initialize session state
-if 'sort_column' not in st.session_state:
-    st.session_state.sort_column = None
-if 'sort_ascending' not in st.session_state:
-    st.session_state.sort_ascending = True
-
-# จัดการการเรียงลำดับ
-def toggle_sort(column):
-    if st.session_state.sort_column == column:
-        st.session_state.sort_ascending = not st.session_state.sort_ascending
-    else:
-        st.session_state.sort_column = column
-        st.session_state.sort_ascending = True
-    
-    if column:
-        display_df.sort_values(by=column, ascending=st.session_state.sort_ascending, inplace=True)
-
-# แสดงส่วนหัวของตาราง
-st.markdown("""
-<div style="display: flex; margin-bottom: 10px; font-weight: bold; background-color: rgba(128, 128, 128, 0.6); color: white; padding: 12px;">
-    <div style="flex: 3">ชื่อชุดข้อมูล</div>
-    <div style="flex: 2">หน่วยงาน</div>
-    <div style="flex: 1">จำนวนทรัพยากร</div>
-    <div style="flex: 2">ประเภทไฟล์</div>
-    <div style="flex: 1">ปรับปรุงล่าสุด</div>
-    <div style="flex: 1">⭐</div>
-    <div style="flex: 1">Action</div>
-</div>
-""", unsafe_allow_html=True)
-
-# สร้างปุ่มสำหรับ sort
-sort_cols = st.columns([3, 2, 1, 2, 1, 1, 1])
-
-# ปุ่ม sort สำหรับจำนวนทรัพยากร
-with sort_cols[2]:
-    if st.button("🔄", key="sort_resources", help="เรียงลำดับตามจำนวนทรัพยากร"):
-        toggle_sort('จำนวนทรัพยากร')
-
-# ปุ่ม sort สำหรับประเภทไฟล์
-with sort_cols[3]:
-    if st.button("🔄", key="sort_filetypes", help="เรียงลำดับตามประเภทไฟล์"):
-        toggle_sort('ประเภทไฟล์')
-
-# ปุ่ม sort สำหรับวันที่ปรับปรุง
-with sort_cols[4]:
-    if st.button("🔄", key="sort_date", help="เรียงลำดับตามวันที่ปรับปรุง"):
-        toggle_sort('ปรับปรุงล่าสุด')
+display_df = query_datasets(
+    filters,
+    sort_column=sort_columns.get(st.session_state.sort_column),
+    ascending=st.session_state.sort_ascending,
+    limit=rows_per_page,
+    offset=start_idx
+)
+end_idx = start_idx + len(display_df)
+
+# ปุ่มเรียงลำดับทั้งชุดข้อมูล (หัวตารางเรียงได้เฉพาะข้อมูลในหน้าที่แสดง)
+sort_cols = st.columns(len(sort_columns))
+for sort_col, column in zip(sort_cols, sort_columns):
+    with sort_col:
+        st.button(
+            f"🔄 {column}",
+            key=f"sort_{sort_columns[column]}",
+            help=f"เรียงลำดับตาม{column}",
+            on_click=toggle_sort,
+            args=(column,),
+            use_container_width=True
+        )
 
 # แสดงทิศทางการเรียงลำดับปัจจุบัน
 if st.session_state.sort_column:
     direction = "น้อยไปมาก ⬆️" if st.session_state.sort_ascending else "มากไปน้อย ⬇️"
     st.caption(f"เรียงตาม {st.session_state.sort_column} ({direction})")
 
-# แสดงข้อมูลในรูปแบบตาราง
-for _, row in display_df.iterrows():
-    with st.container():
-        cols = st.columns([3, 2, 1, 2, 1, 1, 1])
-        with cols[0]:
-            st.markdown(f"""<div style="white-space: normal;">{row['ชื่อชุดข้อมูล']}</div>""", unsafe_allow_html=True)
-        with cols[1]:
-            st.markdown(f"""<div style="white-space: normal;">{row['หน่วยงาน']}</div>""", unsafe_allow_html=True)
-        with cols[2]:
-            st.markdown(f"""<div style="text-align: center;">{row['จำนวนทรัพยากร']}</div>""", unsafe_allow_html=True)
-        with cols[3]:
-            st.markdown(row['ประเภทไฟล์'], unsafe_allow_html=True)
-        with cols[4]:
-            st.markdown(f"""<div style="white-space: nowrap;">{row['ปรับปรุงล่าสุด'][:10]}</div>""", unsafe_allow_html=True)
-        with cols[5]:
-            create_ranking_selector(row)
-        with cols[6]:
-            create_action_cell({
-                'package_id': row['package_id'],
-                'url': row['url']
-            })
+# แสดงข้อมูลทั้งหน้าเป็นตารางเดียว (แก้ไข ranking และกด Load ได้ในตาราง)
+create_dataset_table(display_df, key="home_datasets")
 
 # แสดงข้อความบอกจำนวนรายการที่กำลังแสดง
-st.caption(f"กำลังแสดงรายการที่ {start_idx + 1} ถึง {end_idx} จากทั้งหมด {len(filtered_df)} รายการ")
+st.caption(f"กำลังแสดงรายการที่ {start_idx + 1} ถึง {end_idx} จากทั้งหมด {total_rows} รายการ")
+
+# ตัวอย่างข้อมูลในไฟล์ของชุดข้อมูลในหน้านี้
+create_resource_preview(display_df, key="home_datasets")
 
 # Footer
 st.markdown("---")
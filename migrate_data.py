@@ -110,9 +110,8 @@ def main(silent=False):
     try:
         # 1. ถ้ามี SQLite และมีข้อมูล ใช้ข้อมูลจาก SQLite
         if db_exists:
-            datasets = db.get_datasets()
-            if datasets:
-                df = pd.DataFrame(datasets)
+            df = db.get_datasets_frame()
+            if not df.empty:
                 return True, "✅ โหลดข้อมูลจาก SQLite สำเร็จ", df
         
         # 2. ถ้ามีไฟล์ JSON ให้ migrate ข้อมูล
@@ -120,9 +119,8 @@ def main(silent=False):
             if not silent:
                 print("🔄 กำลัง migrate ข้อมูลจาก JSON...")
             if db.migrate_from_json():
-                datasets = db.get_datasets()
-                if datasets:
-                    df = pd.DataFrame(datasets)
+                df = db.get_datasets_frame()
+                if not df.empty:
                     return True, "✅ Migrate ข้อมูลจาก JSON สำเร็จ", df
         
         # 3. ถ้าไม่มีทั้ง SQLite และ JSON ให้สร้างข้อมูลตัวอย่าง
@@ -1,8 +1,13 @@
 import streamlit as st
 import pandas as pd
-from utils.data_utils import db, update_dataset
+from utils.data_utils import db, ensure_database, CKAN_API_URL, get_resource_health_summary, get_broken_resources, query_datasets, get_dataset_files, get_dataset_rankings, update_rankings
+from utils.jobs import submit_job, get_jobs
+from utils.resource_cache import get_resource_cache
+from utils.http_cache import get_http_cache
+from utils.ckan_client import get_ckan_client
+from utils.db_utils import count_json_records
 from utils.auth import check_user, login_page
-from utils.ui_utils import toggle_theme
+from utils.ui_utils import toggle_theme, RANKING_OPTIONS, RANKING_LABELS
 import os
 import json
 
@@ -13,6 +18,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# เตรียมฐานข้อมูลครั้งแรกของ process (migrate จาก JSON หรือสร้างข้อมูลตัวอย่าง)
+ensure_database()
+
 # แสดงปุ่มสลับ theme
 toggle_theme()
 
@@ -46,22 +54,16 @@ json_files = {
 
 if all(os.path.exists(path) for path in json_files.values()):
     try:
-        with open(json_files['datasets'], 'r', encoding='utf-8') as f:
-            datasets = json.load(f)
-            comparison_data['ชุดข้อมูล'][0] = len(datasets)
-        with open(json_files['resources'], 'r', encoding='utf-8') as f:
-            resources = json.load(f)
-            comparison_data['ทรัพยากร'][0] = len(resources)
+        comparison_data['ชุดข้อมูล'][0] = count_json_records(json_files['datasets'])
+        comparison_data['ทรัพยากร'][0] = count_json_records(json_files['resources'])
     except Exception as e:
         st.warning(f"ไม่สามารถอ่านไฟล์ JSON: {str(e)}")
 
 # นับจำนวนข้อมูลจาก SQLite
 if os.path.exists('data/database.sqlite'):
     try:
-        cursor = db.conn.execute("SELECT COUNT(*) FROM datasets")
-        comparison_data['ชุดข้อมูล'][1] = cursor.fetchone()[0]
-        cursor = db.conn.execute("SELECT COUNT(*) FROM resources")
-        comparison_data['ทรัพยากร'][1] = cursor.fetchone()[0]
+        comparison_data['ชุดข้อมูล'][1] = db.count_rows('datasets')
+        comparison_data['ทรัพยากร'][1] = db.count_rows('resources')
     except Exception as e:
         st.warning(f"ไม่สามารถอ่านข้อมูลจาก SQLite: {str(e)}")
 
@@ -91,14 +93,31 @@ with col2:
 with col3:
     # จำนวนข้อมูลในฐานข้อมูล
     if db_exists:
-        cursor = db.conn.execute("SELECT COUNT(*) FROM datasets")
-        dataset_count = cursor.fetchone()[0]
-        cursor = db.conn.execute("SELECT COUNT(*) FROM resources")
-        resource_count = cursor.fetchone()[0]
+        dataset_count = db.count_rows('datasets')
+        resource_count = db.count_rows('resources')
         st.metric("จำนวนข้อมูล", f"{dataset_count} ชุดข้อมูล, {resource_count} ทรัพยากร")
     else:
         st.metric("จำนวนข้อมูล", "ไม่สามารถนับได้")
 
+# แสดงสถานะ connection pool ของฐานข้อมูล
+st.write("#### 🔌 การเชื่อมต่อฐานข้อมูล")
+pool_stats = db.pool_stats()
+
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("Connection อ่านที่ใช้งานอยู่", f"{pool_stats['readers_in_use']}/{pool_stats['max_readers']}")
+with col2:
+    st.metric("Connection อ่านที่ว่าง", pool_stats['readers_idle'])
+with col3:
+    reader_wait = pool_stats['reader_wait_ms'] / pool_stats['reader_waits'] if pool_stats['reader_waits'] else 0
+    st.metric("การรอ connection อ่าน", pool_stats['reader_waits'], help=f"เฉลี่ย {reader_wait:.1f} ms ต่อครั้ง")
+with col4:
+    writer_wait = pool_stats['writer_wait_ms'] / pool_stats['writer_waits'] if pool_stats['writer_waits'] else 0
+    st.metric("การรอ connection เขียน", pool_stats['writer_waits'], help=f"เฉลี่ย {writer_wait:.1f} ms ต่อครั้ง")
+
+with st.expander("รายละเอียด connection pool"):
+    st.json(pool_stats)
+
 # การจัดการข้อมูล
 st.subheader("🔄 การจัดการข้อมูล")
 
@@ -117,8 +136,9 @@ with col2:
         if st.warning("⚠️ การล้างฐานข้อมูลจะลบข้อมูลทั้งหมด คุณแน่ใจหรือไม่?"):
             try:
                 db.close()  # ปิดการเชื่อมต่อก่อน
-                if os.path.exists('data/database.sqlite'):
-                    os.remove('data/database.sqlite')
+                for path in ('data/database.sqlite', 'data/database.sqlite-wal', 'data/database.sqlite-shm'):
+                    if os.path.exists(path):
+                        os.remove(path)
                 st.success("ล้างฐานข้อมูลสำเร็จ")
                 st.info("กรุณารีโหลดหน้าเว็บเพื่อสร้างฐานข้อมูลใหม่")
             except Exception as e:
@@ -135,9 +155,7 @@ table = st.selectbox(
 
 if db_exists:
     # ดึงข้อมูลจากตารางที่เลือก
-    cursor = db.conn.execute(f"SELECT * FROM {table}")
-    columns = [description[0] for description in cursor.description]
-    data = cursor.fetchall()
+    columns, data = db.get_table(table)
     
     # แสดงข้อมูลในรูปแบบตาราง
     df = pd.DataFrame(data, columns=columns)
@@ -154,8 +172,7 @@ st.subheader("🔄 อัพเดทข้อมูลรายการ")
 
 # ดึง package_id ทั้งหมด
 if db_exists:
-    cursor = db.conn.execute("SELECT package_id, title FROM datasets")
-    datasets = {row[0]: row[1] for row in cursor.fetchall()}
+    datasets = db.get_dataset_titles()
     
     # เลือก dataset ที่ต้องการอัพเดท
     selected_id = st.selectbox(
@@ -165,14 +182,343 @@ if db_exists:
     )
     
     if st.button("🔄 อัพเดทข้อมูล", use_container_width=True):
-        result = update_dataset(selected_id)
-        if "✅" in result:
-            st.success(result)
+        job_id = submit_job('refresh_dataset', {'package_id': selected_id})
+        st.toast(f"🕒 เพิ่มงานอัพเดทข้อมูล #{job_id} เข้าคิวแล้ว")
+else:
+    st.warning("ไม่พบฐานข้อมูล")
+
+# อัพเดทข้อมูลหลายรายการพร้อมกัน
+st.subheader("🚚 อัพเดทข้อมูลหลายรายการพร้อมกัน")
+
+if db_exists:
+    bulk_ids = st.multiselect(
+        "เลือกชุดข้อมูล (เว้นว่างเพื่ออัพเดททั้งหมด)",
+        options=list(datasets.keys()),
+        format_func=lambda x: f"{x} - {datasets[x]}"
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        max_workers = st.slider("จำนวนการเชื่อมต่อพร้อมกัน", min_value=1, max_value=32, value=8)
+    with col2:
+        batch_size = st.slider("จำนวนชุดข้อมูลต่อการบันทึก", min_value=10, max_value=500, value=50, step=10)
+    
+    if st.button("🚚 อัพเดทข้อมูลหลายรายการ", use_container_width=True):
+        target_ids = bulk_ids or list(datasets.keys())
+        job_id = submit_job('harvest', {
+            'package_ids': target_ids,
+            'max_workers': max_workers,
+            'batch_size': batch_size
+        })
+        st.toast(f"🕒 เพิ่มงานอัพเดท {len(target_ids)} ชุดข้อมูล (#{job_id}) เข้าคิวแล้ว")
+else:
+    st.warning("ไม่พบฐานข้อมูล")
+
+# ซิงค์เฉพาะข้อมูลที่เปลี่ยนแปลง
+st.subheader("🔁 ซิงค์ข้อมูลที่เปลี่ยนแปลง")
+
+watermark = db.get_sync_watermark(CKAN_API_URL)
+st.caption(f"แหล่งข้อมูล: {CKAN_API_URL} | ซิงค์ล่าสุดถึง: {watermark or 'ยังไม่เคยซิงค์'}")
+
+col1, col2 = st.columns(2)
+with col1:
+    run_sync = st.button("🔁 ซิงค์ข้อมูลที่เปลี่ยนแปลง", use_container_width=True)
+with col2:
+    run_full_sync = st.button("📥 ซิงค์ข้อมูลทั้งหมด", use_container_width=True, type="secondary")
+
+if run_sync or run_full_sync:
+    job_id = submit_job('sync', {'full': run_full_sync})
+    st.toast(f"🕒 เพิ่มงานซิงค์ข้อมูล #{job_id} เข้าคิวแล้ว")
+
+# ตรวจสอบลิงก์ของไฟล์
+st.subheader("🩺 ตรวจสอบลิงก์ของไฟล์")
+
+health = get_resource_health_summary()
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("ตรวจสอบแล้ว", f"{health['checked']}/{health['total']}")
+with col2:
+    st.metric("ใช้งานได้", health['ok'])
+with col3:
+    st.metric("ลิงก์เสีย", health['broken'])
+with col4:
+    st.metric("เวลาตอบสนองเฉลี่ย", f"{health['avg_latency_ms']:.0f} ms")
+st.caption(f"ตรวจสอบล่าสุด: {health['last_checked'] or 'ยังไม่เคยตรวจสอบ'} (UTC)")
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    probe_limit = st.number_input("จำนวนลิงก์ต่อรอบ (0 = ทั้งหมด)", min_value=0, value=0, step=100)
+with col2:
+    probe_workers = st.slider("จำนวนการตรวจสอบพร้อมกัน", min_value=1, max_value=64, value=16)
+with col3:
+    probe_per_host = st.slider("จำนวนการเชื่อมต่อพร้อมกันต่อเว็บไซต์", min_value=1, max_value=16, value=4)
+
+if st.button("🩺 ตรวจสอบลิงก์", use_container_width=True):
+    job_id = submit_job('probe_urls', {
+        'limit': int(probe_limit) or None,
+        'max_workers': probe_workers,
+        'per_host': probe_per_host
+    })
+    st.toast(f"🕒 เพิ่มงานตรวจสอบลิงก์ #{job_id} เข้าคิวแล้ว")
+
+if health['broken']:
+    with st.expander(f"ลิงก์เสีย ({health['broken']} รายการ)"):
+        st.dataframe(
+            pd.DataFrame(get_broken_resources(limit=500)),
+            column_config={
+                'url': st.column_config.LinkColumn("URL"),
+                'status_code': st.column_config.NumberColumn("สถานะ HTTP", format="%d")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+
+# แก้ไข ranking หลายรายการ
+st.subheader("✏️ แก้ไข ranking หลายรายการ")
+st.caption("แก้ไข ranking ในตารางแล้วกดบันทึก การแก้ไขทั้งหมดจะถูกบันทึกพร้อมกันใน transaction เดียว")
+
+if db_exists:
+    edit_mode = st.radio("แก้ไขระดับ", ["ชุดข้อมูล", "ไฟล์ในชุดข้อมูล"], horizontal=True)
+    ranking_column = st.column_config.SelectboxColumn("Ranking", options=list(RANKING_OPTIONS), required=True)
+    
+    if edit_mode == "ชุดข้อมูล":
+        col1, col2 = st.columns(2)
+        with col1:
+            edit_search = st.text_input("ค้นหาชุดข้อมูล", key="ranking_edit_search")
+        with col2:
+            edit_organization = st.text_input("หน่วยงาน", key="ranking_edit_organization")
+        edit_datasets = query_datasets(
+            {'search': edit_search, 'organization': edit_organization},
+            sort_column='title',
+            limit=500
+        )
+        edit_ids = edit_datasets['package_id'].tolist()
+        rankings = get_dataset_rankings(edit_ids)
+        edit_table = pd.DataFrame({
+            'id': edit_ids,
+            'name': edit_datasets['title'].tolist(),
+            'ranking': [RANKING_LABELS.get(rankings.get(package_id) or 0, "ไม่มี") for package_id in edit_ids]
+        })
+        id_key = 'dataset_id'
+        st.caption(f"แสดง {len(edit_ids)} ชุดข้อมูลแรก การตั้ง ranking ของชุดข้อมูลจะตั้งให้ทุกไฟล์ในชุดข้อมูล")
+    else:
+        edit_dataset_id = st.selectbox(
+            "เลือกชุดข้อมูล",
+            options=list(datasets.keys()),
+            format_func=lambda x: f"{x} - {datasets[x]}",
+            key="ranking_edit_dataset"
+        )
+        files = get_dataset_files(edit_dataset_id) if edit_dataset_id else []
+        edit_table = pd.DataFrame({
+            'id': [file['id'] for file in files],
+            'name': [f"{file['file_name'] or '-'} ({file['format'] or '-'})" for file in files],
+            'ranking': [RANKING_LABELS.get(file['ranking'] or 0, "ไม่มี") for file in files]
+        })
+        id_key = 'resource_id'
+    
+    with st.form("ranking_bulk_edit"):
+        edited = st.data_editor(
+            edit_table,
+            column_config={
+                'id': None,
+                'name': st.column_config.TextColumn("ชื่อ", disabled=True),
+                'ranking': ranking_column
+            },
+            hide_index=True,
+            use_container_width=True,
+            key=f"ranking_bulk_editor_{id_key}"
+        )
+        submitted = st.form_submit_button("💾 บันทึก ranking", use_container_width=True)
+    
+    if submitted:
+        changed = edited['ranking'] != edit_table['ranking']
+        edits = [
+            {id_key: row_id, 'ranking': RANKING_OPTIONS[label]}
+            for row_id, label in zip(edited.loc[changed, 'id'], edited.loc[changed, 'ranking'])
+        ]
+        if not edits:
+            st.info("ไม่มี ranking ที่เปลี่ยนแปลง")
         else:
-            st.error(result)
+            try:
+                result = update_rankings(edits)
+                st.success(f"✅ บันทึก ranking {result['datasets']} ชุดข้อมูล {result['resources']} ไฟล์สำเร็จ")
+            except Exception as e:
+                st.error(f"❌ ไม่สามารถบันทึก ranking ได้: {str(e)}")
 else:
     st.warning("ไม่พบฐานข้อมูล")
 
+# ranking อัตโนมัติ
+st.subheader("⭐ คำนวณ ranking อัตโนมัติ")
+st.caption(
+    "คำนวณ ranking ของทุกไฟล์จากประเภทไฟล์ ลิงก์ใช้งานได้หรือไม่ ความใหม่ของข้อมูล และความครบถ้วนของ metadata "
+    "(ไม่เปลี่ยน ranking ที่กำหนดเอง)"
+)
+
+col1, col2 = st.columns(2)
+with col1:
+    if st.button("⭐ คำนวณ ranking อัตโนมัติ", use_container_width=True):
+        job_id = submit_job('rank_resources')
+        st.toast(f"🕒 เพิ่มงานคำนวณ ranking #{job_id} เข้าคิวแล้ว")
+with col2:
+    if st.button("🔍 ทดลองคำนวณ (ไม่บันทึก)", use_container_width=True, type="secondary"):
+        job_id = submit_job('rank_resources', {'dry_run': True})
+        st.toast(f"🕒 เพิ่มงานทดลองคำนวณ ranking #{job_id} เข้าคิวแล้ว")
+
+# cache ของไฟล์ที่ดาวน์โหลด
+st.subheader("💾 Cache ไฟล์ที่ดาวน์โหลด")
+
+resource_cache = get_resource_cache()
+cache_stats = resource_cache.stats()
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("อัตราการใช้ cache", f"{cache_stats['hit_rate']:.0%}", help=f"hit {cache_stats['hits']} / miss {cache_stats['misses']}")
+with col2:
+    st.metric("ไฟล์ใน cache", f"{cache_stats['files']} ไฟล์", help=f"{cache_stats['urls']} URL")
+with col3:
+    st.metric(
+        "ขนาด cache",
+        f"{cache_stats['size_bytes'] / 1024 / 1024:,.1f} MB",
+        help=f"สูงสุด {cache_stats['max_bytes'] / 1024 / 1024:,.0f} MB"
+    )
+with col4:
+    st.metric(
+        "ข้อมูลที่ไม่ต้องดาวน์โหลดซ้ำ",
+        f"{cache_stats['bytes_served'] / 1024 / 1024:,.1f} MB",
+        help=f"ดาวน์โหลดแล้ว {cache_stats['bytes_downloaded'] / 1024 / 1024:,.1f} MB"
+    )
+
+with st.expander("รายละเอียด cache"):
+    st.json(cache_stats)
+
+if st.button("🗑️ ล้าง cache ไฟล์", use_container_width=True, type="secondary"):
+    resource_cache.clear()
+    st.toast("ล้าง cache ไฟล์แล้ว")
+
+# cache ของ response จาก CKAN API
+st.subheader("🗄️ Cache ของ CKAN API")
+
+http_cache = get_http_cache()
+http_stats = http_cache.stats()
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric(
+        "อัตราการใช้ cache",
+        f"{http_stats['hit_rate']:.0%}",
+        help=f"hit {http_stats['hits']} (ตรวจสอบแล้วได้ 304 {http_stats['revalidations']}) / miss {http_stats['misses']}"
+    )
+with col2:
+    st.metric("response ใน cache", http_stats['responses'], help=f"ใช้ได้ทันที {http_stats['ttl']:.0f} วินาทีหลังตรวจสอบ")
+with col3:
+    st.metric(
+        "ขนาด cache",
+        f"{http_stats['size_bytes'] / 1024 / 1024:,.1f} MB",
+        help=f"สูงสุด {http_stats['max_bytes'] / 1024 / 1024:,.0f} MB (ลบไปแล้ว {http_stats['evictions']} รายการ)"
+    )
+with col4:
+    st.metric(
+        "ข้อมูลที่ไม่ต้องดาวน์โหลดซ้ำ",
+        f"{http_stats['bytes_served'] / 1024 / 1024:,.1f} MB",
+        help=f"ดาวน์โหลดแล้ว {http_stats['bytes_downloaded'] / 1024 / 1024:,.1f} MB"
+    )
+
+if st.button("🗑️ ล้าง cache ของ API", use_container_width=True, type="secondary"):
+    http_cache.clear()
+    st.toast("ล้าง cache ของ API แล้ว")
+
+# สถานะการเชื่อมต่อ CKAN API (ของ process นี้)
+st.subheader("🌐 การเชื่อมต่อ CKAN API")
+
+client_stats = get_ckan_client(CKAN_API_URL).stats()
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("อัตรา request ปัจจุบัน", f"{client_stats['rate']:.1f}/วินาที", help=f"ปรับเพิ่มได้ถึง {client_stats['max_rate']:.0f}/วินาที")
+with col2:
+    st.metric("request ทั้งหมด", client_stats['requests'], help=f"ลองใหม่ {client_stats['retries']} ครั้ง")
+with col3:
+    st.metric("ถูกจำกัดอัตรา (429)", client_stats['throttled'])
+with col4:
+    st.metric("ผิดพลาด", client_stats['errors'], help=f"ถูกปฏิเสธเพราะวงจรเปิด {client_stats['rejected']} ครั้ง")
+
+for host, circuit in client_stats['circuits'].items():
+    if circuit['state'] != 'closed':
+        st.warning(f"⚡ วงจรของ {host} อยู่ในสถานะ {circuit['state']} (ผิดพลาดติดต่อกัน {circuit['failures']} ครั้ง)")
+
+if client_stats['latency']:
+    with st.expander("เวลาตอบสนองของแต่ละ action"):
+        for action, latency in client_stats['latency'].items():
+            st.write(
+                f"**{action}** ({latency['count']} ครั้ง) เฉลี่ย {latency['avg_ms']:.0f} ms | "
+                f"p50 ≤ {latency['p50_ms']} ms | p95 ≤ {latency['p95_ms']} ms | p99 ≤ {latency['p99_ms']} ms"
+            )
+            st.bar_chart(pd.Series(latency['buckets'], name="จำนวน request"))
+
+# สถานะงานเบื้องหลัง (อัพเดทเฉพาะส่วนนี้ทุก 2 วินาที)
+st.subheader("🕒 งานเบื้องหลัง")
+
+JOB_KIND_LABELS = {
+    'refresh_dataset': "อัพเดทข้อมูล",
+    'harvest': "อัพเดทหลายรายการ",
+    'sync': "ซิงค์ข้อมูล",
+    'probe_urls': "ตรวจสอบลิงก์",
+    'rank_resources': "คำนวณ ranking อัตโนมัติ"
+}
+JOB_STATUS_LABELS = {
+    'queued': "🕒 รอคิว",
+    'running': "🔄 กำลังทำงาน",
+    'done': "✅ เสร็จสิ้น",
+    'failed': "❌ ผิดพลาด"
+}
+
+@st.fragment(run_every=2)
+def show_jobs():
+    """แสดงงานล่าสุดพร้อมความคืบหน้า"""
+    jobs = get_jobs(limit=20)
+    if not jobs:
+        st.info("ยังไม่มีงานเบื้องหลัง")
+        return
+    
+    active = sum(1 for job in jobs if job['status'] in ('queued', 'running'))
+    st.caption(f"งานที่กำลังรอหรือทำงานอยู่: {active} งาน")
+    
+    jobs_df = pd.DataFrame([
+        {
+            'id': job['id'],
+            'kind': JOB_KIND_LABELS.get(job['kind'], job['kind']),
+            'status': JOB_STATUS_LABELS.get(job['status'], job['status']),
+            'progress': job['progress'],
+            'message': job['message'] or '',
+            'created_at': job['created_at'],
+            'finished_at': job['finished_at'] or ''
+        }
+        for job in jobs
+    ])
+    st.dataframe(
+        jobs_df,
+        column_config={
+            'id': st.column_config.NumberColumn("งาน", format="#%d", width="small"),
+            'kind': st.column_config.TextColumn("ประเภท"),
+            'status': st.column_config.TextColumn("สถานะ"),
+            'progress': st.column_config.ProgressColumn("ความคืบหน้า", min_value=0, max_value=1),
+            'message': st.column_config.TextColumn("ข้อความ", width="large"),
+            'created_at': st.column_config.TextColumn("สร้างเมื่อ (UTC)"),
+            'finished_at': st.column_config.TextColumn("เสร็จเมื่อ (UTC)")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    # ผลลัพธ์ของงานที่เสร็จแล้ว
+    finished = [job for job in jobs if job['result']]
+    if finished:
+        with st.expander("ผลลัพธ์ของงาน"):
+            job = st.selectbox(
+                "เลือกงาน",
+                finished,
+                format_func=lambda job: f"#{job['id']} {JOB_KIND_LABELS.get(job['kind'], job['kind'])}"
+            )
+            st.json(job['result'])
+
+show_jobs()
+
 # Footer
 st.markdown("---")
 st.caption("⚠️ หน้านี้สำหรับผู้ดูแลระบบเท่านั้น") 
\ No newline at end of file
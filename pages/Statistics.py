@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from utils.ui_utils import toggle_theme
-from migrate_data import main as migrate_main
+from utils.data_utils import ensure_database, get_format_counts, get_org_stats, get_ranking_counts
 
 st.set_page_config(
     page_title="สถิติ | ข้อมูลเปิดภาครัฐ",
@@ -10,23 +10,19 @@ st.set_page_config(
     layout="wide"
 )
 
-# โหลดข้อมูล
-with st.spinner("🔄 กำลังโหลดข้อมูล..."):
-    success, message, df = migrate_main(silent=True)
-    if not success or df is None or df.empty:
-        st.error(f"ไม่สามารถโหลดข้อมูลได้: {message}")
-        st.stop()
+# เตรียมฐานข้อมูลครั้งแรกของ process (ตารางสรุปว่างจนกว่าจะมีข้อมูล)
+ensure_database()
 
 col1, col2 = st.columns(2)
 
 with col1:
     # กราฟแสดงหน่วยงานที่มีข้อมูลมากที่สุด
-    org_counts = df['organization'].value_counts().head(10)
+    org_stats = get_org_stats(limit=10)
     
-    # สร้าง DataFrame สำหรับ plotly
+    # สร้าง DataFrame สำหรับ plotly (อ่านจากตารางสรุปของหน่วยงาน)
     org_df = pd.DataFrame({
-        'หน่วยงาน': org_counts.index,
-        'จำนวนชุดข้อมูล': org_counts.values
+        'หน่วยงาน': [row['organization'] for row in org_stats],
+        'จำนวนชุดข้อมูล': [row['dataset_count'] for row in org_stats]
     })
     
     # สร้าง bar chart ด้วย plotly
@@ -51,13 +47,16 @@ with col1:
     st.plotly_chart(fig, use_container_width=True)
 
 with col2:
-    # กราฟแสดงประเภทไฟล์ที่พบบ่อย
-    file_types = []
-    for types in df['file_types']:
-        if types:
-            file_types.extend([t.strip() for t in types.split(',')])
-    
-    file_type_counts = pd.Series(file_types).value_counts().head(10)
+    # กราฟแสดงประเภทไฟล์ที่พบบ่อย (นับจากตาราง dataset_formats)
+    file_type_counts = pd.Series(get_format_counts()).head(10)
     st.bar_chart(file_type_counts)
     st.caption("10 ประเภทไฟล์ที่พบมากที่สุด")
-    
\ No newline at end of file
+    
+
+# กราฟแสดงจำนวนชุดข้อมูลตาม ranking
+ranking_counts = get_ranking_counts()
+ranking_series = pd.Series(
+    {'⭐' * ranking if ranking else 'ยังไม่จัดอันดับ': count for ranking, count in ranking_counts.items()}
+)
+st.bar_chart(ranking_series)
+st.caption("จำนวนชุดข้อมูลตาม ranking")
@@ -0,0 +1,15 @@
+import argparse
+from utils.data_utils import sync_catalog
+
+def main():
+    """ซิงค์ข้อมูลที่เปลี่ยนแปลงจาก CKAN (เหมาะสำหรับรันเป็น cron ทุกคืน)"""
+    parser = argparse.ArgumentParser(description="ซิงค์ข้อมูลชุดข้อมูลจาก CKAN")
+    parser.add_argument("--api-url", default=None, help="URL ของ CKAN API")
+    parser.add_argument("--full", action="store_true", help="ดึงข้อมูลทั้งหมดโดยไม่ใช้ watermark")
+    args = parser.parse_args()
+    
+    stats = sync_catalog(api_url=args.api_url, full=args.full)
+    print(f"จำนวนข้อมูลที่ซิงค์: {stats['updated']} รายการ")
+
+if __name__ == "__main__":
+    main()
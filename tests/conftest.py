@@ -0,0 +1,105 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# utils.data_utils สร้างฐานข้อมูลที่ data/ ของโฟลเดอร์ปัจจุบันตั้งแต่ import
+# จึงย้ายไปโฟลเดอร์ชั่วคราวก่อนเก็บ test เพื่อไม่ให้ปนกับฐานข้อมูลและ cache ของจริง
+os.chdir(tempfile.mkdtemp(prefix='catalog-tests-'))
+
+class StubServer:
+    """เซิร์ฟเวอร์ HTTP ในเครื่องสำหรับ test ที่ตอบตามฟังก์ชัน route และเก็บรายการ request ที่ได้รับ"""
+    
+    def __init__(self, route):
+        self.route = route
+        self.requests = []
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                parts = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+                stub.requests.append((self.command, parts.path, query, dict(self.headers)))
+                status, headers, body = stub.route(self.command, parts.path, query, self.headers)
+                if isinstance(body, (dict, list)):
+                    body = json.dumps(body).encode()
+                    headers = {'Content-Type': 'application/json', **headers}
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+            
+            do_GET = do_HEAD = _handle
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+    
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+@pytest.fixture
+def stub_server():
+    """สร้าง StubServer จากฟังก์ชัน route(method, path, query, headers) -> (status, headers, body)"""
+    servers = []
+    
+    def start(route):
+        server = StubServer(route)
+        servers.append(server)
+        return server
+    
+    yield start
+    for server in servers:
+        server.close()
+
+@pytest.fixture
+def database(tmp_path):
+    """ฐานข้อมูลว่างในโฟลเดอร์ชั่วคราวของ test"""
+    from utils.db_utils import Database
+    db = Database(str(tmp_path / 'database.sqlite'))
+    yield db
+    db.close()
+
+@pytest.fixture
+def make_dataset():
+    """สร้างข้อมูลชุดข้อมูลในรูปแบบ (dataset_data, resources_data) ของ Database.update_datasets (หนึ่งไฟล์ต่อประเภทไฟล์)"""
+    
+    def make(package_id, title=None, organization='หน่วยงานทดสอบ', formats=('CSV',), description=''):
+        resources = [
+            {
+                'dataset_id': package_id,
+                'file_name': f"{package_id}.{file_format.lower()}",
+                'format': file_format,
+                'url': f"https://example.com/{package_id}.{file_format.lower()}",
+                'description': description
+            }
+            for file_format in formats
+        ]
+        dataset = {
+            'package_id': package_id,
+            'title': title or package_id,
+            'organization': organization,
+            'url': f"https://example.com/{package_id}",
+            'resource_count': len(resources),
+            'file_types': ', '.join(formats),
+            'last_updated': '2024-01-01'
+        }
+        return dataset, resources
+    
+    return make
@@ -0,0 +1,34 @@
+import pytest
+from utils import data_utils
+
+def test_bootstrap_retries_until_it_succeeds_then_runs_once(monkeypatch):
+    results = [False, True]
+    calls = []
+    
+    def init_database():
+        calls.append(1)
+        return results[len(calls) - 1]
+    
+    monkeypatch.setattr(data_utils, 'init_database', init_database)
+    data_utils._bootstrap_database.clear()
+    try:
+        # ล้มเหลวแล้วต้องไม่ถูก cache เพื่อให้ rerun ถัดไปลองใหม่
+        with pytest.raises(RuntimeError):
+            data_utils._bootstrap_database()
+        assert data_utils._bootstrap_database()
+        assert data_utils._bootstrap_database()
+        assert len(calls) == 2
+    finally:
+        data_utils._bootstrap_database.clear()
+
+def test_generation_changes_on_every_write(database, make_dataset):
+    generations = [database.get_generation()]
+    
+    database.update_datasets([make_dataset('pop')])
+    generations.append(database.get_generation())
+    database.update_rankings([{'dataset_id': 'pop', 'ranking': 2}])
+    generations.append(database.get_generation())
+    database.clear_database()
+    generations.append(database.get_generation())
+    
+    assert generations == sorted(set(generations))
@@ -0,0 +1,114 @@
+import time
+import pytest
+import requests
+from utils.ckan_client import CircuitBreaker, CircuitOpenError, CkanClient, TokenBucket
+
+def flaky_route(method, path, query, headers):
+    """/fail ตอบ 500, /loop redirect วนไม่รู้จบ และ path อื่นตอบสำเร็จ"""
+    if path == '/fail':
+        return 500, {}, b''
+    if path == '/loop':
+        return 302, {'Location': '/loop'}, b''
+    return 200, {}, {'success': True, 'result': path}
+
+def test_half_open_probe_that_raises_reopens_the_circuit(stub_server):
+    server = stub_server(flaky_route)
+    client = CkanClient(server.url, rate=100, max_retries=0, failure_threshold=1, reset_timeout=0.2)
+    
+    assert client.get(f"{server.url}/fail").status_code == 500
+    with pytest.raises(CircuitOpenError):
+        client.get(f"{server.url}/ok")
+    
+    time.sleep(0.25)
+    with pytest.raises(requests.TooManyRedirects):
+        client.get(f"{server.url}/loop")
+    breaker = client._breaker(server.url)
+    assert breaker.state == 'open'
+    assert not breaker._probing
+    
+    time.sleep(0.25)
+    assert client.get(f"{server.url}/ok").status_code == 200
+    assert breaker.state == 'closed'
+
+def test_token_bucket_limits_bursts():
+    bucket = TokenBucket(rate=20, burst=2)
+    
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    # token หมดแล้ว ต้องรอประมาณ 1/rate วินาที
+    assert bucket.acquire() == pytest.approx(1 / 20, abs=0.02)
+
+def test_token_bucket_adapts_rate():
+    bucket = TokenBucket(rate=4, burst=1, min_rate=1, max_rate=10)
+    
+    bucket.acquire()
+    bucket.reward()
+    assert bucket.rate == 5
+    # ระหว่าง slow start เพิ่มทีละ 1 ต่อ request จนถึงเพดาน
+    for _ in range(10):
+        bucket.reward()
+    assert bucket.rate == 10
+    
+    bucket.penalize()
+    assert bucket.rate == 5
+    assert not bucket.slow_start
+    bucket.penalize()
+    bucket.penalize()
+    bucket.penalize()
+    assert bucket.rate == 1
+    
+    bucket.reward()
+    assert bucket.rate == 2
+
+def test_token_bucket_does_not_grow_when_not_limiting():
+    bucket = TokenBucket(rate=4, burst=4)
+    
+    bucket.acquire()
+    bucket.reward()
+    
+    assert bucket.rate == 4
+
+def test_circuit_breaker_opens_after_threshold_and_probes_once():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+    
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    
+    time.sleep(0.15)
+    breaker.before_request()
+    assert breaker.state == 'half_open'
+    # ระหว่างทดสอบ request อื่นถูกปฏิเสธ
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_success()
+    assert (breaker.state, breaker.failures) == ('closed', 0)
+    breaker.before_request()
+
+def test_retries_server_errors_then_returns_last_response(stub_server):
+    server = stub_server(flaky_route)
+    client = CkanClient(server.url, rate=100, max_retries=2, backoff_base=0.01, failure_threshold=10)
+    
+    response = client.get(f"{server.url}/fail")
+    
+    assert response.status_code == 500
+    assert len(server.requests) == 3
+    stats = client.stats()
+    assert (stats['requests'], stats['retries'], stats['errors']) == (3, 2, 3)
+
+def test_throttled_requests_slow_down_without_opening_the_circuit(stub_server):
+    responses = iter([(429, {'Retry-After': '0'}, b''), (200, {}, {'success': True, 'result': 'ok'})])
+    server = stub_server(lambda method, path, query, headers: next(responses))
+    client = CkanClient(server.url, rate=10, max_retries=2, failure_threshold=1)
+    
+    assert client.action('status_show', use_cache=False) == 'ok'
+    
+    stats = client.stats()
+    assert stats['throttled'] == 1
+    assert stats['rate'] < 10
+    assert stats['circuits'][server.url.split('//', 1)[1]]['state'] == 'closed'
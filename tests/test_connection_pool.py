@@ -0,0 +1,91 @@
+import threading
+import pytest
+from utils.db_utils import ConnectionPool, get_pool, increment_counters
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.sqlite'), max_readers=2)
+    with pool.writer() as conn:
+        conn.execute("CREATE TABLE counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0)")
+    yield pool
+    pool.close_all()
+
+def read_counters(pool):
+    with pool.reader() as conn:
+        return dict(conn.execute("SELECT key, value FROM counters"))
+
+def test_nested_transaction_commits_once_with_outer(pool):
+    with pool.transaction() as outer:
+        increment_counters(outer, 'counters', a=1)
+        with pool.transaction() as inner:
+            assert inner is outer
+            increment_counters(inner, 'counters', a=2, b=0)
+        # ยังไม่ commit จนกว่า transaction นอกสุดจะจบ
+        assert read_counters(pool) == {}
+    
+    assert read_counters(pool) == {'a': 3}
+
+def test_transaction_rolls_back_on_error(pool):
+    with pytest.raises(ValueError):
+        with pool.transaction() as conn:
+            increment_counters(conn, 'counters', a=1)
+            raise ValueError("ยกเลิก")
+    
+    assert read_counters(pool) == {}
+    with pool.writer() as conn:
+        assert not conn.in_transaction
+
+def test_readers_are_not_blocked_by_an_open_write(pool):
+    with pool.transaction() as conn:
+        increment_counters(conn, 'counters', a=1)
+    
+    result = {}
+    writing = threading.Event()
+    done = threading.Event()
+    
+    def write():
+        with pool.transaction() as conn:
+            increment_counters(conn, 'counters', a=1)
+            writing.set()
+            done.wait(5)
+    
+    thread = threading.Thread(target=write)
+    thread.start()
+    try:
+        assert writing.wait(5)
+        # WAL: อ่านข้อมูลที่ commit แล้วได้ระหว่างที่อีก thread ถือ transaction เขียนอยู่
+        result = read_counters(pool)
+    finally:
+        done.set()
+        thread.join()
+    
+    assert result == {'a': 1}
+    assert read_counters(pool) == {'a': 2}
+
+def test_readers_are_reused_and_limited(pool):
+    for _ in range(3):
+        read_counters(pool)
+    
+    stats = pool.stats()
+    assert stats['readers_opened'] == 1
+    assert stats['reader_checkouts'] == 3
+    assert stats['readers_in_use'] == 0
+    
+    with pool.reader() as conn:
+        with pool.reader() as conn2:
+            assert conn is not conn2
+            # ครบ max_readers แล้ว ตัวถัดไปต้องรอจนหมดเวลา
+            pool.acquire_timeout = 0.1
+            with pytest.raises(TimeoutError):
+                with pool.reader():
+                    pass
+
+def test_reader_connections_are_read_only(pool):
+    with pool.reader() as conn:
+        with pytest.raises(Exception, match='readonly'):
+            conn.execute("INSERT INTO counters (key, value) VALUES ('a', 1)")
+
+def test_get_pool_returns_one_pool_per_file(tmp_path):
+    path = str(tmp_path / 'shared.sqlite')
+    assert get_pool(path) is get_pool(path)
+    assert get_pool(path) is not get_pool(str(tmp_path / 'other.sqlite'))
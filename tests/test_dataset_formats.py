@@ -0,0 +1,29 @@
+from utils.db_utils import split_file_types
+
+def test_split_file_types_normalizes_and_dedupes():
+    assert split_file_types(' csv, XLSX ,Csv,, pdf ') == ['CSV', 'PDF', 'XLSX']
+    assert split_file_types(None) == []
+
+def test_file_type_filter_uses_exact_formats(database, make_dataset):
+    database.update_datasets([
+        make_dataset('csv-only', formats=('CSV',)),
+        make_dataset('mixed', formats=('CSV', 'XLSX')),
+        make_dataset('xls', formats=('XLS',))
+    ])
+    
+    def ids(file_type):
+        return [row['package_id'] for row in database.query_datasets({'file_type': file_type})]
+    
+    assert ids('csv') == ['csv-only', 'mixed']
+    # XLS ไม่ตรงกับ XLSX (ต่างจากการค้นหาด้วย LIKE ในข้อความที่คั่นด้วย comma)
+    assert ids('XLS') == ['xls']
+    assert database.count_datasets({'file_type': 'XLSX'}) == 1
+    assert database.get_file_types() == ['CSV', 'XLS', 'XLSX']
+
+def test_formats_follow_dataset_updates(database, make_dataset):
+    database.update_datasets([make_dataset('pop', formats=('CSV', 'JSON'))])
+    database.update_datasets([make_dataset('pop', formats=('XLSX',))])
+    
+    with database.read() as conn:
+        assert conn.execute("SELECT format FROM dataset_formats WHERE dataset_id = 'pop'").fetchall() == [('XLSX',)]
+    assert database.get_file_types() == ['XLSX']
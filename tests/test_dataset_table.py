@@ -0,0 +1,45 @@
+from utils import ui_utils
+from utils.file_utils import build_format_link_columns
+
+def test_format_link_columns_align_with_rows():
+    file_urls = {
+        'pop': {'CSV': 'https://example.com/pop.csv', 'XLSX': 'https://example.com/pop.xlsx'},
+        'rain': {'CSV': 'https://example.com/rain.csv'}
+    }
+    
+    columns, column_config = build_format_link_columns(['rain', 'empty', 'pop'], file_urls)
+    
+    # ประเภทที่พบบ่อยในหน้านี้อยู่ก่อน
+    assert list(columns) == list(column_config) == ['format_CSV', 'format_XLSX']
+    assert columns['format_CSV'] == ['https://example.com/rain.csv', None, 'https://example.com/pop.csv']
+    assert columns['format_XLSX'] == [None, None, 'https://example.com/pop.xlsx']
+
+def test_dataset_file_urls_are_read_in_one_call(database, make_dataset):
+    database.update_datasets([make_dataset('pop', formats=('CSV', 'XLSX')), make_dataset('rain')])
+    
+    assert database.get_dataset_file_urls(['pop', 'rain', 'missing']) == {
+        'pop': {'CSV': 'https://example.com/pop.csv', 'XLSX': 'https://example.com/pop.xlsx'},
+        'rain': {'CSV': 'https://example.com/rain.csv'},
+        'missing': {}
+    }
+
+def test_table_edits_are_saved_in_one_batch(monkeypatch):
+    saved = []
+    jobs = []
+    monkeypatch.setattr(ui_utils, 'update_rankings', saved.append)
+    monkeypatch.setattr(ui_utils, 'submit_job', lambda kind, params: jobs.append((kind, params)) or len(jobs))
+    monkeypatch.setattr(ui_utils.st, 'session_state', {
+        'home_table_3': {'edited_rows': {
+            0: {'ranking': ui_utils.RANKING_LABELS[4]},
+            2: {'ranking': ui_utils.RANKING_LABELS[1], 'load': True},
+            1: {'load': False}
+        }},
+        'home_table_version': 3
+    })
+    
+    ui_utils._apply_table_edits('home_table', 'home_table_3', ['pop', 'rain', 'house'])
+    
+    assert saved == [[{'dataset_id': 'pop', 'ranking': 4}, {'dataset_id': 'house', 'ranking': 1}]]
+    assert jobs == [('refresh_dataset', {'package_id': 'house'})]
+    # key ของตารางเปลี่ยนเพื่อเริ่มใหม่จากข้อมูลล่าสุด
+    assert ui_utils.st.session_state['home_table_version'] == 4
@@ -0,0 +1,106 @@
+import sqlite3
+from utils.db_utils import SCHEMA_MIGRATIONS, Database
+
+def create_legacy_database(path):
+    """สร้างฐานข้อมูลแบบเดิมก่อนมี migration (user_version = 0)"""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE datasets (
+            package_id TEXT PRIMARY KEY,
+            title TEXT,
+            organization TEXT,
+            url TEXT,
+            resource_count INTEGER,
+            file_types TEXT,
+            last_updated TEXT
+        );
+        CREATE TABLE resources (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dataset_id TEXT,
+            file_name TEXT,
+            format TEXT,
+            url TEXT,
+            description TEXT,
+            ranking INTEGER DEFAULT 0,
+            FOREIGN KEY (dataset_id) REFERENCES datasets(package_id)
+        );
+        INSERT INTO datasets VALUES
+            ('pop', 'ข้อมูลประชากร', 'กรมการปกครอง', 'https://example.com/pop', 2, 'CSV, xlsx', '2024-01-01'),
+            ('rain', 'ปริมาณน้ำฝน', 'กรมอุตุนิยมวิทยา', 'https://example.com/rain', 1, 'CSV', '2024-02-01');
+        INSERT INTO resources (dataset_id, file_name, format, url, description, ranking) VALUES
+            ('pop', 'pop.csv', 'CSV', 'https://example.com/pop.csv', 'จำนวนประชากร', 3),
+            ('pop', 'pop.xlsx', 'XLSX', 'https://example.com/pop.xlsx', '', 0),
+            ('rain', 'rain.csv', 'CSV', 'https://example.com/rain.csv', 'ฝนรายวัน', 0);
+    """)
+    conn.commit()
+    conn.close()
+
+def columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def test_legacy_database_is_upgraded_to_latest_version(tmp_path):
+    path = str(tmp_path / 'legacy.sqlite')
+    create_legacy_database(path)
+    
+    db = Database(path)
+    try:
+        with db.read() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == len(SCHEMA_MIGRATIONS)
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            assert {'idx_resources_dataset_ranking', 'idx_datasets_organization', 'idx_datasets_max_ranking',
+                    'idx_dataset_formats_dataset', 'idx_jobs_status', 'idx_resources_url'} <= indexes
+            assert {'owner', 'heartbeat_at'} <= columns(conn, 'jobs')
+            assert 'ranking_manual' in columns(conn, 'resources')
+            manual = dict(conn.execute("SELECT file_name, ranking_manual FROM resources"))
+            # ranking เดิมที่มีค่าถือว่ากำหนดด้วยมือ
+            assert manual == {'pop.csv': 1, 'pop.xlsx': 0, 'rain.csv': 0}
+            # แถวในดัชนีค้นหาใช้ rowid เดียวกับ datasets
+            assert conn.execute("""
+                SELECT COUNT(*) FROM datasets_fts f JOIN datasets d ON d.rowid = f.rowid
+                WHERE d.package_id = f.package_id
+            """).fetchone()[0] == 2
+        
+        assert db.get_dataset_rankings(['pop', 'rain']) == {'pop': 3, 'rain': 0}
+        assert db.get_format_counts() == {'CSV': 2, 'XLSX': 1}
+        assert db.get_ranking_counts() == {0: 1, 3: 1}
+        assert {row['organization']: row['resource_count'] for row in db.get_org_stats()} == {
+            'กรมการปกครอง': 2, 'กรมอุตุนิยมวิทยา': 1
+        }
+        assert db.search_datasets('ประชากร') == ['pop']
+    finally:
+        db.close()
+
+def test_partially_migrated_database_runs_only_newer_migrations(tmp_path):
+    path = str(tmp_path / 'partial.sqlite')
+    create_legacy_database(path)
+    conn = sqlite3.connect(path)
+    # เวอร์ชัน 5 = มี migration 1-5 แล้ว
+    for migration in SCHEMA_MIGRATIONS[:5]:
+        migration(conn)
+    conn.execute("PRAGMA user_version = 5")
+    conn.execute("INSERT INTO org_stats (organization, dataset_count, resource_count) VALUES ('marker', 1, 0)")
+    conn.commit()
+    conn.close()
+    
+    db = Database(path)
+    try:
+        with db.read() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == len(SCHEMA_MIGRATIONS)
+            assert 'ranking_manual' in columns(conn, 'resources')
+        # migration 5 ไม่ถูกเรียกซ้ำ (ตารางสรุปไม่ถูกคำนวณใหม่)
+        assert 'marker' in {row['organization'] for row in db.get_org_stats()}
+    finally:
+        db.close()
+
+def test_reopening_latest_database_is_a_no_op(tmp_path, capsys):
+    path = str(tmp_path / 'fresh.sqlite')
+    Database(path).close()
+    capsys.readouterr()
+    
+    db = Database(path)
+    try:
+        with db.read() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == len(SCHEMA_MIGRATIONS)
+        assert 'อัพเกรด schema' not in capsys.readouterr().out
+    finally:
+        db.close()
@@ -0,0 +1,48 @@
+from utils.data_utils import db, harvest_datasets
+
+def package(package_id):
+    """ข้อมูล package_show ขั้นต่ำของชุดข้อมูลหนึ่งชุด"""
+    return {
+        'title': f"ชุดข้อมูล {package_id}",
+        'organization': {'title': 'หน่วยงานทดสอบ'},
+        'metadata_modified': '2024-01-01T00:00:00',
+        'resources': [
+            {'name': f"{package_id}.csv", 'format': 'CSV', 'url': f"https://example.com/{package_id}.csv"}
+        ]
+    }
+
+def ckan_route(method, path, query, headers):
+    """package_show ที่ตอบสำเร็จ, 404 และ success=false ตาม id"""
+    package_id = query.get('id')
+    if path != '/api/3/action/package_show':
+        return 404, {}, b''
+    if package_id == 'missing':
+        return 404, {}, {'success': False, 'error': {'message': 'Not found'}}
+    if package_id == 'broken':
+        return 200, {}, {'success': False, 'error': {'message': 'Access denied'}}
+    return 200, {}, {'success': True, 'result': package(package_id)}
+
+def test_harvest_counts_failed_ids(stub_server):
+    server = stub_server(ckan_route)
+    package_ids = ['ok-1', 'missing', 'ok-2', 'broken', 'ok-3', 'ok-1']
+    
+    stats = harvest_datasets(package_ids, max_workers=4, batch_size=2, api_url=f"{server.url}/api/3/action")
+    
+    assert stats['total'] == 5
+    assert stats['updated'] == 3
+    assert stats['failed'] == 2
+    assert set(stats['errors']) == {'missing', 'broken'}
+    assert db.get_dataset_titles().keys() >= {'ok-1', 'ok-2', 'ok-3'}
+    assert 'missing' not in db.get_dataset_titles()
+
+def test_harvest_reports_progress_for_every_id(stub_server):
+    server = stub_server(ckan_route)
+    progress = []
+    
+    harvest_datasets(
+        ['ok-4', 'missing', 'ok-5'],
+        api_url=f"{server.url}/api/3/action",
+        progress_callback=lambda done, total: progress.append((done, total))
+    )
+    
+    assert progress == [(1, 3), (2, 3), (3, 3)]
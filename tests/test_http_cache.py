@@ -0,0 +1,59 @@
+import pytest
+import requests
+from utils.http_cache import HttpCache
+
+def api_route(bodies, etag='"v1"'):
+    """ตอบ body ตาม path พร้อม ETag และตอบ 304 เมื่อ If-None-Match ตรงกัน"""
+    def route(method, path, query, headers):
+        if path not in bodies:
+            return 500, {}, b''
+        if headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'ETag': etag}, bodies[path]
+    return route
+
+def test_stale_entry_is_revalidated_with_304(stub_server, tmp_path):
+    server = stub_server(api_route({'/package_show': {'success': True, 'result': {'id': 'pop'}}}))
+    cache = HttpCache(tmp_path / 'http_cache.sqlite')
+    url = f"{server.url}/package_show"
+    
+    first = cache.get_json(url, params={'id': 'pop'}, ttl=0)
+    second = cache.get_json(url, params={'id': 'pop'}, ttl=0)
+    
+    assert first == second == {'success': True, 'result': {'id': 'pop'}}
+    assert [headers.get('If-None-Match') for _, _, _, headers in server.requests] == [None, '"v1"']
+    assert server.requests[1][2] == {'id': 'pop'}
+    stats = cache.stats()
+    assert (stats['misses'], stats['hits'], stats['revalidations']) == (1, 1, 1)
+    assert stats['bytes_downloaded'] == stats['size_bytes'] == len(cache.get(url, params={'id': 'pop'}))
+
+def test_fresh_entry_is_served_without_a_request(stub_server, tmp_path):
+    server = stub_server(api_route({'/package_show': {'success': True}}))
+    cache = HttpCache(tmp_path / 'http_cache.sqlite', ttl=60)
+    
+    for _ in range(3):
+        cache.get(f"{server.url}/package_show")
+    
+    assert len(server.requests) == 1
+    assert cache.stats()['hits'] == 2
+
+def test_error_responses_are_not_stored(stub_server, tmp_path):
+    server = stub_server(api_route({}))
+    cache = HttpCache(tmp_path / 'http_cache.sqlite')
+    
+    with pytest.raises(requests.HTTPError):
+        cache.get(f"{server.url}/package_show")
+    
+    assert cache.stats()['responses'] == 0
+
+def test_least_recently_used_responses_are_evicted(stub_server, tmp_path):
+    server = stub_server(api_route({'/a': b'a' * 60, '/b': b'b' * 60}))
+    cache = HttpCache(tmp_path / 'http_cache.sqlite', max_bytes=100)
+    
+    cache.get(f"{server.url}/a")
+    cache.get(f"{server.url}/b")
+    
+    stats = cache.stats()
+    assert (stats['responses'], stats['evictions'], stats['size_bytes']) == (1, 1, 60)
+    cache.invalidate(f"{server.url}/b")
+    assert cache.stats()['size_bytes'] == 0
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+from utils.ranking_engine import FORMAT_SCORES, UNKNOWN_FORMAT_SCORE, WEIGHTS, score_resources
+
+NOW = pd.Timestamp('2024-01-01', tz='UTC')
+
+def frames(formats, url_ok=None):
+    resources = pd.DataFrame({
+        'id': range(len(formats)),
+        'dataset_id': 'pop',
+        'format': formats,
+        'ranking': 0,
+        'url_ok': url_ok if url_ok is not None else [np.nan] * len(formats),
+        'filled': 4
+    })
+    datasets = pd.DataFrame({'package_id': ['pop'], 'last_updated': ['2024-01-01'], 'filled': [2]})
+    return resources, datasets
+
+def test_format_scores_ignore_case_and_default_unknown_formats():
+    resources, datasets = frames(['csv', 'CSV', 'Pdf', None, 'WEIRD', 'xlsx'])
+    
+    scores = score_resources(resources, datasets, now=NOW)['score']
+    base = WEIGHTS['reachability'] * 0.5 + WEIGHTS['freshness'] + WEIGHTS['completeness']
+    expected = [FORMAT_SCORES['CSV'], FORMAT_SCORES['CSV'], FORMAT_SCORES['PDF'],
+                UNKNOWN_FORMAT_SCORE, UNKNOWN_FORMAT_SCORE, FORMAT_SCORES['XLSX']]
+    
+    assert np.allclose(scores, [base + WEIGHTS['format'] * score for score in expected])
+
+def test_broken_links_rank_zero():
+    resources, datasets = frames(['CSV', 'CSV'], url_ok=[1, 0])
+    
+    rankings = score_resources(resources, datasets, now=NOW)['new_ranking'].tolist()
+    
+    assert rankings == [4, 0]
+
+def test_empty_frames():
+    resources, datasets = frames([])
+    
+    assert score_resources(resources, datasets, now=NOW).empty
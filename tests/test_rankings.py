@@ -0,0 +1,65 @@
+import pytest
+from utils.db_utils import Database
+
+def resource_rankings(database):
+    with database.read() as conn:
+        return dict(conn.execute("SELECT file_name, ranking FROM resources"))
+
+def test_resource_edits_override_dataset_edits(database, make_dataset):
+    database.update_datasets([make_dataset('pop', formats=('CSV', 'XLSX')), make_dataset('rain')])
+    with database.read() as conn:
+        xlsx_id = conn.execute("SELECT id FROM resources WHERE file_name = 'pop.xlsx'").fetchone()[0]
+    
+    result = database.update_rankings([
+        {'resource_id': xlsx_id, 'ranking': 4},
+        {'dataset_id': 'pop', 'ranking': 1},
+        {'dataset_id': 'rain', 'ranking': 2},
+        {'dataset_id': 'rain', 'ranking': 3}
+    ])
+    
+    assert result == {'datasets': 2, 'resources': 4}
+    assert resource_rankings(database) == {'pop.csv': 1, 'pop.xlsx': 4, 'rain.csv': 3}
+    assert database.get_dataset_rankings(['pop', 'rain']) == {'pop': 4, 'rain': 3}
+    assert database.get_dataset_ids_by_ranking(4) == ['pop']
+    assert database.get_ranking_counts() == {3: 1, 4: 1}
+
+def test_invalid_edit_rejects_the_whole_batch(database, make_dataset):
+    database.update_datasets([make_dataset('pop'), make_dataset('rain')])
+    generation = database.get_generation()
+    
+    with pytest.raises(ValueError):
+        database.update_rankings([{'dataset_id': 'pop', 'ranking': 2}, {'dataset_id': 'rain', 'ranking': 7}])
+    with pytest.raises(ValueError):
+        database.update_rankings([{'dataset_id': 'pop', 'ranking': 2}, {'ranking': 1}])
+    
+    assert resource_rankings(database) == {'pop.csv': 0, 'rain.csv': 0}
+    assert database.get_generation() == generation
+
+def test_failure_inside_the_transaction_rolls_back_every_edit(database, make_dataset, monkeypatch):
+    database.update_datasets([make_dataset('pop'), make_dataset('rain')])
+    assert database.get_dataset_rankings(['pop', 'rain']) == {'pop': 0, 'rain': 0}
+    generation = database.get_generation()
+    
+    def fail(self, conn, dataset_ids):
+        raise RuntimeError("ล้มเหลวระหว่างบันทึก")
+    
+    monkeypatch.setattr(Database, '_refresh_max_rankings', fail)
+    with pytest.raises(RuntimeError):
+        database.update_rankings([{'dataset_id': 'pop', 'ranking': 2}, {'dataset_id': 'rain', 'ranking': 3}])
+    monkeypatch.undo()
+    
+    assert resource_rankings(database) == {'pop.csv': 0, 'rain.csv': 0}
+    assert database.get_generation() == generation
+    assert database.get_ranking_counts() == {0: 2}
+    assert database.get_dataset_rankings(['pop', 'rain']) == {'pop': 0, 'rain': 0}
+
+def test_manual_rankings_survive_refresh_and_auto_ranking(database, make_dataset):
+    database.update_datasets([make_dataset('pop')])
+    database.update_rankings([{'dataset_id': 'pop', 'ranking': 2}])
+    
+    database.update_datasets([make_dataset('pop', title='ข้อมูลประชากร (ปรับปรุง)')])
+    with database.read() as conn:
+        resource_id = conn.execute("SELECT id FROM resources WHERE dataset_id = 'pop'").fetchone()[0]
+    assert database.apply_auto_rankings([(resource_id, 'pop', 4)]) == 0
+    
+    assert resource_rankings(database) == {'pop.csv': 2}
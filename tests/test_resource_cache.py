@@ -0,0 +1,91 @@
+import hashlib
+import pytest
+import requests
+from utils.resource_cache import CHUNK_SIZE, ResourceCache
+
+def file_route(files):
+    """เสิร์ฟไฟล์ตาม path จาก dict {path: bytes}"""
+    def route(method, path, query, headers):
+        if path not in files:
+            return 404, {}, b''
+        return 200, {'Content-Type': 'text/csv', 'ETag': f'"{len(files[path])}"'}, files[path]
+    return route
+
+def test_download_larger_than_cache_is_not_evicted(stub_server, tmp_path):
+    server = stub_server(file_route({'/big.csv': b'x' * 1000}))
+    cache = ResourceCache(root=tmp_path / 'cache', max_bytes=100)
+    
+    resource = cache.fetch(f"{server.url}/big.csv")
+    
+    assert resource.path.exists()
+    assert resource.path.read_bytes() == b'x' * 1000
+
+def test_new_download_evicts_least_recently_used(stub_server, tmp_path):
+    server = stub_server(file_route({'/a.csv': b'a' * 60, '/b.csv': b'b' * 60}))
+    cache = ResourceCache(root=tmp_path / 'cache', max_bytes=100)
+    
+    first = cache.fetch(f"{server.url}/a.csv")
+    second = cache.fetch(f"{server.url}/b.csv")
+    
+    assert not first.path.exists()
+    assert second.path.exists()
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['size_bytes'] == 60
+
+def range_route(body, etag='"v1"'):
+    """เสิร์ฟไฟล์เดียวที่รองรับ Range/If-Range และ If-None-Match"""
+    def route(method, path, query, headers):
+        if headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        headers_out = {'Content-Type': 'text/csv', 'ETag': etag, 'Accept-Ranges': 'bytes'}
+        range_header = headers.get('Range')
+        if range_header and headers.get('If-Range') == etag:
+            start = int(range_header[len('bytes='):].rstrip('-'))
+            headers_out['Content-Range'] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            return 206, headers_out, body[start:]
+        return 200, headers_out, body
+    return route
+
+def test_interrupted_download_resumes_with_range(stub_server, tmp_path, monkeypatch):
+    body = bytes(range(256)) * 1024
+    server = stub_server(range_route(body))
+    cache = ResourceCache(root=tmp_path / 'cache')
+    url = f"{server.url}/data.csv"
+    
+    iter_content = requests.Response.iter_content
+    
+    def interrupted(self, chunk_size=1, decode_unicode=False):
+        chunks = iter_content(self, chunk_size, decode_unicode)
+        yield next(chunks)
+        raise requests.ConnectionError("การเชื่อมต่อถูกตัด")
+    
+    monkeypatch.setattr(requests.Response, 'iter_content', interrupted)
+    with pytest.raises(requests.ConnectionError):
+        cache.fetch(url)
+    monkeypatch.undo()
+    
+    resource = cache.fetch(url)
+    
+    assert resource.path.read_bytes() == body
+    assert resource.sha256 == hashlib.sha256(body).hexdigest()
+    assert server.requests[-1][3].get('Range') == f"bytes={CHUNK_SIZE}-"
+    stats = cache.stats()
+    assert stats['resumes'] == 1
+    assert stats['bytes_downloaded'] == len(body) - CHUNK_SIZE
+    assert not any(cache.partial_dir.iterdir())
+
+def test_unchanged_file_is_revalidated_with_etag(stub_server, tmp_path):
+    server = stub_server(range_route(b'a,b\n1,2\n'))
+    cache = ResourceCache(root=tmp_path / 'cache')
+    url = f"{server.url}/data.csv"
+    
+    first = cache.fetch(url)
+    second = cache.fetch(url)
+    third = cache.fetch(url, max_age=60)
+    
+    assert not first.from_cache and second.from_cache and third.from_cache
+    assert second.path == first.path
+    assert server.requests[1][3].get('If-None-Match') == '"v1"'
+    # max_age: ใช้ไฟล์ใน cache ทันทีโดยไม่ส่ง request
+    assert len(server.requests) == 2
+    assert cache.stats()['revalidations'] == 1
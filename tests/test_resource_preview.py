@@ -0,0 +1,79 @@
+from utils.resource_preview import PREVIEW_INITIAL_BYTES, detect_delimiter, detect_encoding, preview_csv
+
+THAI_CSV = 'จังหวัด;ประชากร\n' + ''.join(f'เชียงใหม่ {i};{i * 100}\n' for i in range(5000))
+
+def csv_route(body, etag='"v1"', ranges=True):
+    """เสิร์ฟไฟล์ CSV ที่รองรับ Range (bytes=a-b) และตอบ 304 เมื่อ If-None-Match ตรงกัน"""
+    def route(method, path, query, headers):
+        if headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        range_header = headers.get('Range')
+        if ranges and range_header:
+            first, last = range_header[len('bytes='):].split('-')
+            last = min(int(last), len(body) - 1)
+            return 206, {'ETag': etag, 'Content-Range': f"bytes {first}-{last}/{len(body)}"}, body[int(first):last + 1]
+        return 200, {'ETag': etag}, body
+    return route
+
+def test_detect_encoding_of_thai_text():
+    text = 'ข้อมูลประชากร'
+    
+    assert detect_encoding(text.encode('utf-8')) == 'utf-8'
+    assert detect_encoding(b'\xef\xbb\xbf' + text.encode('utf-8')) == 'utf-8-sig'
+    assert detect_encoding(text.encode('cp874')) == 'cp874'
+    # ตัวอย่างที่ถูกตัดกลางตัวอักษร UTF-8 ยังเป็น UTF-8 ถ้ายังอ่านไม่ครบไฟล์
+    assert detect_encoding(text.encode('utf-8')[:-1], final=False) == 'utf-8'
+
+def test_detect_delimiter():
+    assert detect_delimiter('a;b;c\n1;2;3\n') == ';'
+    assert detect_delimiter('a\tb\n1\t2\n') == '\t'
+    assert detect_delimiter('single\nvalue\n') == ','
+
+def test_preview_reads_only_the_head_of_a_large_file(stub_server):
+    body = THAI_CSV.encode('cp874')
+    server = stub_server(csv_route(body))
+    
+    preview = preview_csv(f"{server.url}/large.csv", rows=5)
+    
+    assert preview['encoding'] == 'cp874'
+    assert not preview['complete']
+    assert preview['bytes_read'] <= PREVIEW_INITIAL_BYTES < len(body)
+    assert list(preview['data'].columns) == ['จังหวัด', 'ประชากร']
+    assert preview['data']['จังหวัด'].tolist() == [f'เชียงใหม่ {i}' for i in range(5)]
+    assert [headers['Range'] for _, _, _, headers in server.requests] == [f"bytes=0-{PREVIEW_INITIAL_BYTES - 1}"]
+
+def test_preview_requests_more_ranges_until_enough_rows(stub_server):
+    body = THAI_CSV.encode('utf-8')
+    server = stub_server(csv_route(body))
+    
+    preview = preview_csv(f"{server.url}/rows.csv", rows=2000)
+    
+    assert len(preview['data']) == 2000
+    assert preview['data']['จังหวัด'].iloc[-1] == 'เชียงใหม่ 1999'
+    ranges = [headers['Range'] for _, _, _, headers in server.requests]
+    assert ranges[0] == f"bytes=0-{PREVIEW_INITIAL_BYTES - 1}"
+    assert ranges[1].startswith(f"bytes={PREVIEW_INITIAL_BYTES}-")
+    assert all(headers.get('If-Range') == '"v1"' for _, _, _, headers in server.requests[1:])
+
+def test_preview_stops_early_without_range_support(stub_server):
+    body = THAI_CSV.encode('utf-8')
+    server = stub_server(csv_route(body, ranges=False))
+    
+    preview = preview_csv(f"{server.url}/norange.csv", rows=5)
+    
+    assert len(preview['data']) == 5
+    assert preview['bytes_read'] < len(body)
+    assert len(server.requests) == 1
+
+def test_small_file_is_complete_and_revalidated_from_cache(stub_server):
+    body = 'a,b\n1,2\n'.encode('utf-8')
+    server = stub_server(csv_route(body))
+    url = f"{server.url}/small.csv"
+    
+    first = preview_csv(url)
+    second = preview_csv(url)
+    
+    assert first['complete'] and not first['from_cache']
+    assert second['from_cache'] and second['bytes_read'] == 0
+    assert second['data'].equals(first['data'])
+    assert server.requests[1][3].get('If-None-Match') == '"v1"'
@@ -0,0 +1,37 @@
+def test_thai_words_inside_unspaced_text_are_found(database, make_dataset):
+    database.update_datasets([
+        make_dataset('pop', 'ข้อมูลประชากรจังหวัดเชียงใหม่'),
+        make_dataset('rain', 'ปริมาณฝนรายเดือน', organization='กรมอุตุนิยมวิทยา')
+    ])
+    
+    assert database.search_datasets('เชียงใหม่') == ['pop']
+    assert database.search_datasets('ประชากร') == ['pop']
+    assert database.search_datasets('ฝน') == ['rain']
+    assert database.search_datasets('กรมอุตุ') == ['rain']
+    assert database.search_datasets('ประชากร ฝน') == []
+
+def test_title_matches_rank_above_resource_matches(database, make_dataset):
+    database.update_datasets([
+        make_dataset('file-match', 'รายงานประจำปี', description='จำนวนโรงเรียน'),
+        make_dataset('title-match', 'สถิติโรงเรียนรายจังหวัด'),
+        make_dataset('other', 'งบประมาณรายจ่าย')
+    ])
+    
+    assert database.search_datasets('โรงเรียน') == ['title-match', 'file-match']
+    assert database.search_datasets('โรงเรียน', limit=1) == ['title-match']
+
+def test_last_term_matches_as_prefix(database, make_dataset):
+    database.update_datasets([make_dataset('rain', 'Rainfall 2024')])
+    
+    assert database.search_datasets('rain') == ['rain']
+    assert database.search_datasets('rainfall 20') == ['rain']
+    assert database.search_datasets('fall') == []
+
+def test_updated_dataset_is_reindexed(database, make_dataset):
+    database.update_datasets([make_dataset('pop', 'ข้อมูลประชากร')])
+    database.update_datasets([make_dataset('pop', 'ข้อมูลแรงงาน')])
+    
+    assert database.search_datasets('ประชากร') == []
+    assert database.search_datasets('แรงงาน') == ['pop']
+    with database.read() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM datasets_fts").fetchone()[0] == 1
@@ -0,0 +1,55 @@
+def recount(database):
+    """นับยอดของตารางสรุปใหม่จากข้อมูลดิบ"""
+    with database.read() as conn:
+        orgs = {
+            row[0]: {'organization': row[0], 'dataset_count': row[1], 'resource_count': row[2]}
+            for row in conn.execute("""
+                SELECT organization, COUNT(*), SUM(resource_count) FROM datasets GROUP BY organization
+            """)
+        }
+        formats = dict(conn.execute("SELECT format, COUNT(*) FROM dataset_formats GROUP BY format"))
+        rankings = dict(conn.execute("SELECT max_ranking, COUNT(*) FROM datasets GROUP BY max_ranking"))
+    return orgs, formats, rankings
+
+def assert_stats_match_recount(database):
+    orgs, formats, rankings = recount(database)
+    assert {row['organization']: row for row in database.get_org_stats()} == orgs
+    assert database.get_format_counts() == formats
+    assert database.get_ranking_counts() == rankings
+
+def test_stats_follow_incremental_updates(database, make_dataset):
+    database.update_datasets([
+        make_dataset('pop', organization='กรมการปกครอง', formats=('CSV', 'XLSX')),
+        make_dataset('house', organization='กรมการปกครอง', formats=('CSV',)),
+        make_dataset('rain', organization='กรมอุตุนิยมวิทยา', formats=('JSON',))
+    ])
+    assert_stats_match_recount(database)
+    assert database.get_format_counts() == {'CSV': 2, 'JSON': 1, 'XLSX': 1}
+    
+    # ย้ายหน่วยงานและเปลี่ยนประเภทไฟล์: ยอดเดิมต้องถูกหักออกและแถวที่เหลือ 0 ถูกลบ
+    database.update_datasets([make_dataset('rain', organization='กรมการปกครอง', formats=('CSV',))])
+    assert_stats_match_recount(database)
+    assert [row['organization'] for row in database.get_org_stats()] == ['กรมการปกครอง']
+    assert 'JSON' not in database.get_format_counts()
+    
+    with database.read() as conn:
+        resource_id = conn.execute("SELECT id FROM resources WHERE dataset_id = 'pop' LIMIT 1").fetchone()[0]
+    database.update_rankings([{'dataset_id': 'house', 'ranking': 4}, {'resource_id': resource_id, 'ranking': 2}])
+    assert_stats_match_recount(database)
+    assert database.get_ranking_counts() == {0: 1, 2: 1, 4: 1}
+    
+    database.apply_auto_rankings([(resource_id, 'pop', 3)])
+    assert_stats_match_recount(database)
+    
+    # แก้ข้อมูลเดิมซ้ำต้องไม่นับซ้ำ
+    database.update_datasets([make_dataset('house', organization='กรมการปกครอง', formats=('CSV',))])
+    assert_stats_match_recount(database)
+    assert database.get_ranking_counts()[4] == 1
+
+def test_stats_are_cleared_with_database(database, make_dataset):
+    database.update_datasets([make_dataset('pop')])
+    database.clear_database()
+    
+    assert database.get_org_stats() == []
+    assert database.get_format_counts() == {}
+    assert database.get_ranking_counts() == {}
@@ -0,0 +1,64 @@
+from utils.data_utils import search_modified_packages
+
+def package_search_route(packages):
+    """package_search ที่กรอง metadata_modified:[X TO *] และเรียงตามเวลาแล้วตาม id เหมือน Solr"""
+    
+    def solr_time(package):
+        return package['metadata_modified'][:23] + 'Z'
+    
+    def route(method, path, query, headers):
+        if path != '/api/3/action/package_search':
+            return 404, {}, b''
+        matches = sorted(packages, key=lambda package: (solr_time(package), package['id']))
+        fq = query.get('fq')
+        if fq:
+            lower = fq[len('metadata_modified:['):].split(' TO ')[0]
+            matches = [package for package in matches if solr_time(package) >= lower]
+        start, rows = int(query.get('start', 0)), int(query['rows'])
+        return 200, {}, {'success': True, 'result': {'count': len(matches), 'results': matches[start:start + rows]}}
+    
+    return route
+
+def package(package_id, second):
+    return {'id': package_id, 'metadata_modified': f"2024-01-01T00:00:{second:02d}.123456"}
+
+def test_keyset_paging_returns_each_package_once_across_equal_timestamps(stub_server):
+    # หน้าละ 2 รายการ แต่มี 5 packages ที่เวลาเดียวกัน (เกินหนึ่งหน้า)
+    packages = [package(f"same-{i}", 1) for i in range(5)] + [package('later-1', 2), package('later-2', 2), package('last', 3)]
+    server = stub_server(package_search_route(packages))
+    
+    pages = list(search_modified_packages(api_url=f"{server.url}/api/3/action", rows=2))
+    
+    ids = [package['id'] for page in pages for package in page]
+    assert sorted(ids) == sorted(package['id'] for package in packages)
+    assert len(ids) == len(set(ids))
+    assert all(page for page in pages)
+
+def test_keyset_paging_starts_from_watermark(stub_server):
+    packages = [package('old', 1), package('edge-1', 2), package('edge-2', 2), package('new', 3)]
+    server = stub_server(package_search_route(packages))
+    
+    pages = list(search_modified_packages('2024-01-01T00:00:02.123456', api_url=f"{server.url}/api/3/action", rows=2))
+    
+    # ขอบล่างรวมเวลาเดียวกับ watermark (package ที่เวลาเท่ากันอาจยังไม่ถูกซิงค์)
+    assert [package['id'] for page in pages for package in page] == ['edge-1', 'edge-2', 'new']
+    assert server.requests[0][2]['fq'] == 'metadata_modified:[2024-01-01T00:00:02.123Z TO *]'
+
+def test_package_modified_during_sync_is_not_skipped(stub_server):
+    packages = [package(f"p{i}", i) for i in range(1, 7)]
+    route = package_search_route(packages)
+    calls = []
+    
+    def moving_route(method, path, query, headers):
+        calls.append(query)
+        if len(calls) == 2:
+            # p1 ถูกแก้ไขหลังหน้าแรก (ย้ายไปท้ายผลลัพธ์) ซึ่งทำให้การแบ่งหน้าด้วย start ข้าม p3
+            packages[0] = package('p1', 9)
+        return route(method, path, query, headers)
+    
+    server = stub_server(moving_route)
+    
+    ids = [package['id'] for page in search_modified_packages(api_url=f"{server.url}/api/3/action", rows=2) for package in page]
+    
+    assert set(ids) >= {'p2', 'p3', 'p4', 'p5', 'p6'}
+    assert ids.count('p1') == 2
@@ -0,0 +1,47 @@
+import requests
+from utils.url_prober import probe_url, probe_urls
+
+def head_not_allowed_route(method, path, query, headers):
+    """ไม่รองรับ HEAD (405) แต่ตอบ GET แบบ Range ด้วย 206"""
+    if method == 'HEAD':
+        return 405, {'Allow': 'GET'}, b''
+    if headers.get('Range') == 'bytes=0-0':
+        return 206, {'Content-Type': 'text/csv', 'Content-Range': 'bytes 0-0/12345', 'ETag': '"v1"'}, b'a'
+    return 200, {'Content-Type': 'text/csv'}, b'a' * 12345
+
+def test_probe_falls_back_to_range_get(stub_server):
+    server = stub_server(head_not_allowed_route)
+    
+    result = probe_url(f"{server.url}/file.csv", session=requests.Session())
+    
+    assert result['method'] == 'GET'
+    assert result['ok']
+    assert result['status_code'] == 206
+    assert result['content_length'] == 12345
+    assert result['etag'] == '"v1"'
+    assert [(method, headers.get('Range')) for method, _, _, headers in server.requests] == [
+        ('HEAD', None), ('GET', 'bytes=0-0')
+    ]
+
+def test_probe_uses_head_when_supported(stub_server):
+    server = stub_server(lambda method, path, query, headers: (200, {'Content-Type': 'text/csv'}, b'abc'))
+    
+    result = probe_url(f"{server.url}/file.csv", session=requests.Session())
+    
+    assert result['method'] == 'HEAD'
+    assert result['ok']
+    assert [method for method, _, _, _ in server.requests] == ['HEAD']
+
+def test_probe_reports_broken_links(stub_server):
+    def route(method, path, query, headers):
+        return (404, {}, b'') if path == '/gone.csv' else head_not_allowed_route(method, path, query, headers)
+    server = stub_server(route)
+    
+    results = {result['url']: result for result in probe_urls(
+        [{'url': f"{server.url}/gone.csv"}, {'url': f"{server.url}/file.csv"}],
+        max_workers=2
+    )}
+    
+    assert not results[f"{server.url}/gone.csv"]['ok']
+    assert results[f"{server.url}/gone.csv"]['error'] == 'HTTP 404'
+    assert results[f"{server.url}/file.csv"]['ok']
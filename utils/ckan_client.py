@@ -0,0 +1,392 @@
+import bisect
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from .http_cache import get_http_cache
+
+# สถานะที่ควรลองใหม่ (ถูกจำกัดอัตรา หรือเซิร์ฟเวอร์ขัดข้องชั่วคราว)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# ข้อผิดพลาดของการเชื่อมต่อที่ลองใหม่ได้ (ข้อผิดพลาดอื่นของ requests เช่น URL ผิดหรือ redirect วนจะไม่ลองใหม่)
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+# ขอบบนของช่วงเวลาตอบสนองในฮิสโตแกรม (มิลลิวินาที ช่วงสุดท้ายคือมากกว่าค่าสุดท้าย)
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# requests.Session แยกตาม thread เพื่อใช้ connection ซ้ำ
+_http_local = threading.local()
+
+def get_http_session(pool_size=10):
+    """ดึง requests.Session ของ thread ปัจจุบัน (keep-alive + gzip)"""
+    session = getattr(_http_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
+        })
+        _http_local.session = session
+    return session
+
+class CircuitOpenError(RuntimeError):
+    """host ผิดพลาดติดต่อกันหลายครั้งจนวงจรเปิด จึงไม่ส่ง request ชั่วคราว"""
+
+class TokenBucket:
+    """
+    ตัวจำกัดอัตรา request แบบ token bucket ที่ปรับอัตราเองตามการตอบของเซิร์ฟเวอร์ (AIMD)
+    
+    เริ่มเติม token ด้วยอัตรา rate ต่อวินาทีและสะสมได้ไม่เกิน burst ระหว่างที่ request ถูกจำกัดด้วย
+    token (ไม่มี token เหลือ) และสำเร็จ อัตราจะเพิ่มขึ้นเพื่อหาอัตราสูงสุดที่เซิร์ฟเวอร์รับได้ (ไม่เกิน max_rate):
+    ก่อนถูกจำกัดอัตราครั้งแรกจะเพิ่มเป็นสองเท่าทุกวินาที (slow start) หลังจากนั้นเพิ่มประมาณ
+    1 request/วินาทีทุกวินาที เมื่อถูกจำกัดอัตรา (429) อัตราจะลดลงครึ่งหนึ่ง (ไม่ต่ำกว่า min_rate)
+    """
+    
+    def __init__(self, rate, burst=None, min_rate=0.5, max_rate=None):
+        self.max_rate = max(float(max_rate or rate), float(rate))
+        self.min_rate = min(float(min_rate), float(rate))
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.slow_start = True
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now):
+        """เติม token ตามเวลาที่ผ่านไป"""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def acquire(self):
+        """รอจนได้ token หนึ่งอัน และคืนเวลาที่รอ (วินาที)"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+    
+    def penalize(self):
+        """ลดอัตราลงครึ่งหนึ่งเมื่อเซิร์ฟเวอร์ตอบว่าส่ง request เร็วเกินไป"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.slow_start = False
+            self._tokens = min(self._tokens, 0.0)
+    
+    def reward(self):
+        """
+        เพิ่มอัตราเมื่อ request สำเร็จ: 1 ต่อ request ระหว่าง slow start (อัตราเพิ่มเป็นสองเท่าทุกวินาที)
+        และ 1/rate ต่อ request หลังจากนั้น (รวมประมาณ 1 request/วินาทีทุกวินาที)
+        
+        เพิ่มเฉพาะเมื่อ token หมด คืออัตราเป็นตัวจำกัดจริง ถ้า request น้อยกว่าอัตราอยู่แล้ว
+        อัตราจะไม่เพิ่มขึ้นเรื่อย ๆ โดยไม่เคยถูกทดสอบ
+        """
+        with self._lock:
+            if self._tokens < 1:
+                self.rate = min(self.max_rate, self.rate + (1 if self.slow_start else 1 / self.rate))
+
+class CircuitBreaker:
+    """
+    circuit breaker ของ host หนึ่ง
+    
+    เมื่อผิดพลาดติดต่อกันครบ failure_threshold ครั้ง วงจรจะเปิดและปฏิเสธ request ทันทีเป็นเวลา
+    reset_timeout วินาที จากนั้นยอมให้ request ทดสอบผ่านทีละหนึ่ง (half-open) ถ้าสำเร็จวงจรจะปิด
+    """
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    def before_request(self):
+        """ตรวจสอบก่อนส่ง request (raise CircuitOpenError ถ้าวงจรเปิดอยู่)"""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError("วงจรเปิดอยู่เพราะเซิร์ฟเวอร์ผิดพลาดติดต่อกันหลายครั้ง")
+                self.state = 'half_open'
+                self._probing = False
+            if self.state == 'half_open':
+                if self._probing:
+                    raise CircuitOpenError("กำลังทดสอบการเชื่อมต่อกับเซิร์ฟเวอร์อีกครั้ง")
+                self._probing = True
+    
+    def record_success(self):
+        """บันทึก request ที่สำเร็จ (ปิดวงจร)"""
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+    
+    def record_failure(self):
+        """บันทึก request ที่ผิดพลาด (เปิดวงจรเมื่อครบจำนวนที่กำหนดหรือทดสอบไม่ผ่าน)"""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    print(f"⚡ เปิดวงจรหลังผิดพลาดติดต่อกัน {self.failures} ครั้ง")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+class LatencyHistogram:
+    """ฮิสโตแกรมของเวลาตอบสนองตามช่วงใน LATENCY_BUCKETS_MS"""
+    
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, latency_ms):
+        """บันทึกเวลาตอบสนองหนึ่งครั้ง"""
+        with self._lock:
+            self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+            self.total_ms += latency_ms
+    
+    def percentile(self, fraction):
+        """ประมาณค่า percentile จากขอบบนของช่วง (None ถ้ายังไม่มีข้อมูล หรือ inf ถ้าเกินช่วงสุดท้าย)"""
+        total = sum(self.counts)
+        if not total:
+            return None
+        target = fraction * total
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+    
+    def snapshot(self):
+        """สรุปฮิสโตแกรม {'buckets': {ช่วง: จำนวน}, 'count', 'avg_ms', 'p50_ms', 'p95_ms', 'p99_ms'}"""
+        with self._lock:
+            counts = list(self.counts)
+            total_ms = self.total_ms
+        labels = [f"≤{bound}" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        count = sum(counts)
+        return {
+            'buckets': dict(zip(labels, counts)),
+            'count': count,
+            'avg_ms': total_ms / count if count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99)
+        }
+
+class CkanClient:
+    """
+    client ของ CKAN Action API ที่จำกัดอัตรา request, ลองใหม่เมื่อผิดพลาดชั่วคราว และหยุดส่ง request
+    ชั่วคราวเมื่อ host ผิดพลาดติดต่อกัน (circuit breaker) พร้อมเก็บฮิสโตแกรมเวลาตอบสนองของแต่ละ action
+    
+    ใช้ร่วมกันได้หลาย thread (แต่ละ thread มี requests.Session ของตัวเอง)
+    """
+    
+    def __init__(self, api_url, rate=20, max_rate=200, burst=None, max_retries=4, backoff_base=0.5, backoff_max=30,
+                 failure_threshold=5, reset_timeout=30, cache=None):
+        """
+        Args:
+            api_url (str): URL ของ CKAN Action API (เช่น https://data.go.th/api/3/action)
+            rate (float): จำนวน request ต่อวินาทีที่ใช้ตอนเริ่มต้น
+            max_rate (float): เพดานของอัตราที่ปรับเพิ่มได้เมื่อเซิร์ฟเวอร์ไม่จำกัดอัตรา (request/วินาที)
+            burst (int): จำนวน request ที่ส่งติดกันได้ทันที (ค่าเริ่มต้นเท่ากับ rate)
+            max_retries (int): จำนวนครั้งที่ลองใหม่เมื่อได้ 429/5xx หรือเชื่อมต่อไม่ได้
+            backoff_base (float): เวลารอพื้นฐานก่อนลองใหม่ (วินาที เพิ่มเป็นสองเท่าทุกครั้ง)
+            backoff_max (float): เวลารอสูงสุดก่อนลองใหม่ (วินาที)
+            failure_threshold (int): จำนวนครั้งที่ผิดพลาดติดต่อกันก่อนเปิดวงจรของ host
+            reset_timeout (float): เวลาที่วงจรเปิดก่อนทดสอบ host อีกครั้ง (วินาที)
+            cache (HttpCache): cache ของ response (None = ไม่ใช้ cache)
+        """
+        self.api_url = api_url.rstrip('/')
+        self.limiter = TokenBucket(rate, burst, max_rate=max_rate)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.cache = cache
+        self._breakers = {}
+        self._histograms = {}
+        self._counters = dict.fromkeys(('requests', 'retries', 'throttled', 'errors', 'rejected'), 0)
+        self._lock = threading.Lock()
+    
+    def _breaker(self, url):
+        """circuit breaker ของ host ใน URL"""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+    
+    def _histogram(self, url):
+        """ฮิสโตแกรมของ action (ส่วนท้ายของ path ใน URL)"""
+        action = urlsplit(url).path.rsplit('/', 1)[-1]
+        with self._lock:
+            histogram = self._histograms.get(action)
+            if histogram is None:
+                histogram = self._histograms[action] = LatencyHistogram()
+            return histogram
+    
+    def _count(self, **counts):
+        """เพิ่มค่าตัวนับสถิติ"""
+        with self._lock:
+            for key, value in counts.items():
+                self._counters[key] += value
+    
+    def _backoff(self, attempt, response=None):
+        """เวลารอก่อนลองใหม่ครั้งที่ attempt (full jitter หรือตาม Retry-After ของเซิร์ฟเวอร์)"""
+        retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+        if retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    def get(self, url, params=None, headers=None, timeout=10):
+        """
+        ส่ง GET request ผ่านตัวจำกัดอัตรา, circuit breaker และการลองใหม่
+        
+        ใช้แทน requests.Session.get ได้ (HttpCache ส่ง request ผ่านเมธอดนี้)
+        
+        Returns:
+            requests.Response: response สุดท้าย (อาจเป็นสถานะผิดพลาดถ้าลองใหม่ครบแล้ว)
+        
+        Raises:
+            CircuitOpenError: host ผิดพลาดติดต่อกันจนวงจรเปิด
+            requests.RequestException: เชื่อมต่อไม่ได้หลังลองใหม่ครบแล้ว
+        """
+        breaker = self._breaker(url)
+        histogram = self._histogram(url)
+        attempt = 0
+        while True:
+            try:
+                breaker.before_request()
+            except CircuitOpenError:
+                self._count(rejected=1)
+                raise
+            self.limiter.acquire()
+            self._count(requests=1)
+            start = time.perf_counter()
+            try:
+                response = get_http_session().get(url, params=params, headers=headers, timeout=timeout)
+                error = None
+            except requests.RequestException as e:
+                response = None
+                error = e
+            histogram.observe((time.perf_counter() - start) * 1000)
+            
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                self.limiter.reward()
+                return response
+            
+            if response is not None and response.status_code == 429:
+                # ถูกจำกัดอัตรา: ลดอัตราแต่ไม่นับเป็นความผิดพลาดของ host
+                self._count(throttled=1)
+                self.limiter.penalize()
+                breaker.record_success()
+            else:
+                self._count(errors=1)
+                breaker.record_failure()
+            
+            if attempt >= self.max_retries or (error is not None and not isinstance(error, RETRY_ERRORS)):
+                if error is not None:
+                    raise error
+                return response
+            wait = self._backoff(attempt, response)
+            reason = f"HTTP {response.status_code}" if response is not None else type(error).__name__
+            print(f"🔁 {reason} จาก {urlsplit(url).path} ลองใหม่ใน {wait:.1f} วินาที ({attempt + 1}/{self.max_retries})")
+            if response is not None:
+                response.close()
+            self._count(retries=1)
+            time.sleep(wait)
+            attempt += 1
+    
+    def action(self, name, params=None, timeout=10, ttl=None, use_cache=True):
+        """
+        เรียก action ของ CKAN API และคืนค่า result
+        
+        Args:
+            name (str): ชื่อ action เช่น package_show
+            params (dict): พารามิเตอร์ของ action
+            timeout (float): เวลารอสูงสุดต่อ request (วินาที)
+            ttl (float): อายุของ response ใน cache ที่ใช้ได้ทันที (None = ค่าของ cache)
+            use_cache (bool): ผ่าน cache ของ response หรือไม่
+        
+        Raises:
+            ValueError: API ตอบว่าไม่สำเร็จ
+            requests.HTTPError: เซิร์ฟเวอร์ตอบสถานะผิดพลาด
+        """
+        url = f"{self.api_url}/{name}"
+        if use_cache and self.cache is not None:
+            data = self.cache.get_json(url, params=params, ttl=ttl, timeout=timeout, session=self)
+        else:
+            response = self.get(url, params=params, timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+        if not data.get("success"):
+            if use_cache and self.cache is not None:
+                self.cache.invalidate(url, params=params)
+            raise ValueError(f"API {name} ตอบว่าไม่สำเร็จ: {data.get('error')}")
+        return data['result']
+    
+    def package_show(self, package_id, timeout=10, ttl=None):
+        """ดึงข้อมูล package (ผ่าน cache ของ response)"""
+        return self.action('package_show', {'id': package_id}, timeout=timeout, ttl=ttl)
+    
+    def package_search(self, params, timeout=30):
+        """ค้นหา packages หนึ่งหน้า (ไม่ผ่าน cache เพราะผลค้นหาเปลี่ยนตาม watermark ทุกรอบ)"""
+        return self.action('package_search', params, timeout=timeout, use_cache=False)
+    
+    def stats(self):
+        """สถิติของ client: ตัวนับ, อัตราปัจจุบัน, สถานะวงจรของแต่ละ host และฮิสโตแกรมของแต่ละ action"""
+        with self._lock:
+            stats = dict(self._counters)
+            breakers = dict(self._breakers)
+            histograms = dict(self._histograms)
+        stats['rate'] = self.limiter.rate
+        stats['max_rate'] = self.limiter.max_rate
+        stats['circuits'] = {
+            host: {'state': breaker.state, 'failures': breaker.failures}
+            for host, breaker in breakers.items()
+        }
+        stats['latency'] = {action: histogram.snapshot() for action, histogram in histograms.items()}
+        return stats
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_ckan_client(api_url):
+    """
+    ดึง CkanClient ของ api_url ที่ใช้ร่วมกันทั้ง process
+    
+    ตั้งค่าได้ด้วย CKAN_RATE_LIMIT (อัตราเริ่มต้น request/วินาที), CKAN_MAX_RATE (เพดานของอัตรา), CKAN_BURST, CKAN_MAX_RETRIES,
+    CKAN_FAILURE_THRESHOLD และ CKAN_RESET_TIMEOUT
+    """
+    with _clients_lock:
+        client = _clients.get(api_url)
+        if client is None:
+            client = _clients[api_url] = CkanClient(
+                api_url,
+                rate=float(os.getenv("CKAN_RATE_LIMIT", 20)),
+                max_rate=float(os.getenv("CKAN_MAX_RATE", 200)),
+                burst=int(os.getenv("CKAN_BURST", 0)) or None,
+                max_retries=int(os.getenv("CKAN_MAX_RETRIES", 4)),
+                failure_threshold=int(os.getenv("CKAN_FAILURE_THRESHOLD", 5)),
+                reset_timeout=float(os.getenv("CKAN_RESET_TIMEOUT", 30)),
+                cache=get_http_cache()
+            )
+        return client
@@ -1,38 +1,39 @@
 import json
-import requests
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
 import pandas as pd
-from .db_utils import Database
+from .db_utils import Database, DATASET_COLUMNS
+from .url_prober import probe_urls
+from .ckan_client import get_ckan_client
 import os
 
 # สร้าง global database instance
 db = Database()
 
-def init_database():
-    """เตรียมข้อมูลเริ่มต้นถ้ายังไม่มี"""
-    # ตรวจสอบว่าเคยรันแล้วหรือไม่
-    if 'db_initialized' in st.session_state:
-        return True
+# URL ของ CKAN API (เปลี่ยนได้ผ่าน environment เช่น ชี้ไปที่เซิร์ฟเวอร์จำลองตอนทดสอบ)
+CKAN_API_URL = os.getenv("CKAN_API_URL", "https://data.go.th/api/3/action")
 
+def init_database():
+    """เตรียมข้อมูลเริ่มต้นถ้ายังไม่มี (migrate จาก JSON หรือสร้างข้อมูลตัวอย่าง)"""
     print("\n🔄 เริ่มต้นการตรวจสอบฐานข้อมูล...")
-
+    
     has_sqlite = os.path.exists('data/database.sqlite')
     json_files = {
         'datasets': 'data/datasets_info.json',
         'resources': 'data/dataset_files.json'
     }
     has_json = all(os.path.exists(path) for path in json_files.values())
-
+    
     # ตรวจสอบว่ามีข้อมูลใน SQLite หรือไม่
     if has_sqlite:
         try:
-            cursor = db.conn.execute("SELECT COUNT(*) FROM datasets")
-            count = cursor.fetchone()[0]
+            count = db.count_rows('datasets')
             if count > 0:
                 print(f"✅ พบข้อมูลในฐานข้อมูล SQLite แล้ว ({count} รายการ)")
-                st.session_state.db_initialized = True
                 return True
+            # ไฟล์ถูกสร้างตั้งแต่เปิด Database แต่ยังไม่มีข้อมูล ให้เตรียมข้อมูลเหมือนฐานข้อมูลใหม่
+            has_sqlite = False
         except Exception as e:
             print(f"❌ เกิดข้อผิดพลาดในการตรวจสอบฐานข้อมูล: {str(e)}")
             # ถ้าเกิดข้อผิดพลาด ให้ลบไฟล์ database เพื่อสร้างใหม่
@@ -42,35 +43,22 @@ def init_database():
                 has_sqlite = False
             except:
                 pass
-
+    
     # ถ้ามีไฟล์ JSON ให้ migrate ข้อมูลก่อน
     if has_json:
         print("\n📥 พบไฟล์ JSON ครบถ้วน เริ่มการ migrate...")
         
-        # ตรวจสอบจำนวนข้อมูลใน JSON
-        try:
-            with open(json_files['datasets'], 'r', encoding='utf-8') as f:
-                datasets = json.load(f)
-            with open(json_files['resources'], 'r', encoding='utf-8') as f:
-                resources = json.load(f)
-            print(f"📊 พบข้อมูล {len(datasets)} ชุดข้อมูล และ {len(resources)} ทรัพยากร")
-        except Exception as e:
-            print(f"❌ ไม่สามารถอ่านไฟล์ JSON: {str(e)}")
-            datasets = []
-            resources = []
-
-        # ถ้ามีข้อมูลใน JSON ให้ migrate
-        if len(datasets) > 0 and len(resources) > 0:
-            print("🔄 กำลัง migrate ข้อมูล...")
-            if db.migrate_from_json():
+        # migrate แบบ streaming แล้วตรวจสอบจำนวนข้อมูลจากผลการ migrate (ไม่ต้อง parse JSON ซ้ำ)
+        print("🔄 กำลัง migrate ข้อมูล...")
+        if db.migrate_from_json():
+            stats = db.last_migration
+            if stats['datasets'] > 0 and stats['resources'] > 0:
                 print("✅ Migrate ข้อมูลสำเร็จ")
-                st.session_state.db_initialized = True
                 return True
-            else:
-                print("❌ ไม่สามารถ migrate ข้อมูลได้")
-        else:
             print("⚠️ ไม่พบข้อมูลในไฟล์ JSON")
-
+        else:
+            print("❌ ไม่สามารถ migrate ข้อมูลได้")
+    
     # สร้างข้อมูลตัวอย่างเฉพาะเมื่อไม่มีทั้ง SQLite และ JSON
     if not has_sqlite and not has_json:
         print("\n🔄 ไม่พบฐานข้อมูล กำลังสร้างข้อมูลตัวอย่าง...")
@@ -99,146 +87,367 @@ def init_database():
         # บันทึกข้อมูลลง database
         if db.init_sample_data(sample_data):
             print("✅ เตรียมฐานข้อมูลเสร็จสิ้น")
-            st.session_state.db_initialized = True
             return True
         else:
             print("❌ ไม่สามารถสร้างข้อมูลตัวอย่างได้")
             return False
-
+    
     return False
 
-def load_datasets():
-    """โหลดข้อมูลชุดข้อมูล"""
-    # เตรียมข้อมูลเริ่มต้นถ้ายังไม่มี
+@st.cache_resource(show_spinner="🔄 กำลังเตรียมฐานข้อมูล...")
+def _bootstrap_database():
+    """เตรียมฐานข้อมูลครั้งเดียวต่อ process (ถ้าไม่สำเร็จจะ raise เพื่อไม่ให้ cache และลองใหม่ในการ rerun ถัดไป)"""
     if not init_database():
-        st.error("ไม่สามารถเตรียมฐานข้อมูลได้")
-        return None
-    
+        raise RuntimeError("ไม่พบข้อมูลในฐานข้อมูลและไม่สามารถ migrate หรือสร้างข้อมูลตัวอย่างได้")
+    return True
+
+def ensure_database():
+    """เรียกที่ต้นทุกหน้า (หลัง set_page_config) เพื่อให้ deploy ใหม่มีข้อมูลก่อนหน้าอ่านตารางสรุป"""
     try:
-        data = db.get_datasets()
-        # แปลงข้อมูลเป็น DataFrame และเปลี่ยนชื่อคอลัมน์
-        df = pd.DataFrame(data)
-        # ตรวจสอบคอลัมน์ที่มีอยู่
-        print("Columns in DataFrame:", df.columns.tolist())
-        
-        # ตรวจสอบข้อมูลตัวอย่าง
-        print("\nSample data:")
-        print(df.head())
-        
-        # ไม่ต้องเปลี่ยนชื่อคอลัมน์เพราะชื่อตรงกับที่กำหนดใน SQL แล้ว
-        return df
+        _bootstrap_database()
     except Exception as e:
-        print(f"Error loading datasets: {str(e)}")
-        st.error(f"ไม่สามารถอ่านข้อมูลได้: {str(e)}")
-        return None
+        st.error(f"ไม่สามารถเตรียมฐานข้อมูลได้: {str(e)}")
+        st.stop()
 
-def update_dataset(package_id):
-    """อัพเดทข้อมูล dataset"""
+def fetch_package(package_id, api_url=None, timeout=10, ttl=None):
+    """
+    ดึงข้อมูล package จาก CKAN API (package_show) ผ่าน cache ของ response บนดิสก์
+    
+    ถ้าเพิ่งดึงมาไม่เกิน ttl วินาทีจะใช้ข้อมูลเดิมโดยไม่ส่ง request ถ้าเก่ากว่านั้นจะตรวจสอบด้วย
+    ETag/Last-Modified (ttl=None ใช้ค่าของ cache, 0 = ตรวจสอบกับเซิร์ฟเวอร์ทุกครั้ง)
+    request ถูกส่งผ่าน CkanClient ซึ่งจำกัดอัตราและลองใหม่เมื่อผิดพลาดชั่วคราว
+    """
     try:
-        # สร้าง progress bar
-        progress_text = "กำลังอัพเดทข้อมูล..."
-        progress_bar = st.progress(0, text=progress_text)
-        
-        print(f"\n🔄 เริ่มอัพเดทข้อมูลสำหรับ dataset ID: {package_id}")
-        
-        # ขั้นตอนที่ 1: ดึงข้อมูลจาก API
-        progress_bar.progress(0.2, text="กำลังดึงข้อมูลจาก API...")
-        PACKAGE_SHOW_URL = f"https://data.go.th/api/3/action/package_show?id={package_id}"
-        response = requests.get(PACKAGE_SHOW_URL, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if not data.get("success"):
-            progress_bar.empty()
-            print("❌ API ไม่สามารถดึงข้อมูลได้")
-            return "❌ ไม่สามารถดึงข้อมูลจาก API ได้"
-        
-        # ขั้นตอนที่ 2: เตรียมข้อมูลสำหรับอัพเดท
-        progress_bar.progress(0.4, text="กำลังเตรียมข้อมูล...")
-        package = data['result']
-        
-        # เตรียมข้อมูล dataset
-        resources = package.get('resources', [])
-        
-        # รวบรวมประเภทไฟล์และ URL
-        file_types = set()
-        resource_urls = []
-        for resource in resources:
-            if resource.get('format'):
-                file_types.add(resource['format'].upper())
-            if resource.get('url'):
-                resource_urls.append(resource['url'])
-        
-        dataset_data = {
-            'package_id': package_id,
-            'title': package.get('title', ''),
-            'organization': package.get('organization', {}).get('title', ''),
-            'url': package.get('url', '') or (resource_urls[0] if resource_urls else ''),
-            'last_updated': package.get('metadata_modified', ''),
-            'resource_count': len(resources),
-            'file_types': ', '.join(sorted(file_types)) if file_types else ''
-        }
-        
-        # เตรียมข้อมูล resources
-        resources_data = []
-        for resource in resources:
-            file_format = resource.get('format', '').upper()
-            resources_data.append({
-                'dataset_id': package_id,
-                'file_name': resource.get('name', '') or f"ไฟล์ {file_format}" if file_format else 'ไฟล์ไม่ระบุชื่อ',
-                'format': file_format,
-                'url': resource.get('url', ''),
-                'description': resource.get('description', ''),
-                'ranking': 0  # เก็บ ranking เดิมไว้
-            })
-        
-        # ขั้นตอนที่ 3: อัพเดทฐานข้อมูล
-        progress_bar.progress(0.8, text="กำลังบันทึกข้อมูล...")
-        
-        # ดึง ranking เดิมก่อนอัพเดท
-        existing_resources = db.get_dataset_files(package_id)
-        ranking_map = {r['file_name']: r.get('ranking', 0) for r in existing_resources} if existing_resources else {}
-        
-        # อัพเดท ranking ในข้อมูลใหม่
-        for resource in resources_data:
-            resource['ranking'] = ranking_map.get(resource['file_name'], 0)
+        return get_ckan_client(api_url or CKAN_API_URL).package_show(package_id, timeout=timeout, ttl=ttl)
+    except ValueError:
+        raise ValueError(f"API ไม่สามารถดึงข้อมูล {package_id} ได้")
+
+def package_to_records(package_id, package):
+    """แปลงข้อมูล package จาก API เป็น (dataset_data, resources_data) สำหรับบันทึกลงฐานข้อมูล"""
+    resources = package.get('resources', [])
+    
+    # รวบรวมประเภทไฟล์และ URL
+    file_types = set()
+    resource_urls = []
+    for resource in resources:
+        if resource.get('format'):
+            file_types.add(resource['format'].upper())
+        if resource.get('url'):
+            resource_urls.append(resource['url'])
+    
+    dataset_data = {
+        'package_id': package_id,
+        'title': package.get('title', ''),
+        'organization': (package.get('organization') or {}).get('title', ''),
+        'url': package.get('url', '') or (resource_urls[0] if resource_urls else ''),
+        'last_updated': package.get('metadata_modified', ''),
+        'resource_count': len(resources),
+        'file_types': ', '.join(sorted(file_types)) if file_types else ''
+    }
+    
+    # เตรียมข้อมูล resources (ranking เดิมจะถูกคงไว้ตอนบันทึก)
+    resources_data = []
+    for resource in resources:
+        file_format = resource.get('format', '').upper()
+        resources_data.append({
+            'dataset_id': package_id,
+            'file_name': resource.get('name', '') or f"ไฟล์ {file_format}" if file_format else 'ไฟล์ไม่ระบุชื่อ',
+            'format': file_format,
+            'url': resource.get('url', ''),
+            'description': resource.get('description', '')
+        })
+    
+    return dataset_data, resources_data
+
+def harvest_datasets(package_ids, max_workers=8, batch_size=50, api_url=None, progress_callback=None):
+    """
+    ดึงข้อมูลหลาย dataset จาก API พร้อมกันแล้วบันทึกลงฐานข้อมูลเป็นชุด
+    
+    Args:
+        package_ids (list): รายการ package_id ที่ต้องการอัพเดท
+        max_workers (int): จำนวน thread สูงสุดที่ดึงข้อมูลพร้อมกัน
+        batch_size (int): จำนวน dataset ต่อการบันทึกหนึ่งครั้ง
+        api_url (str): URL ของ CKAN API (ค่าเริ่มต้นคือ CKAN_API_URL)
+        progress_callback (callable): เรียกด้วย (จำนวนที่เสร็จ, จำนวนทั้งหมด) ทุกครั้งที่ดึงเสร็จหนึ่งรายการ
+    
+    Returns:
+        dict: สรุปผล {'total', 'updated', 'failed', 'errors', 'elapsed', 'rate'}
+    """
+    package_ids = list(dict.fromkeys(package_ids))
+    total = len(package_ids)
+    stats = {'total': total, 'updated': 0, 'failed': 0, 'errors': {}, 'elapsed': 0.0, 'rate': 0.0}
+    if not total:
+        return stats
+    
+    print(f"\n🚚 เริ่มดึงข้อมูล {total} ชุดข้อมูล ({max_workers} workers, batch {batch_size})")
+    start = time.perf_counter()
+    pending = []
+    
+    def flush():
+        if not pending:
+            return
+        if db.update_datasets(pending):
+            stats['updated'] += len(pending)
+        else:
+            stats['failed'] += len(pending)
+            for dataset_data, _ in pending:
+                stats['errors'][dataset_data['package_id']] = "บันทึกลงฐานข้อมูลไม่สำเร็จ"
+        pending.clear()
+    
+    def fetch(package_id):
+        return package_to_records(package_id, fetch_package(package_id, api_url=api_url))
+    
+    # ดึงข้อมูลใน worker threads ส่วนการเขียนฐานข้อมูลทำใน thread นี้เท่านั้น
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch, package_id): package_id for package_id in package_ids}
+        for done, future in enumerate(as_completed(futures), 1):
+            package_id = futures[future]
+            try:
+                pending.append(future.result())
+            except Exception as e:
+                stats['failed'] += 1
+                stats['errors'][package_id] = str(e)
+                print(f"❌ {package_id}: {str(e)}")
+            if len(pending) >= batch_size:
+                flush()
+            if progress_callback:
+                progress_callback(done, total)
+    flush()
+    
+    stats['elapsed'] = time.perf_counter() - start
+    stats['rate'] = stats['updated'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+    print(f"✅ อัพเดท {stats['updated']}/{total} ชุดข้อมูลใน {stats['elapsed']:.1f} วินาที "
+          f"({stats['rate']:.1f} packages/sec, ผิดพลาด {stats['failed']})")
+    return stats
+
+def _solr_datetime(value):
+    """แปลง metadata_modified ของ CKAN เป็นรูปแบบวันที่ที่ใช้ใน Solr query"""
+    value = value.rstrip('Z')
+    if '.' in value:
+        head, fraction = value.split('.', 1)
+        value = f"{head}.{fraction[:3]}"
+    return f"{value}Z"
+
+def search_modified_packages(since=None, api_url=None, rows=500, timeout=30):
+    """
+    ดึง packages ที่ถูกแก้ไขตั้งแต่ since (เรียงจากเก่าไปใหม่) ผ่าน package_search ทีละหน้า
+    
+    แบ่งหน้าด้วยช่วงเวลา (keyset) แทน start: หน้าถัดไปขอ metadata_modified ตั้งแต่เวลาของ package
+    สุดท้ายในหน้าก่อน แล้วข้าม package ที่ได้ไปแล้ว ถ้า package ที่ได้ไปแล้วถูกแก้ไขระหว่างซิงค์
+    (ย้ายไปท้ายผลลัพธ์) แถวที่เหลือจึงไม่เลื่อนจนตกหล่นเหมือนการใช้ start
+    """
+    client = get_ckan_client(api_url or CKAN_API_URL)
+    lower = _solr_datetime(since) if since else None
+    start = 0
+    # package_id ที่ได้ไปแล้วซึ่งมีเวลาเท่ากับขอบล่างปัจจุบัน (ช่วงเวลารวมขอบล่างจึงได้ซ้ำ)
+    seen = set()
+    while True:
+        params = {'sort': 'metadata_modified asc, id asc', 'rows': rows, 'start': start}
+        if lower:
+            params['fq'] = f"metadata_modified:[{lower} TO *]"
+        result = client.package_search(params, timeout=timeout)
+        results = result.get('results', [])
+        if not results:
+            return
+        packages = [package for package in results if package['id'] not in seen]
+        if packages:
+            yield packages
+        if start + len(results) >= result.get('count', 0):
+            return
         
-        if db.update_dataset(dataset_data, resources_data):
-            # เสร็จสิ้น
-            progress_bar.progress(1.0, text="อัพเดทข้อมูลสำเร็จ!")
-            time.sleep(1)
-            progress_bar.empty()
-            
-            print(f"✅ อัพเดทข้อมูลสำเร็จ: {package_id}")
-            print(f"📁 ประเภทไฟล์: {dataset_data['file_types']}")
-            print(f"🔗 URL: {dataset_data['url']}\n")
-            
-            # เพิ่มการอัพเดท session state
-            if 'last_update' not in st.session_state:
-                st.session_state.last_update = {}
-            st.session_state.last_update[package_id] = time.time()
-            
-            return "✅ อัพเดทข้อมูลสำเร็จ"
+        last = _solr_datetime(results[-1]['metadata_modified'])
+        boundary = {package['id'] for package in results if _solr_datetime(package['metadata_modified']) == last}
+        if last == lower:
+            # ทั้งหน้ามีเวลาเดียวกับขอบล่าง เลื่อนด้วย start ภายในเวลานั้นแทน
+            start += len(results)
+            seen |= boundary
         else:
-            progress_bar.empty()
-            return "❌ ไม่สามารถบันทึกข้อมูลลงฐานข้อมูลได้"
-    except Exception as e:
-        if 'progress_bar' in locals():
-            progress_bar.empty()
-        error_msg = f"เกิดข้อผิดพลาด: {str(e)}"
-        print(f"❌ {error_msg}")
-        return f"❌ {error_msg}"
+            lower, start, seen = last, 0, boundary
+
+def sync_catalog(api_url=None, full=False, rows=500):
+    """
+    ซิงค์เฉพาะ packages ที่เปลี่ยนแปลงหลัง watermark ล่าสุดของแหล่งข้อมูล
+    
+    Args:
+        api_url (str): URL ของ CKAN API (ค่าเริ่มต้นคือ CKAN_API_URL) ใช้เป็นชื่อแหล่งข้อมูลด้วย
+        full (bool): ถ้าเป็น True จะไม่สนใจ watermark และดึงข้อมูลทั้งหมด
+        rows (int): จำนวน packages ต่อหน้าของ package_search
+    
+    Returns:
+        dict: สรุปผล {'source', 'since', 'watermark', 'updated', 'elapsed'}
+    """
+    source = api_url or CKAN_API_URL
+    since = None if full else db.get_sync_watermark(source)
+    stats = {'source': source, 'since': since, 'watermark': since, 'updated': 0, 'elapsed': 0.0}
+    
+    print(f"\n🔄 เริ่มซิงค์ข้อมูลจาก {source} (ตั้งแต่ {since or 'เริ่มต้น'})")
+    start = time.perf_counter()
+    
+    # ผลลัพธ์เรียงตาม metadata_modified จึงเลื่อน watermark ได้หลังบันทึกแต่ละหน้า
+    for packages in search_modified_packages(since, api_url=api_url, rows=rows):
+        items = [package_to_records(package['id'], package) for package in packages]
+        if not db.update_datasets(items):
+            raise RuntimeError("ไม่สามารถบันทึกข้อมูลลงฐานข้อมูลได้")
+        stats['updated'] += len(items)
+        modified = [package['metadata_modified'] for package in packages if package.get('metadata_modified')]
+        if modified:
+            stats['watermark'] = max(modified)
+        db.set_sync_watermark(source, stats['watermark'], stats['updated'])
+    
+    if not stats['updated']:
+        db.set_sync_watermark(source, stats['watermark'], 0)
+    
+    stats['elapsed'] = time.perf_counter() - start
+    print(f"✅ ซิงค์ {stats['updated']} ชุดข้อมูลใน {stats['elapsed']:.1f} วินาที (watermark: {stats['watermark']})")
+    return stats
+
+def check_resource_health(limit=None, max_workers=16, per_host=4, timeout=10, batch_size=200, progress_callback=None):
+    """
+    ตรวจสอบลิงก์ของ resources แล้วบันทึกผลลงตาราง resource_health เป็นชุด
+    
+    การตรวจครั้งถัดไปจะส่ง ETag/Last-Modified ที่บันทึกไว้เป็น conditional request
+    ลิงก์ที่ไม่เปลี่ยนแปลงจึงได้ 304 กลับมาโดยไม่ต้องส่งข้อมูลไฟล์
+    
+    Args:
+        limit (int): จำนวน URL สูงสุดที่ตรวจในรอบนี้ (เลือกที่ยังไม่เคยตรวจหรือตรวจไว้นานที่สุดก่อน)
+        max_workers (int): จำนวน thread สูงสุดที่ตรวจสอบพร้อมกัน
+        per_host (int): จำนวน request พร้อมกันสูงสุดต่อ host
+        timeout (float): เวลารอสูงสุดต่อ request (วินาที)
+        batch_size (int): จำนวนผลตรวจสอบต่อการบันทึกหนึ่งครั้ง
+        progress_callback (callable): เรียกด้วย (จำนวนที่เสร็จ, จำนวนทั้งหมด) ทุกครั้งที่ตรวจเสร็จหนึ่งรายการ
+    
+    Returns:
+        dict: สรุปผล {'total', 'ok', 'broken', 'not_modified', 'pruned', 'elapsed', 'rate'}
+    """
+    entries = db.get_resource_urls_to_probe(limit)
+    total = len(entries)
+    stats = {'total': total, 'ok': 0, 'broken': 0, 'not_modified': 0, 'pruned': 0, 'elapsed': 0.0, 'rate': 0.0}
+    
+    print(f"\n🩺 เริ่มตรวจสอบลิงก์ {total} รายการ ({max_workers} workers, {per_host} ต่อ host)")
+    start = time.perf_counter()
+    pending = []
+    
+    def on_result(result, done, total):
+        stats['ok' if result['ok'] else 'broken'] += 1
+        if result['status_code'] == 304:
+            stats['not_modified'] += 1
+        pending.append(result)
+        # callback ถูกเรียกจาก thread ที่รอผล จึงเขียนฐานข้อมูลเป็นชุดจาก thread เดียว
+        if len(pending) >= batch_size:
+            db.save_resource_health(pending)
+            pending.clear()
+        if progress_callback:
+            progress_callback(done, total)
+    
+    probe_urls(entries, max_workers=max_workers, per_host=per_host, timeout=timeout, progress_callback=on_result)
+    db.save_resource_health(pending)
+    stats['pruned'] = db.prune_resource_health()
+    
+    stats['elapsed'] = time.perf_counter() - start
+    stats['rate'] = total / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+    print(f"✅ ตรวจสอบลิงก์ {total} รายการใน {stats['elapsed']:.1f} วินาที "
+          f"(ใช้งานได้ {stats['ok']}, เสีย {stats['broken']}, ไม่เปลี่ยนแปลง {stats['not_modified']})")
+    return stats
+
+def get_resource_health_summary():
+    """สรุปผลตรวจสอบลิงก์ของ resources"""
+    return db.get_resource_health_summary()
+
+def get_broken_resources(limit=100):
+    """ดึงรายการ resources ที่ลิงก์เสีย"""
+    return db.get_broken_resources(limit)
+
+def refresh_dataset(package_id, api_url=None, progress=None):
+    """
+    ดึงข้อมูล dataset จาก API แล้วบันทึกลงฐานข้อมูล (ไม่ใช้ Streamlit จึงเรียกจาก worker thread ได้)
+    
+    Args:
+        package_id (str): package_id ที่ต้องการอัพเดท
+        api_url (str): URL ของ CKAN API (ค่าเริ่มต้นคือ CKAN_API_URL)
+        progress (callable): เรียกด้วย (สัดส่วน 0-1, ข้อความ) เมื่อเริ่มแต่ละขั้นตอน
+    
+    Returns:
+        dict: ข้อมูลสรุป {'package_id', 'title', 'file_types', 'url'}
+    
+    Raises:
+        ValueError: API ตอบกลับว่าไม่สำเร็จ
+        RuntimeError: บันทึกลงฐานข้อมูลไม่สำเร็จ
+    """
+    report = progress or (lambda fraction, message: None)
+    print(f"\n🔄 เริ่มอัพเดทข้อมูลสำหรับ dataset ID: {package_id}")
+    
+    # ขั้นตอนที่ 1: ดึงข้อมูลจาก API
+    report(0.2, "กำลังดึงข้อมูลจาก API...")
+    package = fetch_package(package_id, api_url=api_url)
+    
+    # ขั้นตอนที่ 2: เตรียมข้อมูลสำหรับอัพเดท
+    report(0.4, "กำลังเตรียมข้อมูล...")
+    dataset_data, resources_data = package_to_records(package_id, package)
+    
+    # ขั้นตอนที่ 3: อัพเดทฐานข้อมูล
+    report(0.8, "กำลังบันทึกข้อมูล...")
+    if not db.update_dataset(dataset_data, resources_data):
+        raise RuntimeError("ไม่สามารถบันทึกข้อมูลลงฐานข้อมูลได้")
+    
+    print(f"✅ อัพเดทข้อมูลสำเร็จ: {package_id}")
+    print(f"📁 ประเภทไฟล์: {dataset_data['file_types']}")
+    print(f"🔗 URL: {dataset_data['url']}\n")
+    return {
+        'package_id': package_id,
+        'title': dataset_data['title'],
+        'file_types': dataset_data['file_types'],
+        'url': dataset_data['url']
+    }
 
 def update_dataset_ranking(dataset_id, ranking):
     """อัพเดท ranking ของ dataset"""
     return db.update_dataset_ranking(dataset_id, ranking)
 
+def update_rankings(edits):
+    """บันทึกการแก้ไข ranking หลายรายการ ({'dataset_id' หรือ 'resource_id', 'ranking'}) ใน transaction เดียว"""
+    return db.update_rankings(edits)
+
 def get_dataset_files(package_id):
     """ดึงข้อมูลไฟล์ของ dataset ที่ระบุ"""
-    db = Database()
     return db.get_dataset_files(package_id)
 
+def get_dataset_file_urls(package_ids):
+    """ดึง URL ของไฟล์แต่ละประเภทของหลาย datasets ในครั้งเดียว"""
+    return db.get_dataset_file_urls(package_ids)
+
 def get_dataset_rankings(package_ids):
     """ดึง ranking สูงสุดของหลาย datasets พร้อมกัน"""
-    db = Database()
-    return db.get_dataset_rankings(package_ids) 
\ No newline at end of file
+    return db.get_dataset_rankings(package_ids) 
+
+def query_datasets(filters=None, sort_column=None, ascending=True, limit=None, offset=0):
+    """ดึงชุดข้อมูลตามตัวกรองเฉพาะหน้าที่ต้องการเป็น DataFrame"""
+    rows = db.query_datasets(filters, sort_column, ascending, limit, offset)
+    return pd.DataFrame(rows, columns=DATASET_COLUMNS)
+
+def count_datasets(filters=None):
+    """นับจำนวนชุดข้อมูลที่ตรงกับตัวกรอง"""
+    return db.count_datasets(filters)
+
+def get_file_types():
+    """ดึงรายการประเภทไฟล์ทั้งหมดที่มีในฐานข้อมูล"""
+    return db.get_file_types()
+
+def get_format_counts(organization=None):
+    """นับจำนวนชุดข้อมูลของแต่ละประเภทไฟล์ (เฉพาะหน่วยงานถ้าระบุ)"""
+    return db.get_format_counts(organization)
+
+def get_org_stats(limit=None):
+    """ดึงจำนวนชุดข้อมูลและทรัพยากรของแต่ละหน่วยงาน (จากตารางสรุป)"""
+    return db.get_org_stats(limit)
+
+def get_ranking_counts():
+    """ดึงจำนวนชุดข้อมูลของแต่ละ ranking (จากตารางสรุป)"""
+    return db.get_ranking_counts()
+
+def search_dataset_ids(query, limit=None):
+    """ค้นหาชุดข้อมูลจากชื่อ หน่วยงาน และไฟล์ (เรียงตามความเกี่ยวข้อง)"""
+    return db.search_datasets(query, limit)
+
+def get_dataset_ids_by_ranking(ranking):
+    """ดึง package_id ของ datasets ที่มี ranking สูงสุดเท่ากับค่าที่ระบุ"""
+    return db.get_dataset_ids_by_ranking(ranking)
@@ -1,30 +1,762 @@
 import sqlite3
 import json
+import time
+from itertools import islice
 from pathlib import Path
 import threading
+import pandas as pd
+from contextlib import contextmanager
+from urllib.parse import quote
+from .text_utils import SEGMENTER, segment_text, build_match_query
+
+def iter_json_array(path, chunk_size=65536):
+    """อ่าน JSON array จากไฟล์ทีละรายการ โดยไม่โหลดทั้งไฟล์เข้าหน่วยความจำ"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        while not buffer:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buffer = chunk.lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} ไม่ใช่ JSON array")
+        pos = 1
+        eof = False
+        while True:
+            # ข้าม whitespace และ comma ระหว่างรายการ
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                # ยืนยันว่ารายการจบจริงด้วยการดู , หรือ ] ถัดไป (ตัวเลขที่อยู่ท้าย buffer อาจยังอ่านไม่ครบ)
+                after = end
+                while after < len(buffer) and buffer[after] in ' \t\r\n':
+                    after += 1
+                if after < len(buffer) and buffer[after] in ',]':
+                    yield item
+                    pos = end
+                    continue
+                if eof:
+                    raise ValueError(f"{path} มีรูปแบบ JSON ไม่ถูกต้อง")
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                if pos >= len(buffer):
+                    raise ValueError(f"{path} จบก่อนปิด JSON array")
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+def count_json_records(path):
+    """นับจำนวนรายการใน JSON array แบบ streaming"""
+    return sum(1 for _ in iter_json_array(path))
+
+def _migration_1_indexes(conn):
+    """เพิ่ม index สำหรับค้นหา resources ตาม dataset และกรอง datasets ตามหน่วยงาน/วันที่"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resources_dataset_ranking ON resources(dataset_id, ranking)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_datasets_organization ON datasets(organization)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_datasets_last_updated ON datasets(last_updated)")
+
+def _migration_2_max_ranking(conn):
+    """เก็บ ranking สูงสุดของ resources ไว้ที่ datasets.max_ranking เพื่อกรองด้วย index"""
+    conn.execute("ALTER TABLE datasets ADD COLUMN max_ranking INTEGER DEFAULT 0")
+    conn.execute(REFRESH_MAX_RANKING_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_datasets_max_ranking ON datasets(max_ranking)")
+
+def _migration_3_search_index(conn):
+    """สร้างดัชนีค้นหา FTS5 ของชื่อชุดข้อมูล หน่วยงาน และไฟล์ (ตัดคำไทยก่อนเก็บ)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS datasets_fts USING fts5(
+            package_id UNINDEXED,
+            title,
+            organization,
+            resources,
+            tokenize = "{SEARCH_TOKENIZER}"
+        )
+    """)
+    _index_search_text(conn)
+
+# tokenizer ของ FTS5 ที่เก็บสระ/วรรณยุกต์ไทย (หมวด M*) ไว้ในคำเดียวกัน
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+
+# น้ำหนัก bm25 ของคอลัมน์ package_id, title, organization, resources
+SEARCH_WEIGHTS = (0.0, 10.0, 3.0, 1.0)
+
+# ข้อความของแต่ละชุดข้อมูลที่ใช้สร้างดัชนีค้นหา (แถวในดัชนีใช้ rowid เดียวกับ datasets)
+SEARCH_SOURCE_SQL = """
+    SELECT
+        d.rowid,
+        d.package_id,
+        d.title,
+        d.organization,
+        (SELECT group_concat(COALESCE(r.file_name, '') || ' ' || COALESCE(r.description, ''), ' ')
+         FROM resources r WHERE r.dataset_id = d.package_id)
+    FROM datasets d
+"""
+
+# จำนวนชุดข้อมูลต่อ batch เมื่อสร้างดัชนีค้นหาใหม่ทั้งหมด (แต่ละ batch เขียนใน transaction สั้น ๆ ของตัวเอง)
+SEARCH_INDEX_BATCH_SIZE = 1000
+
+def _segment_search_rows(rows):
+    """ตัดคำข้อมูลจาก SEARCH_SOURCE_SQL เป็นแถวสำหรับ datasets_fts (ชื่อหน่วยงานซ้ำกันมากจึงตัดครั้งเดียวต่อชื่อ)"""
+    organizations = {}
+    search_rows = []
+    for rowid, package_id, title, organization, resources in rows:
+        if organization not in organizations:
+            organizations[organization] = segment_text(organization)
+        search_rows.append((rowid, package_id, segment_text(title), organizations[organization], segment_text(resources)))
+    return search_rows
+
+def _write_search_rows(conn, search_rows):
+    """แทนที่แถวในดัชนีค้นหาด้วยแถวที่ตัดคำแล้ว (ลบด้วย rowid ก่อนเพิ่มใหม่) โดยไม่ commit"""
+    # ลบด้วย rowid (package_id เป็นคอลัมน์ UNINDEXED ถ้าลบด้วย package_id จะต้อง scan ทั้งดัชนี)
+    conn.executemany("DELETE FROM datasets_fts WHERE rowid = ?", [(row[0],) for row in search_rows])
+    conn.executemany(
+        "INSERT INTO datasets_fts (rowid, package_id, title, organization, resources) VALUES (?, ?, ?, ?, ?)",
+        search_rows
+    )
+
+def _insert_search_rows(conn, rows):
+    """ตัดคำแล้วเพิ่มข้อมูลลงดัชนีค้นหา"""
+    conn.executemany(
+        "INSERT INTO datasets_fts (rowid, package_id, title, organization, resources) VALUES (?, ?, ?, ?, ?)",
+        _segment_search_rows(rows)
+    )
+
+def _index_search_text(conn, package_ids=None):
+    """สร้างข้อมูลในดัชนีค้นหาใหม่ (ทุกชุดข้อมูลถ้าไม่ระบุ package_ids) โดยไม่ commit"""
+    if package_ids is not None:
+        for package_id in package_ids:
+            rows = conn.execute(SEARCH_SOURCE_SQL + " WHERE d.package_id = ?", (package_id,)).fetchall()
+            _write_search_rows(conn, _segment_search_rows(rows))
+        return
+    
+    conn.execute("DELETE FROM datasets_fts")
+    conn.execute(
+        "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('search_segmenter', ?)",
+        (SEGMENTER,)
+    )
+    cursor = conn.execute(SEARCH_SOURCE_SQL)
+    while True:
+        rows = cursor.fetchmany(1000)
+        if not rows:
+            return
+        _insert_search_rows(conn, rows)
+
+def _migration_4_dataset_formats(conn):
+    """แยกประเภทไฟล์ของแต่ละชุดข้อมูลเป็นตาราง dataset_formats เพื่อกรอง/นับด้วย index"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dataset_formats (
+            dataset_id TEXT NOT NULL,
+            format TEXT NOT NULL,
+            PRIMARY KEY (format, dataset_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_dataset_formats_dataset ON dataset_formats(dataset_id)")
+    _index_formats(conn)
+
+def split_file_types(file_types):
+    """แยกข้อความประเภทไฟล์ที่คั่นด้วย comma เป็นรายการประเภทไฟล์ (ตัวพิมพ์ใหญ่ ไม่ซ้ำ)"""
+    return sorted({t.strip().upper() for t in str(file_types or '').split(',') if t.strip()})
+
+def _index_formats(conn, package_ids=None):
+    """สร้างข้อมูลใน dataset_formats ใหม่จาก datasets.file_types (ทุกชุดข้อมูลถ้าไม่ระบุ) โดยไม่ commit"""
+    if package_ids is not None:
+        for package_id in package_ids:
+            conn.execute("DELETE FROM dataset_formats WHERE dataset_id = ?", (package_id,))
+            row = conn.execute("SELECT file_types FROM datasets WHERE package_id = ?", (package_id,)).fetchone()
+            conn.executemany(
+                "INSERT OR IGNORE INTO dataset_formats (dataset_id, format) VALUES (?, ?)",
+                [(package_id, file_format) for file_format in split_file_types(row[0] if row else '')]
+            )
+        return
+    
+    conn.execute("DELETE FROM dataset_formats")
+    cursor = conn.execute("SELECT package_id, file_types FROM datasets")
+    while True:
+        rows = cursor.fetchmany(5000)
+        if not rows:
+            return
+        conn.executemany(
+            "INSERT OR IGNORE INTO dataset_formats (dataset_id, format) VALUES (?, ?)",
+            [
+                (package_id, file_format)
+                for package_id, file_types in rows
+                for file_format in split_file_types(file_types)
+            ]
+        )
+
+def _migration_5_stats(conn):
+    """สร้างตารางสรุปจำนวนตามหน่วยงาน ประเภทไฟล์ และ ranking สำหรับหน้าสรุป/สถิติ"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS org_stats (
+            organization TEXT PRIMARY KEY,
+            dataset_count INTEGER NOT NULL DEFAULT 0,
+            resource_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS format_stats (
+            format TEXT PRIMARY KEY,
+            dataset_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ranking_stats (
+            ranking INTEGER PRIMARY KEY,
+            dataset_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    _rebuild_stats(conn)
+
+# ยอดรวมของแต่ละตารางสรุป คำนวณจาก datasets/dataset_formats ({where} ใช้จำกัดชุดข้อมูล)
+STATS_SOURCE_SQL = {
+    'org_stats': """
+        SELECT COALESCE(organization, ''), ? * COUNT(*), ? * COALESCE(SUM(resource_count), 0)
+        FROM datasets {where}
+        GROUP BY COALESCE(organization, '')
+    """,
+    'format_stats': """
+        SELECT format, ? * COUNT(*)
+        FROM dataset_formats {where}
+        GROUP BY format
+    """,
+    'ranking_stats': """
+        SELECT COALESCE(max_ranking, 0), ? * COUNT(*)
+        FROM datasets {where}
+        GROUP BY COALESCE(max_ranking, 0)
+    """
+}
+
+STATS_UPSERT_SQL = {
+    'org_stats': """
+        INSERT INTO org_stats (organization, dataset_count, resource_count) {source}
+        ON CONFLICT(organization) DO UPDATE SET
+            dataset_count = dataset_count + excluded.dataset_count,
+            resource_count = resource_count + excluded.resource_count
+    """,
+    'format_stats': """
+        INSERT INTO format_stats (format, dataset_count) {source}
+        ON CONFLICT(format) DO UPDATE SET dataset_count = dataset_count + excluded.dataset_count
+    """,
+    'ranking_stats': """
+        INSERT INTO ranking_stats (ranking, dataset_count) {source}
+        ON CONFLICT(ranking) DO UPDATE SET dataset_count = dataset_count + excluded.dataset_count
+    """
+}
+
+STATS_KEY_COLUMNS = {'org_stats': 'package_id', 'format_stats': 'dataset_id', 'ranking_stats': 'package_id'}
+
+def _rebuild_stats(conn):
+    """คำนวณตารางสรุปทั้งหมดใหม่จากข้อมูลปัจจุบัน โดยไม่ commit"""
+    for table, source in STATS_SOURCE_SQL.items():
+        conn.execute(f"DELETE FROM {table}")
+        sign_params = (1,) * source.count('?')
+        conn.execute(STATS_UPSERT_SQL[table].format(source=source.format(where='')), sign_params)
+
+def _adjust_stats(conn, package_ids, sign, tables=tuple(STATS_SOURCE_SQL)):
+    """
+    ปรับตารางสรุปตามข้อมูลปัจจุบันของชุดข้อมูลที่ระบุ โดยไม่ commit
+    
+    เรียกด้วย sign=-1 ก่อนแก้ไขข้อมูลเพื่อหักยอดเดิม และ sign=1 หลังแก้ไขเพื่อบวกยอดใหม่
+    """
+    package_ids = list(package_ids)
+    for table in tables:
+        source = STATS_SOURCE_SQL[table]
+        sign_params = [sign] * source.count('?')
+        for i in range(0, len(package_ids), MAX_QUERY_PARAMS):
+            chunk = package_ids[i:i + MAX_QUERY_PARAMS]
+            where = f"WHERE {STATS_KEY_COLUMNS[table]} IN ({','.join('?' * len(chunk))})"
+            conn.execute(STATS_UPSERT_SQL[table].format(source=source.format(where=where)), sign_params + chunk)
+        conn.execute(f"DELETE FROM {table} WHERE dataset_count <= 0")
+
+def _migration_6_jobs(conn):
+    """สร้างตาราง jobs สำหรับงานเบื้องหลัง (เก็บสถานะ ความคืบหน้า และผลลัพธ์)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            params TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            progress REAL NOT NULL DEFAULT 0,
+            message TEXT,
+            result TEXT,
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            started_at TEXT,
+            finished_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)")
+
+def _migration_7_resource_health(conn):
+    """สร้างตาราง resource_health เก็บผลตรวจสอบลิงก์ของ resources (หนึ่งแถวต่อ URL)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS resource_health (
+            url TEXT PRIMARY KEY,
+            status_code INTEGER,
+            ok INTEGER NOT NULL DEFAULT 0,
+            latency_ms REAL,
+            content_length INTEGER,
+            content_type TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            error TEXT,
+            checked_at TEXT NOT NULL DEFAULT (datetime('now')),
+            changed_at TEXT
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resources_url ON resources(url)")
+
+def _migration_8_ranking_manual(conn):
+    """
+    เพิ่มคอลัมน์ resources.ranking_manual แยก ranking ที่กำหนดเองออกจาก ranking ที่คำนวณอัตโนมัติ
+    
+    ranking ที่มีอยู่ก่อนหน้านี้ทั้งหมดถูกกำหนดด้วยมือ จึงตั้งเป็น manual ทุกรายการที่มีค่า
+    """
+    conn.execute("ALTER TABLE resources ADD COLUMN ranking_manual INTEGER NOT NULL DEFAULT 0")
+    conn.execute("UPDATE resources SET ranking_manual = 1 WHERE ranking > 0")
+
+def _migration_9_search_rowid(conn):
+    """
+    เปลี่ยนแถวในดัชนีค้นหาให้ใช้ rowid เดียวกับ datasets เพื่อลบ/แก้ไขรายชุดข้อมูลด้วย rowid ได้โดยตรง
+    
+    คัดลอกข้อความที่ตัดคำไว้แล้วโดยไม่ต้องตัดคำใหม่
+    """
+    conn.execute("""
+        CREATE TEMP TABLE search_rekey AS
+        SELECT d.rowid AS id, f.package_id, f.title, f.organization, f.resources
+        FROM datasets_fts f JOIN datasets d ON d.package_id = f.package_id
+        GROUP BY d.rowid
+    """)
+    conn.execute("DELETE FROM datasets_fts")
+    conn.execute("""
+        INSERT INTO datasets_fts (rowid, package_id, title, organization, resources)
+        SELECT id, package_id, title, organization, resources FROM search_rekey
+    """)
+    conn.execute("DROP TABLE search_rekey")
+
+def _migration_10_job_heartbeat(conn):
+    """เพิ่ม owner และ heartbeat_at ให้ตาราง jobs เพื่อส่งกลับเข้าคิวเฉพาะงานที่ process เจ้าของหยุดไปแล้ว"""
+    conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+    conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at TEXT")
+
+# คำนวณ max_ranking ใหม่จาก resources (ต่อท้ายด้วย WHERE เพื่อจำกัดชุดข้อมูลได้)
+REFRESH_MAX_RANKING_SQL = """
+    UPDATE datasets SET max_ranking = COALESCE(
+        (SELECT MAX(ranking) FROM resources WHERE resources.dataset_id = datasets.package_id), 0
+    )
+"""
+
+# จำนวน parameter สูงสุดต่อ query (SQLite รุ่นเก่าจำกัดไว้ที่ 999)
+MAX_QUERY_PARAMS = 900
+
+# migration ของ schema เรียงตามลำดับ (ลำดับที่ n จะทำให้ PRAGMA user_version เป็น n)
+SCHEMA_MIGRATIONS = [
+    _migration_1_indexes,
+    _migration_2_max_ranking,
+    _migration_3_search_index,
+    _migration_4_dataset_formats,
+    _migration_5_stats,
+    _migration_6_jobs,
+    _migration_7_resource_health,
+    _migration_8_ranking_manual,
+    _migration_9_search_rowid,
+    _migration_10_job_heartbeat,
+]
+
+# คอลัมน์ของ catalog ที่ get_datasets_frame คืน
+CATALOG_COLUMNS = [
+    'package_id', 'title', 'organization', 'url',
+    'resource_count', 'file_types', 'last_updated'
+]
+
+# คอลัมน์ของ datasets ที่คืนจาก query_datasets
+DATASET_COLUMNS = [
+    'package_id', 'title', 'organization', 'url',
+    'resource_count', 'file_types', 'last_updated', 'max_ranking'
+]
+
+# คอลัมน์ที่อนุญาตให้ใช้เรียงลำดับ (ป้องกันการต่อ SQL จากค่าที่ผู้ใช้ส่งมา)
+SORTABLE_COLUMNS = {
+    'title', 'organization', 'resource_count', 'file_types', 'last_updated', 'max_ranking'
+}
+
+def _like_contains(value):
+    """สร้าง pattern ของ LIKE สำหรับค้นหาข้อความที่มี value อยู่ (escape % และ _)"""
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+def build_dataset_query(filters=None, sort_column=None, ascending=True, limit=None, offset=0):
+    """
+    สร้าง SQL สำหรับดึงชุดข้อมูลตามตัวกรอง พร้อมเรียงลำดับและแบ่งหน้า
+    
+    Args:
+        filters (dict): ตัวกรอง search, organization, org_type, province, file_type, ranking
+            (ค่า None หรือค่าว่างหมายถึงไม่กรอง)
+        sort_column (str): คอลัมน์ที่ใช้เรียงลำดับ (ต้องอยู่ใน SORTABLE_COLUMNS)
+        ascending (bool): เรียงจากน้อยไปมาก
+        limit (int): จำนวนรายการต่อหน้า (None คือทั้งหมด)
+        offset (int): จำนวนรายการที่ข้าม
+    
+    Returns:
+        tuple: (sql, params, count_sql, count_params)
+    """
+    filters = filters or {}
+    joins = []
+    where = []
+    params = []
+    order_by = []
+    
+    if filters.get('search'):
+        match = build_match_query(filters['search'])
+        weights = ', '.join(str(w) for w in SEARCH_WEIGHTS)
+        joins.append(f"""
+            JOIN (
+                SELECT package_id, bm25(datasets_fts, {weights}) AS score
+                FROM datasets_fts
+                WHERE datasets_fts MATCH ?
+            ) AS search ON search.package_id = d.package_id
+        """)
+        params.append(match or '""')
+        order_by.append("search.score")
+    if filters.get('organization'):
+        where.append("d.organization = ?")
+        params.append(filters['organization'])
+    if filters.get('org_type'):
+        where.append("d.organization LIKE ? ESCAPE '\\'")
+        params.append(_like_contains(filters['org_type']))
+    if filters.get('province'):
+        where.append("d.organization = ?")
+        params.append(filters['province'])
+    if filters.get('file_type'):
+        where.append("d.package_id IN (SELECT dataset_id FROM dataset_formats WHERE format = ?)")
+        params.append(filters['file_type'].strip().upper())
+    if filters.get('ranking') is not None:
+        where.append("d.max_ranking = ?")
+        params.append(filters['ranking'])
+    
+    if sort_column:
+        if sort_column not in SORTABLE_COLUMNS:
+            raise ValueError(f"ไม่สามารถเรียงลำดับตามคอลัมน์ {sort_column}")
+        order_by.insert(0, f"d.{sort_column} {'ASC' if ascending else 'DESC'}")
+    # เรียงด้วย rowid ต่อท้ายเพื่อให้ลำดับคงที่ระหว่างหน้า
+    order_by.append("d.rowid")
+    
+    from_sql = "FROM datasets d" + ''.join(joins)
+    if where:
+        from_sql += " WHERE " + " AND ".join(where)
+    
+    columns = ', '.join(f"d.{column}" for column in DATASET_COLUMNS)
+    sql = f"SELECT {columns} {from_sql} ORDER BY {', '.join(order_by)}"
+    count_sql = f"SELECT COUNT(*) {from_sql}"
+    count_params = list(params)
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params += [limit, offset]
+    return sql, params, count_sql, count_params
+
+# ดัชนี ranking ตรวจ generation ในฐานข้อมูลไม่บ่อยกว่านี้ (วินาที) เพื่อรับการแก้ไขจาก process อื่น
+RANKING_INDEX_CHECK_INTERVAL = 5
+
+class RankingIndex:
+    """
+    ดัชนี package_id -> ranking สูงสุดในหน่วยความจำ ใช้ร่วมกันทุก session ใน process
+    
+    การเขียนใน process นี้อัพเดทดัชนีทันทีพร้อม generation ที่ได้จาก transaction
+    ส่วนการแก้ไขจาก process อื่นจะเห็นภายใน check_interval วินาที (การอ่านส่วนใหญ่จึงไม่ต้อง query)
+    """
+    
+    def __init__(self, check_interval=RANKING_INDEX_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._rankings = None
+        self._generation = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+    
+    def get_many(self, package_ids, read_generation, loader):
+        """
+        ดึง ranking ของหลาย dataset จากดัชนี
+        
+        Args:
+            package_ids (iterable): package_id ที่ต้องการ
+            read_generation (callable): อ่าน generation ปัจจุบันของฐานข้อมูล
+            loader (callable): คืน (generation, {package_id: ranking}) ของทุก dataset จากการอ่านครั้งเดียว
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._rankings is not None and now - self._checked_at >= self.check_interval:
+                if read_generation() != self._generation:
+                    self._rankings = None
+                self._checked_at = now
+            if self._rankings is None:
+                self._generation, self._rankings = loader()
+                self._checked_at = now
+            return {package_id: self._rankings.get(package_id, 0) for package_id in package_ids}
+    
+    def update(self, rankings, generation):
+        """อัพเดทค่า ranking ในดัชนีโดยไม่ต้องสร้างใหม่ ถ้าดัชนีตรงกับข้อมูลก่อนการเขียนครั้งนี้"""
+        with self._lock:
+            if self._rankings is not None and self._generation == generation - 1:
+                self._rankings.update(rankings)
+                self._generation = generation
+            else:
+                self._rankings = None
+    
+    def invalidate(self):
+        """ล้างดัชนีเพื่อสร้างใหม่ในครั้งถัดไป (ใช้หลังเปลี่ยนข้อมูลจำนวนมาก)"""
+        with self._lock:
+            self._rankings = None
+
+
+def _read_max_rankings(conn, package_ids):
+    """อ่าน datasets.max_ranking ของหลาย dataset ผ่าน connection ที่ระบุ"""
+    package_ids = list(package_ids)
+    rankings = {}
+    # แบ่ง IN clause เป็นช่วงเพื่อไม่ให้เกินจำนวน parameter ที่ SQLite รองรับ
+    for i in range(0, len(package_ids), MAX_QUERY_PARAMS):
+        chunk = package_ids[i:i + MAX_QUERY_PARAMS]
+        cursor = conn.execute(
+            f"SELECT package_id, max_ranking FROM datasets WHERE package_id IN ({','.join('?' * len(chunk))})",
+            chunk
+        )
+        rankings.update({row[0]: row[1] or 0 for row in cursor.fetchall()})
+    return rankings
+
+def _read_generation(conn):
+    """อ่านค่า generation จาก catalog_meta ผ่าน connection ที่ระบุ"""
+    row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'generation'").fetchone()
+    return int(row[0]) if row else 0
+
+DB_PATH = 'data/database.sqlite'
+
+class ConnectionPool:
+    """
+    จัดการการเชื่อมต่อ SQLite ของไฟล์ฐานข้อมูลหนึ่งไฟล์ (ใช้ร่วมกันทุก session ใน process)
+    
+    ใช้ WAL เพื่อให้การอ่านไม่ต้องรอการเขียน โดยแยกเป็น connection สำหรับเขียนหนึ่งตัว
+    (ใช้ได้ครั้งละหนึ่ง thread) และ connection แบบอ่านอย่างเดียวที่ยืมจาก pool ซึ่งจำกัดจำนวน
+    """
+    
+    def __init__(self, path=DB_PATH, max_readers=8, busy_timeout=5000,
+                 mmap_size=256 * 1024 * 1024, cache_size=-16384, acquire_timeout=30):
+        self.path = path
+        self.max_readers = max_readers
+        self.busy_timeout = busy_timeout
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.acquire_timeout = acquire_timeout
+        self.schema_ready = False
+        self._lock = threading.Lock()
+        self._reader_slots = threading.BoundedSemaphore(max_readers)
+        self._idle_readers = []
+        self._writer = None
+        self._writer_lock = threading.RLock()
+        self._epoch = 0
+        self._stats = {
+            'readers_opened': 0,
+            'readers_in_use': 0,
+            'reader_checkouts': 0,
+            'reader_waits': 0,
+            'reader_wait_ms': 0.0,
+            'writer_checkouts': 0,
+            'writer_waits': 0,
+            'writer_wait_ms': 0.0
+        }
+    
+    def _connect(self, readonly):
+        """เปิด connection ใหม่พร้อมตั้งค่า pragma"""
+        if readonly:
+            uri = f"file:{quote(Path(self.path).resolve().as_posix())}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=self.busy_timeout / 1000,
+                                   check_same_thread=False, isolation_level=None)
+        else:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000,
+                                   check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            # ใน WAL ค่า NORMAL ไม่ทำให้ฐานข้อมูลเสีย แค่อาจเสีย transaction ล่าสุดถ้าเครื่องดับ
+            conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        return conn
+    
+    def _acquire(self, lock, name):
+        """รอ lock/semaphore พร้อมเก็บสถิติการรอ"""
+        if lock.acquire(blocking=False):
+            waited = 0.0
+        else:
+            start = time.perf_counter()
+            if not lock.acquire(timeout=self.acquire_timeout):
+                raise TimeoutError(f"รอ connection สำหรับ{name}นานเกิน {self.acquire_timeout} วินาที")
+            waited = (time.perf_counter() - start) * 1000
+        with self._lock:
+            key = 'reader' if lock is self._reader_slots else 'writer'
+            self._stats[f'{key}_checkouts'] += 1
+            if waited:
+                self._stats[f'{key}_waits'] += 1
+                self._stats[f'{key}_wait_ms'] += waited
+    
+    @contextmanager
+    def reader(self):
+        """ยืม connection แบบอ่านอย่างเดียวจาก pool"""
+        self._acquire(self._reader_slots, 'อ่าน')
+        try:
+            with self._lock:
+                conn = self._idle_readers.pop() if self._idle_readers else None
+                epoch = self._epoch
+                self._stats['readers_in_use'] += 1
+            if conn is None:
+                conn = self._connect(readonly=True)
+                with self._lock:
+                    self._stats['readers_opened'] += 1
+            try:
+                yield conn
+            finally:
+                with self._lock:
+                    self._stats['readers_in_use'] -= 1
+                    # connection ที่ยืมไปก่อน close_all() จะถูกปิดแทนการคืนเข้า pool
+                    keep = epoch == self._epoch
+                    if keep:
+                        self._idle_readers.append(conn)
+                if not keep:
+                    conn.close()
+        finally:
+            self._reader_slots.release()
+    
+    @contextmanager
+    def writer(self):
+        """ยืม connection สำหรับเขียน (ถือ lock ไว้ตลอดการใช้งาน และเรียกซ้อนใน thread เดิมได้)"""
+        self._acquire(self._writer_lock, 'เขียน')
+        try:
+            if self._writer is None:
+                self._writer = self._connect(readonly=False)
+            yield self._writer
+        finally:
+            self._writer_lock.release()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        เปิด transaction สำหรับเขียน (commit เมื่อสำเร็จ / rollback เมื่อผิดพลาด)
+        
+        ถ้าเรียกซ้อนภายใน transaction เดิมของ thread เดียวกัน จะใช้ transaction เดิม
+        """
+        with self.writer() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+    
+    def close_all(self):
+        """ปิดทุก connection (connection ที่กำลังถูกยืมจะถูกปิดเมื่อคืน)"""
+        with self._writer_lock:
+            with self._lock:
+                idle, self._idle_readers = self._idle_readers, []
+                self._epoch += 1
+                self.schema_ready = False
+            for conn in idle:
+                conn.close()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+    
+    def stats(self):
+        """สถิติการใช้งาน pool สำหรับแสดงในหน้าผู้ดูแลระบบ"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['readers_idle'] = len(self._idle_readers)
+        stats['max_readers'] = self.max_readers
+        stats['writer_open'] = self._writer is not None
+        return stats
+
+def increment_counters(conn, table, **counts):
+    """เพิ่มค่าตัวนับในตาราง (key, value) ที่ระบุ (ข้ามตัวนับที่เป็น 0) โดยไม่ commit"""
+    conn.executemany(f"""
+        INSERT INTO {table} (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = value + excluded.value
+    """, [(key, value) for key, value in counts.items() if value])
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path=DB_PATH):
+    """ดึง ConnectionPool ของไฟล์ฐานข้อมูล (หนึ่ง pool ต่อไฟล์ต่อ process)"""
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+_ranking_indexes = {}
+
+def get_ranking_index(path=DB_PATH):
+    """ดึง RankingIndex ของไฟล์ฐานข้อมูล (ใช้ร่วมกันทุก instance ของ Database ใน process)"""
+    with _pools_lock:
+        if path not in _ranking_indexes:
+            _ranking_indexes[path] = RankingIndex()
+        return _ranking_indexes[path]
 
 class Database:
-    def __init__(self):
+    def __init__(self, path=DB_PATH):
         # สร้างโฟลเดอร์ data ถ้ายังไม่มี
-        Path("data").mkdir(exist_ok=True)
-        self._local = threading.local()
-        self._create_tables()
+        Path(path).parent.mkdir(exist_ok=True)
+        self._pool = get_pool(path)
+        self._ranking_index = get_ranking_index(path)
+        self.last_migration = None
+        self._ensure_schema()
+    
+    def _ensure_schema(self):
+        """สร้างตารางและอัพเกรด schema ครั้งแรกที่ใช้ pool (หรือหลังปิดการเชื่อมต่อทั้งหมด)"""
+        if self._pool.schema_ready:
+            return
+        with self._pool.writer() as conn:
+            if not self._pool.schema_ready:
+                self._create_tables(conn)
+                self._pool.schema_ready = True
     
-    @property
-    def conn(self):
-        if not hasattr(self._local, 'conn'):
-            self._local.conn = sqlite3.connect('data/database.sqlite')
-        return self._local.conn
+    @contextmanager
+    def read(self):
+        """ยืม connection แบบอ่านอย่างเดียว"""
+        self._ensure_schema()
+        with self._pool.reader() as conn:
+            yield conn
+    
+    @contextmanager
+    def write(self):
+        """เปิด transaction สำหรับเขียนข้อมูล (commit เมื่อสำเร็จ / rollback เมื่อผิดพลาด)
+        
+        ถ้าเรียกซ้อนภายใน transaction เดิมของ thread เดียวกัน จะใช้ transaction เดิม
+        """
+        self._ensure_schema()
+        with self._pool.transaction() as conn:
+            yield conn
+    
+    def pool_stats(self):
+        """สถิติการใช้งาน connection pool"""
+        return self._pool.stats()
     
     def close(self):
-        """ปิดการเชื่อมต่อ"""
-        if hasattr(self._local, 'conn'):
-            self._local.conn.close()
-            del self._local.conn
+        """ปิดการเชื่อมต่อทั้งหมดของฐานข้อมูลนี้"""
+        self._pool.close_all()
     
-    def _create_tables(self):
+    def _create_tables(self, conn):
         """สร้างตารางในฐานข้อมูล"""
-        conn = sqlite3.connect('data/database.sqlite')
         conn.execute("""
             CREATE TABLE IF NOT EXISTS datasets (
                 package_id TEXT PRIMARY KEY,
@@ -49,187 +781,828 @@ class Database:
                 FOREIGN KEY (dataset_id) REFERENCES datasets(package_id)
             )
         """)
-        conn.commit()
-        conn.close()
+        
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                source TEXT PRIMARY KEY,
+                watermark TEXT,
+                last_synced TEXT,
+                last_count INTEGER DEFAULT 0
+            )
+        """)
+        self._migrate_schema(conn)
+        self._check_search_index(conn)
     
-    def __del__(self):
-        """ปิดการเชื่อมต่อเมื่อ object ถูกทำลาย"""
-        self.close()
+    def _migrate_schema(self, conn):
+        """อัพเกรด schema ของฐานข้อมูลเดิมตาม SCHEMA_MIGRATIONS โดยใช้ PRAGMA user_version"""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(SCHEMA_MIGRATIONS[version:], version + 1):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # ตรวจสอบซ้ำภายใน transaction เผื่อ process อื่น migrate ไปแล้ว
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= number:
+                    conn.rollback()
+                    continue
+                print(f"🔧 อัพเกรด schema ฐานข้อมูลเป็นเวอร์ชัน {number}")
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
     
-    def migrate_from_json(self):
-        """ย้ายข้อมูลจาก JSON เข้า SQLite"""
+    def _check_search_index(self, conn):
+        """สร้างดัชนีค้นหาใหม่ถ้าวิธีตัดคำเปลี่ยนไปจากตอนที่สร้างดัชนี (เช่น เพิ่งติดตั้ง pythainlp)"""
+        row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'search_segmenter'").fetchone()
+        if row and row[0] == SEGMENTER:
+            return
+        print(f"🔧 สร้างดัชนีค้นหาใหม่ด้วยการตัดคำแบบ {SEGMENTER}")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _index_search_text(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def migrate_from_json(self, batch_size=5000, index_search=True):
+        """
+        ย้ายข้อมูลจาก JSON เข้า SQLite (อ่านแบบ streaming และบันทึกใน transaction เดียว)
+        
+        การตัดคำสำหรับดัชนีค้นหาช้ากว่าการบันทึกข้อมูลมาก จึงแยกไปทำหลัง commit ด้วย
+        rebuild_search_index (ทีละ batch) หรือข้ามไปก่อนได้ด้วย index_search=False
+        การรันซ้ำจะแทนที่ resources ของชุดข้อมูลที่นำเข้า ไม่เพิ่มแถวซ้ำ
+        
+        Args:
+            batch_size (int): จำนวนแถวต่อ executemany
+            index_search (bool): สร้างดัชนีค้นหาใหม่ทันทีหลังบันทึกข้อมูล
+        """
         try:
             # ตรวจสอบว่ามีไฟล์ JSON หรือไม่
             json_files = {
                 'datasets': 'data/datasets_info.json',
                 'resources': 'data/dataset_files.json'
             }
-
+            
             for name, path in json_files.items():
                 if not Path(path).exists():
                     print(f"❌ ไม่พบไฟล์ {path}")
                     return False
-
-            # ย้ายข้อมูล datasets
-            with open('data/datasets_info.json', 'r', encoding='utf-8') as f:
-                datasets = json.load(f)
-                for dataset in datasets:
-                    self.conn.execute("""
-                        INSERT OR REPLACE INTO datasets 
-                        (package_id, title, organization, url, resource_count, file_types, last_updated)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        dataset['package_id'],
-                        dataset['title'],
-                        dataset['organization'],
-                        dataset['url'],
-                        dataset['resource_count'],
-                        dataset['file_types'],
-                        dataset['last_updated']
-                    ))
             
-            # ย้ายข้อมูล resources และ rankings
-            with open('data/dataset_files.json', 'r', encoding='utf-8') as f:
-                resources = json.load(f)
+            start = time.perf_counter()
+            
+            with self._pool.writer() as conn:
+                # ปรับ pragma สำหรับการนำเข้าข้อมูลจำนวนมาก (ต้องตั้งก่อนเริ่ม transaction)
+                synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+                conn.execute("PRAGMA synchronous = OFF")
+                conn.execute("PRAGMA temp_store = MEMORY")
+                conn.execute("PRAGMA cache_size = -65536")
+                try:
+                    with self.write() as conn:
+                        # ย้ายข้อมูล datasets (upsert เพื่อคง rowid เดิมซึ่งเป็น key ของแถวในดัชนีค้นหา)
+                        package_ids = []
+                        
+                        def dataset_rows():
+                            for dataset in iter_json_array(json_files['datasets']):
+                                package_ids.append(dataset['package_id'])
+                                yield (
+                                    dataset['package_id'],
+                                    dataset['title'],
+                                    dataset['organization'],
+                                    dataset['url'],
+                                    dataset['resource_count'],
+                                    dataset['file_types'],
+                                    dataset['last_updated']
+                                )
+                        
+                        dataset_count = self._insert_chunks(conn, """
+                            INSERT INTO datasets
+                            (package_id, title, organization, url, resource_count, file_types, last_updated)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                            ON CONFLICT(package_id) DO UPDATE SET
+                                title = excluded.title,
+                                organization = excluded.organization,
+                                url = excluded.url,
+                                resource_count = excluded.resource_count,
+                                file_types = excluded.file_types,
+                                last_updated = excluded.last_updated
+                        """, dataset_rows(), batch_size)
+                        
+                        # ลบ resources เดิมของชุดข้อมูลที่นำเข้า เพื่อให้รันซ้ำแล้วไม่ได้แถวซ้ำ (id เป็น autoincrement)
+                        self._insert_chunks(conn, "DELETE FROM resources WHERE dataset_id = ?", (
+                            (package_id,) for package_id in package_ids
+                        ), batch_size)
+                        
+                        # ย้ายข้อมูล resources และ rankings (ranking ในไฟล์ JSON ถูกกำหนดด้วยมือ)
+                        resource_count = self._insert_chunks(conn, """
+                            INSERT INTO resources
+                            (dataset_id, file_name, format, url, description, ranking, ranking_manual)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """, (
+                            (
+                                resource['dataset_id'],
+                                resource['file_name'],
+                                resource['format'],
+                                resource['url'],
+                                resource.get('description', ''),
+                                resource.get('ranking', 0),
+                                1 if resource.get('ranking') else 0
+                            )
+                            for resource in iter_json_array(json_files['resources'])
+                        ), batch_size)
+                        
+                        self._refresh_max_ranking(conn)
+                        _index_formats(conn)
+                        _rebuild_stats(conn)
+                        # ดัชนีค้นหาไม่ตรงกับข้อมูลจนกว่าจะสร้างใหม่ (ถ้ายังไม่สร้าง จะสร้างเมื่อเปิดฐานข้อมูลครั้งถัดไป)
+                        conn.execute("DELETE FROM catalog_meta WHERE key = 'search_segmenter'")
+                        self._bump_generation(conn)
+                finally:
+                    conn.execute(f"PRAGMA synchronous = {synchronous}")
+                    conn.execute(f"PRAGMA cache_size = {int(self._pool.cache_size)}")
             
-            for resource in resources:
-                ranking = resource.get('ranking', 0)  # ใช้ ranking จาก resource โดยตรง
-                self.conn.execute("""
-                    INSERT OR REPLACE INTO resources 
-                    (dataset_id, file_name, format, url, description, ranking)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    resource['dataset_id'],
-                    resource['file_name'],
-                    resource['format'],
-                    resource['url'],
-                    resource.get('description', ''),
-                    ranking
-                ))
+            self._ranking_index.invalidate()
             
-            self.conn.commit()
+            elapsed = time.perf_counter() - start
+            total = dataset_count + resource_count
+            self.last_migration = {
+                'datasets': dataset_count,
+                'resources': resource_count,
+                'elapsed': elapsed,
+                'rate': total / elapsed if elapsed > 0 else 0.0,
+                'search_elapsed': None
+            }
+            print(f"📊 migrate {dataset_count} ชุดข้อมูล และ {resource_count} ทรัพยากร "
+                  f"ใน {elapsed:.1f} วินาที ({self.last_migration['rate']:,.0f} rows/sec)")
+            
+            if index_search:
+                start = time.perf_counter()
+                self.rebuild_search_index()
+                self.last_migration['search_elapsed'] = time.perf_counter() - start
+                print(f"🔎 สร้างดัชนีค้นหา {dataset_count} ชุดข้อมูล ใน {self.last_migration['search_elapsed']:.1f} วินาที")
             return True
         except Exception as e:
             print(f"Error migrating data: {str(e)}")
             return False
     
+    def rebuild_search_index(self, batch_size=SEARCH_INDEX_BATCH_SIZE):
+        """
+        สร้างดัชนีค้นหาใหม่ทุกชุดข้อมูลทีละ batch เรียงตาม rowid
+        
+        ตัดคำนอก transaction เขียนและบันทึกแต่ละ batch ใน transaction ของตัวเอง
+        การเขียนอื่นจึงไม่ต้องรอจนสร้างเสร็จ และการค้นหาใช้ดัชนีเดิมได้ระหว่างสร้าง
+        
+        Returns:
+            int: จำนวนชุดข้อมูลที่สร้างดัชนี
+        """
+        last_rowid = 0
+        count = 0
+        while True:
+            with self.read() as conn:
+                rows = conn.execute(
+                    SEARCH_SOURCE_SQL + " WHERE d.rowid > ? ORDER BY d.rowid LIMIT ?",
+                    (last_rowid, batch_size)
+                ).fetchall()
+            if not rows:
+                break
+            search_rows = _segment_search_rows(rows)
+            with self.write() as conn:
+                # ข้ามชุดข้อมูลที่ถูกแก้ไขหลังอ่าน (การแก้ไขนั้นสร้างแถวในดัชนีของตัวเองแล้ว)
+                current = set(conn.execute(
+                    SEARCH_SOURCE_SQL + " WHERE d.rowid BETWEEN ? AND ?",
+                    (rows[0][0], rows[-1][0])
+                ).fetchall())
+                _write_search_rows(conn, [
+                    search_row for row, search_row in zip(rows, search_rows) if row in current
+                ])
+            last_rowid = rows[-1][0]
+            count += len(rows)
+        
+        with self.write() as conn:
+            # ลบแถวของชุดข้อมูลที่ไม่มีแล้ว และบันทึกวิธีตัดคำที่ใช้สร้างดัชนี
+            conn.execute("DELETE FROM datasets_fts WHERE rowid NOT IN (SELECT rowid FROM datasets)")
+            conn.execute(
+                "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('search_segmenter', ?)",
+                (SEGMENTER,)
+            )
+        return count
+    
+    def _insert_chunks(self, conn, sql, rows, batch_size):
+        """บันทึกข้อมูลด้วย executemany ทีละ batch_size แถว และคืนจำนวนแถวทั้งหมด"""
+        count = 0
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                return count
+            conn.executemany(sql, chunk)
+            count += len(chunk)
+    
+    def count_rows(self, table):
+        """นับจำนวนแถวของตาราง datasets หรือ resources"""
+        if table not in ('datasets', 'resources'):
+            raise ValueError(f"ไม่รองรับตาราง {table}")
+        with self.read() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    
+    def get_table(self, table):
+        """ดึงข้อมูลทั้งหมดของตาราง datasets หรือ resources เป็น (columns, rows)"""
+        if table not in ('datasets', 'resources'):
+            raise ValueError(f"ไม่รองรับตาราง {table}")
+        with self.read() as conn:
+            cursor = conn.execute(f"SELECT * FROM {table}")
+            return [description[0] for description in cursor.description], cursor.fetchall()
+    
+    def get_dataset_titles(self):
+        """ดึง {package_id: title} ของทุก dataset"""
+        with self.read() as conn:
+            cursor = conn.execute("SELECT package_id, title FROM datasets")
+            return {row[0]: row[1] for row in cursor.fetchall()}
+    
     def get_datasets(self):
         """ดึงข้อมูลทั้งหมดจากตาราง datasets"""
-        cursor = self.conn.execute("""
-            SELECT 
-                package_id,
-                title,
-                organization,
-                url,
-                resource_count,
-                file_types,
-                last_updated
-            FROM datasets
-        """)
-        columns = [description[0] for description in cursor.description]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        with self.read() as conn:
+            cursor = conn.execute("""
+                SELECT
+                    package_id,
+                    title,
+                    organization,
+                    url,
+                    resource_count,
+                    file_types,
+                    last_updated
+                FROM datasets
+            """)
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def get_datasets_frame(self):
+        """ดึงข้อมูลทั้งหมดจากตาราง datasets เป็น DataFrame (สร้างแบบคอลัมน์โดยไม่ผ่าน dict ทีละแถว)"""
+        with self.read() as conn:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(CATALOG_COLUMNS)} FROM datasets",
+                conn
+            )
     
     def get_dataset_files(self, dataset_id):
         """ดึงข้อมูลไฟล์ของ dataset ที่ระบุ"""
-        cursor = self.conn.execute(
-            "SELECT * FROM resources WHERE dataset_id = ?", 
-            (dataset_id,)
-        )
-        columns = [description[0] for description in cursor.description]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        with self.read() as conn:
+            cursor = conn.execute(
+                "SELECT * FROM resources WHERE dataset_id = ?",
+                (dataset_id,)
+            )
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def get_dataset_file_urls(self, dataset_ids):
+        """ดึง URL ของไฟล์แต่ละประเภท ({dataset_id: {FORMAT: url}}) ของหลาย datasets ในครั้งเดียว"""
+        dataset_ids = list(dataset_ids)
+        file_urls = {dataset_id: {} for dataset_id in dataset_ids}
+        with self.read() as conn:
+            for i in range(0, len(dataset_ids), MAX_QUERY_PARAMS):
+                chunk = dataset_ids[i:i + MAX_QUERY_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                cursor = conn.execute(f"""
+                    SELECT dataset_id, UPPER(format), url
+                    FROM resources
+                    WHERE dataset_id IN ({placeholders})
+                      AND format IS NOT NULL AND format != ''
+                      AND url IS NOT NULL AND url != ''
+                    ORDER BY id
+                """, chunk)
+                for dataset_id, file_format, url in cursor.fetchall():
+                    file_urls[dataset_id][file_format] = url
+        return file_urls
     
     def update_dataset_ranking(self, dataset_id, ranking):
         """อัพเดท ranking ของ dataset"""
         try:
-            self.conn.execute(
-                "UPDATE resources SET ranking = ? WHERE dataset_id = ?",
-                (ranking, dataset_id)
-            )
-            self.conn.commit()
+            self.update_rankings([{'dataset_id': dataset_id, 'ranking': ranking}])
             return True
         except Exception as e:
             print(f"Error updating ranking: {str(e)}")
             return False
     
+    def update_rankings(self, edits):
+        """
+        บันทึกการแก้ไข ranking หลายรายการใน transaction เดียว (ranking ที่แก้จะถูกตั้งเป็น manual)
+        
+        แต่ละรายการระบุ dataset_id (ตั้ง ranking ให้ทุกไฟล์ของชุดข้อมูล) หรือ resource_id
+        (ตั้ง ranking เฉพาะไฟล์นั้น) การแก้รายไฟล์จะทำหลังการแก้ทั้งชุดข้อมูลจึงมีผลเหนือกว่า
+        และถ้ามีหลายรายการของชุดข้อมูลหรือไฟล์เดียวกัน รายการหลังสุดจะถูกใช้
+        max_ranking, ตาราง ranking_stats และ generation ถูกอัพเดทใน transaction เดียวกัน
+        
+        Args:
+            edits (list): รายการ dict {'dataset_id' หรือ 'resource_id', 'ranking'}
+        
+        Returns:
+            dict: {'datasets': จำนวนชุดข้อมูลที่ได้รับผลกระทบ, 'resources': จำนวนแถวของไฟล์ที่ถูกบันทึก}
+        """
+        dataset_rankings = {}
+        resource_rankings = {}
+        for edit in edits:
+            ranking = int(edit['ranking'])
+            if ranking not in range(5):
+                raise ValueError(f"ranking ต้องอยู่ระหว่าง 0-4 (ได้ {ranking})")
+            if edit.get('resource_id') is not None:
+                resource_rankings[int(edit['resource_id'])] = ranking
+            elif edit.get('dataset_id') is not None:
+                dataset_rankings[edit['dataset_id']] = ranking
+            else:
+                raise ValueError("ต้องระบุ dataset_id หรือ resource_id")
+        if not dataset_rankings and not resource_rankings:
+            return {'datasets': 0, 'resources': 0}
+        
+        with self.write() as conn:
+            resource_ids = list(resource_rankings)
+            dataset_ids = set(dataset_rankings)
+            for i in range(0, len(resource_ids), MAX_QUERY_PARAMS):
+                chunk = resource_ids[i:i + MAX_QUERY_PARAMS]
+                cursor = conn.execute(
+                    f"SELECT DISTINCT dataset_id FROM resources WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                dataset_ids.update(row[0] for row in cursor.fetchall())
+            dataset_ids = list(dataset_ids)
+            
+            _adjust_stats(conn, dataset_ids, -1, tables=('ranking_stats',))
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE resources SET ranking = ?, ranking_manual = 1 WHERE dataset_id = ?",
+                [(ranking, dataset_id) for dataset_id, ranking in dataset_rankings.items()]
+            )
+            conn.executemany(
+                "UPDATE resources SET ranking = ?, ranking_manual = 1 WHERE id = ?",
+                [(ranking, resource_id) for resource_id, ranking in resource_rankings.items()]
+            )
+            changed = conn.total_changes - before
+            self._refresh_max_rankings(conn, dataset_ids)
+            _adjust_stats(conn, dataset_ids, 1, tables=('ranking_stats',))
+            rankings = _read_max_rankings(conn, dataset_ids)
+            generation = self._bump_generation(conn)
+        self._ranking_index.update(rankings, generation)
+        return {'datasets': len(dataset_ids), 'resources': changed}
+    
+    def _refresh_max_ranking(self, conn, dataset_id=None):
+        """คำนวณ datasets.max_ranking ใหม่ (ทุกชุดข้อมูลถ้าไม่ระบุ dataset_id) โดยไม่ commit"""
+        if dataset_id is None:
+            conn.execute(REFRESH_MAX_RANKING_SQL)
+        else:
+            conn.execute(REFRESH_MAX_RANKING_SQL + " WHERE package_id = ?", (dataset_id,))
+    
+    def _refresh_max_rankings(self, conn, dataset_ids):
+        """คำนวณ datasets.max_ranking ใหม่ของหลายชุดข้อมูล โดยไม่ commit"""
+        dataset_ids = list(dataset_ids)
+        for i in range(0, len(dataset_ids), MAX_QUERY_PARAMS):
+            chunk = dataset_ids[i:i + MAX_QUERY_PARAMS]
+            conn.execute(REFRESH_MAX_RANKING_SQL + f" WHERE package_id IN ({','.join('?' * len(chunk))})", chunk)
+    
+    def get_auto_ranking_frames(self):
+        """
+        ดึงข้อมูลสำหรับคำนวณ ranking อัตโนมัติเป็น DataFrame สองชุด
+        
+        นับช่อง metadata ที่มีค่าใน SQL เพื่อไม่ต้องส่งข้อความยาว ๆ ของทุก resource มาที่ Python
+        ส่วนข้อมูลระดับชุดข้อมูลดึงแยกหนึ่งแถวต่อชุดข้อมูลแล้วค่อยจับคู่ใน pandas
+        
+        Returns:
+            tuple: (resources, datasets)
+                resources: resources ที่ไม่ได้กำหนด ranking เอง คอลัมน์ id, dataset_id, format, ranking,
+                    url_ok (NaN ถ้ายังไม่เคยตรวจลิงก์), filled (จำนวนช่อง file_name/description/url/format ที่มีค่า)
+                datasets: คอลัมน์ package_id, last_updated, filled (จำนวนช่อง title/organization ที่มีค่า)
+        """
+        with self.read() as conn:
+            resources = pd.read_sql_query("""
+                SELECT r.id, r.dataset_id, r.format, r.ranking, h.ok AS url_ok,
+                       (TRIM(COALESCE(r.file_name, '')) != '') + (TRIM(COALESCE(r.description, '')) != '')
+                       + (TRIM(COALESCE(r.url, '')) != '') + (TRIM(COALESCE(r.format, '')) != '') AS filled
+                FROM resources r
+                LEFT JOIN resource_health h ON h.url = r.url
+                WHERE r.ranking_manual = 0
+            """, conn)
+            datasets = pd.read_sql_query("""
+                SELECT package_id, last_updated,
+                       (TRIM(COALESCE(title, '')) != '') + (TRIM(COALESCE(organization, '')) != '') AS filled
+                FROM datasets
+            """, conn)
+        return resources, datasets
+    
+    def apply_auto_rankings(self, updates):
+        """
+        บันทึก ranking ที่คำนวณอัตโนมัติของหลาย resources ใน transaction เดียว
+        
+        ไม่เปลี่ยน resources ที่กำหนด ranking เอง (ranking_manual = 1) และอัพเดท max_ranking,
+        ตาราง ranking_stats และ generation เฉพาะชุดข้อมูลที่ได้รับผลกระทบ
+        
+        Args:
+            updates (list): รายการ tuple (resource_id, dataset_id, ranking)
+        
+        Returns:
+            int: จำนวน resources ที่ ranking เปลี่ยน
+        """
+        # รวม id ตาม ranking ใหม่ เพื่ออัพเดทครั้งละหลายแถวด้วย WHERE id IN (...)
+        by_ranking = {}
+        dataset_ids = set()
+        for resource_id, dataset_id, ranking in updates:
+            by_ranking.setdefault(int(ranking), []).append(resource_id)
+            dataset_ids.add(dataset_id)
+        if not by_ranking:
+            return 0
+        dataset_ids = list(dataset_ids)
+        with self.write() as conn:
+            _adjust_stats(conn, dataset_ids, -1, tables=('ranking_stats',))
+            before = conn.total_changes
+            for ranking, resource_ids in by_ranking.items():
+                for i in range(0, len(resource_ids), MAX_QUERY_PARAMS):
+                    chunk = resource_ids[i:i + MAX_QUERY_PARAMS]
+                    conn.execute(f"""
+                        UPDATE resources SET ranking = ?
+                        WHERE id IN ({','.join('?' * len(chunk))}) AND ranking_manual = 0
+                    """, [ranking] + chunk)
+            changed = conn.total_changes - before
+            self._refresh_max_rankings(conn, dataset_ids)
+            _adjust_stats(conn, dataset_ids, 1, tables=('ranking_stats',))
+            self._bump_generation(conn)
+        self._ranking_index.invalidate()
+        return changed
+    
     def update_dataset(self, dataset_data, resources_data):
         """อัพเดทข้อมูล dataset และ resources"""
+        return self.update_datasets([(dataset_data, resources_data)])
+    
+    def update_datasets(self, items):
+        """อัพเดทข้อมูลหลาย dataset ใน transaction เดียว
+        
+        Args:
+            items (list): รายการ tuple (dataset_data, resources_data)
+        """
         try:
-            # อัพเดทข้อมูล dataset
-            self.conn.execute("""
-                INSERT OR REPLACE INTO datasets 
-                (package_id, title, organization, url, resource_count, file_types, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                dataset_data['package_id'],
-                dataset_data['title'],
-                dataset_data['organization'],
-                dataset_data['url'],
-                dataset_data['resource_count'],
-                dataset_data['file_types'],
-                dataset_data['last_updated']
-            ))
-            
-            # ลบ resources เก่า
-            self.conn.execute(
-                "DELETE FROM resources WHERE dataset_id = ?",
-                (dataset_data['package_id'],)
-            )
-            
-            # เพิ่ม resources ใหม่
-            for resource in resources_data:
-                self.conn.execute("""
-                    INSERT INTO resources 
-                    (dataset_id, file_name, format, url, description)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    resource['dataset_id'],
-                    resource['file_name'],
-                    resource['format'],
-                    resource['url'],
-                    resource.get('description', '')
-                ))
-            
-            self.conn.commit()
+            with self.write() as conn:
+                for dataset_data, resources_data in items:
+                    self._write_dataset(conn, dataset_data, resources_data)
+                rankings = _read_max_rankings(conn, (dataset_data['package_id'] for dataset_data, _ in items))
+                generation = self._bump_generation(conn)
+            self._ranking_index.update(rankings, generation)
             return True
         except Exception as e:
             print(f"Error updating dataset: {str(e)}")
             return False
     
+    def _write_dataset(self, conn, dataset_data, resources_data):
+        """เขียนข้อมูล dataset หนึ่งชุด (ไม่ commit) โดยคง ranking เดิมของแต่ละไฟล์ไว้"""
+        package_id = dataset_data['package_id']
+        
+        # หักยอดของข้อมูลเดิมออกจากตารางสรุป
+        _adjust_stats(conn, [package_id], -1)
+        
+        # ดึง ranking เดิม (และสถานะว่ากำหนดเองหรือไม่) ก่อนลบ resources
+        cursor = conn.execute(
+            "SELECT file_name, ranking, ranking_manual FROM resources WHERE dataset_id = ?",
+            (package_id,)
+        )
+        ranking_map = {row[0]: (row[1] or 0, row[2]) for row in cursor.fetchall()}
+        
+        # อัพเดทข้อมูล dataset (upsert เพื่อคง rowid เดิมซึ่งเป็น key ของแถวในดัชนีค้นหา)
+        conn.execute("""
+            INSERT INTO datasets
+            (package_id, title, organization, url, resource_count, file_types, last_updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(package_id) DO UPDATE SET
+                title = excluded.title,
+                organization = excluded.organization,
+                url = excluded.url,
+                resource_count = excluded.resource_count,
+                file_types = excluded.file_types,
+                last_updated = excluded.last_updated
+        """, (
+            package_id,
+            dataset_data['title'],
+            dataset_data['organization'],
+            dataset_data['url'],
+            dataset_data['resource_count'],
+            dataset_data['file_types'],
+            dataset_data['last_updated']
+        ))
+        
+        # ลบ resources เก่า
+        conn.execute(
+            "DELETE FROM resources WHERE dataset_id = ?",
+            (package_id,)
+        )
+        
+        # เพิ่ม resources ใหม่
+        conn.executemany("""
+            INSERT INTO resources
+            (dataset_id, file_name, format, url, description, ranking, ranking_manual)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (
+                resource['dataset_id'],
+                resource['file_name'],
+                resource['format'],
+                resource['url'],
+                resource.get('description', ''),
+                *((resource['ranking'], 1) if resource.get('ranking') else ranking_map.get(resource['file_name'], (0, 0)))
+            )
+            for resource in resources_data
+        ])
+        self._refresh_max_ranking(conn, package_id)
+        _index_search_text(conn, [package_id])
+        _index_formats(conn, [package_id])
+        _adjust_stats(conn, [package_id], 1)
+    
+    def get_generation(self):
+        """ดึง generation ของข้อมูล (เพิ่มขึ้นทุกครั้งที่มีการเขียนข้อมูล รวมถึง ranking)"""
+        with self.read() as conn:
+            return _read_generation(conn)
+    
+    def _bump_generation(self, conn):
+        """เพิ่ม generation ของข้อมูลภายใน transaction ของการเขียน และคืนค่าใหม่"""
+        conn.execute("""
+            INSERT INTO catalog_meta (key, value) VALUES ('generation', 1)
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+        """)
+        return _read_generation(conn)
+    
+    def create_job(self, kind, params=None):
+        """เพิ่มงานเข้าคิว (สถานะ queued) และคืน id ของงาน"""
+        with self.write() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, params) VALUES (?, ?)",
+                (kind, json.dumps(params or {}, ensure_ascii=False))
+            )
+            return cursor.lastrowid
+    
+    def claim_job(self, job_id, owner=None):
+        """เปลี่ยนสถานะงานจาก queued เป็น running โดย owner (คืน False ถ้างานถูกรับไปแล้ว)"""
+        with self.write() as conn:
+            cursor = conn.execute("""
+                UPDATE jobs SET
+                    status = 'running',
+                    progress = 0,
+                    started_at = datetime('now'),
+                    owner = ?,
+                    heartbeat_at = datetime('now')
+                WHERE id = ? AND status = 'queued'
+            """, (owner, job_id))
+            return cursor.rowcount == 1
+    
+    def heartbeat_jobs(self, owner):
+        """บันทึกว่า owner ยังทำงานที่รับไว้อยู่ (อัพเดท heartbeat_at ของงาน running ทั้งหมดของ owner)"""
+        with self.write() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at = datetime('now') WHERE owner = ? AND status = 'running'",
+                (owner,)
+            )
+    
+    def update_job_progress(self, job_id, progress, message=None):
+        """บันทึกความคืบหน้าของงาน (0-1)"""
+        with self.write() as conn:
+            conn.execute(
+                "UPDATE jobs SET progress = ?, message = COALESCE(?, message) WHERE id = ?",
+                (progress, message, job_id)
+            )
+    
+    def finish_job(self, job_id, status, message=None, result=None):
+        """บันทึกผลของงานที่เสร็จแล้ว (status เป็น done หรือ failed)"""
+        with self.write() as conn:
+            conn.execute("""
+                UPDATE jobs SET
+                    status = ?,
+                    progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END,
+                    message = ?,
+                    result = ?,
+                    finished_at = datetime('now')
+                WHERE id = ?
+            """, (status, status, message, json.dumps(result, ensure_ascii=False, default=str), job_id))
+    
+    def requeue_interrupted_jobs(self, stale_after=60):
+        """
+        ส่งงาน running ที่ไม่มี heartbeat เกิน stale_after วินาที (process เจ้าของหยุดไปแล้ว) กลับเข้าคิว
+        และคืน id ของงานที่รอทั้งหมด
+        
+        งานของ process อื่นที่ยังทำงานอยู่จะมี heartbeat ใหม่เสมอจึงไม่ถูกส่งกลับเข้าคิว
+        """
+        with self.write() as conn:
+            conn.execute("""
+                UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL, heartbeat_at = NULL
+                WHERE status = 'running'
+                AND (heartbeat_at IS NULL OR heartbeat_at < datetime('now', ?))
+            """, (f"-{int(stale_after)} seconds",))
+            return [row[0] for row in conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id")]
+    
+    def get_job(self, job_id):
+        """ดึงข้อมูลงานตาม id"""
+        jobs = self._query_jobs("WHERE id = ?", (job_id,))
+        return jobs[0] if jobs else None
+    
+    def get_jobs(self, limit=50):
+        """ดึงงานล่าสุดเรียงจากใหม่ไปเก่า"""
+        return self._query_jobs("ORDER BY id DESC LIMIT ?", (limit,))
+    
+    def _query_jobs(self, clause, params):
+        """ดึงข้อมูลงานพร้อมแปลง params/result จาก JSON"""
+        with self.read() as conn:
+            cursor = conn.execute(f"SELECT * FROM jobs {clause}", params)
+            columns = [description[0] for description in cursor.description]
+            jobs = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for job in jobs:
+            job['params'] = json.loads(job['params']) if job['params'] else {}
+            job['result'] = json.loads(job['result']) if job['result'] else None
+        return jobs
+    
+    def get_resource_urls_to_probe(self, limit=None):
+        """
+        ดึง URL ของ resources ที่ต้องตรวจสอบ พร้อม ETag/Last-Modified จากการตรวจครั้งก่อน
+        
+        เรียง URL ที่ยังไม่เคยตรวจก่อน แล้วตามด้วย URL ที่ตรวจไว้นานที่สุด
+        
+        Returns:
+            list: [{'url', 'etag', 'last_modified'}, ...]
+        """
+        sql = """
+            SELECT r.url, h.etag, h.last_modified
+            FROM (SELECT DISTINCT url FROM resources WHERE url LIKE 'http%') r
+            LEFT JOIN resource_health h ON h.url = r.url
+            ORDER BY h.checked_at IS NOT NULL, h.checked_at
+        """
+        params = ()
+        if limit:
+            sql += " LIMIT ?"
+            params = (limit,)
+        with self.read() as conn:
+            cursor = conn.execute(sql, params)
+            return [
+                {'url': url, 'etag': etag, 'last_modified': last_modified}
+                for url, etag, last_modified in cursor.fetchall()
+            ]
+    
+    def save_resource_health(self, results):
+        """
+        บันทึกผลตรวจสอบลิงก์หลายรายการใน transaction เดียว
+        
+        ผลที่เป็น 304 (ไม่เปลี่ยนแปลง) จะคง Content-Length/ETag/Last-Modified เดิมไว้
+        """
+        rows = [
+            (
+                result['url'], result['status_code'], 1 if result['ok'] else 0,
+                result['latency_ms'], result['content_length'], result['content_type'],
+                result['etag'], result['last_modified'], result['error'], result['status_code'] == 304
+            )
+            for result in results
+        ]
+        if not rows:
+            return 0
+        with self.write() as conn:
+            conn.executemany("""
+                INSERT INTO resource_health
+                (url, status_code, ok, latency_ms, content_length, content_type,
+                 etag, last_modified, error, checked_at, changed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'),
+                        CASE WHEN ?10 THEN NULL ELSE datetime('now') END)
+                ON CONFLICT(url) DO UPDATE SET
+                    status_code = excluded.status_code,
+                    ok = excluded.ok,
+                    latency_ms = excluded.latency_ms,
+                    content_length = COALESCE(excluded.content_length, content_length),
+                    content_type = COALESCE(excluded.content_type, content_type),
+                    etag = COALESCE(excluded.etag, etag),
+                    last_modified = COALESCE(excluded.last_modified, last_modified),
+                    error = excluded.error,
+                    checked_at = excluded.checked_at,
+                    changed_at = COALESCE(excluded.changed_at, changed_at)
+            """, rows)
+        return len(rows)
+    
+    def prune_resource_health(self):
+        """ลบผลตรวจสอบของ URL ที่ไม่มีใน resources แล้ว"""
+        with self.write() as conn:
+            cursor = conn.execute("""
+                DELETE FROM resource_health
+                WHERE NOT EXISTS (SELECT 1 FROM resources WHERE resources.url = resource_health.url)
+            """)
+            return cursor.rowcount
+    
+    def get_resource_health(self, urls=None):
+        """ดึงผลตรวจสอบลิงก์ ({url: {...}}) ของ URL ที่ระบุ หรือทั้งหมดถ้าไม่ระบุ"""
+        with self.read() as conn:
+            if urls is None:
+                cursor = conn.execute("SELECT * FROM resource_health")
+                columns = [description[0] for description in cursor.description]
+                rows = cursor.fetchall()
+            else:
+                urls = list(urls)
+                rows = []
+                for i in range(0, len(urls), MAX_QUERY_PARAMS):
+                    chunk = urls[i:i + MAX_QUERY_PARAMS]
+                    cursor = conn.execute(
+                        f"SELECT * FROM resource_health WHERE url IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    )
+                    columns = [description[0] for description in cursor.description]
+                    rows.extend(cursor.fetchall())
+        return {row[0]: dict(zip(columns, row)) for row in rows}
+    
+    def get_resource_health_summary(self):
+        """สรุปผลตรวจสอบลิงก์: จำนวน URL ทั้งหมด ที่ตรวจแล้ว ใช้งานได้ เสีย และเวลาตอบสนองเฉลี่ย"""
+        with self.read() as conn:
+            total = conn.execute(
+                "SELECT COUNT(DISTINCT url) FROM resources WHERE url LIKE 'http%'"
+            ).fetchone()[0]
+            checked, ok, latency, last_checked = conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(ok), 0), AVG(CASE WHEN ok THEN latency_ms END), MAX(checked_at)
+                FROM resource_health
+            """).fetchone()
+        return {
+            'total': total,
+            'checked': checked,
+            'ok': ok,
+            'broken': checked - ok,
+            'avg_latency_ms': latency or 0.0,
+            'last_checked': last_checked
+        }
+    
+    def get_broken_resources(self, limit=100):
+        """ดึงรายการ resources ที่ลิงก์เสีย พร้อมชุดข้อมูลที่เป็นเจ้าของ"""
+        with self.read() as conn:
+            cursor = conn.execute("""
+                SELECT r.dataset_id, r.file_name, r.format, h.url, h.status_code, h.error, h.checked_at
+                FROM resource_health h
+                JOIN resources r ON r.url = h.url
+                WHERE h.ok = 0
+                ORDER BY h.checked_at DESC
+                LIMIT ?
+            """, (limit,))
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def get_sync_watermark(self, source):
+        """ดึง metadata_modified ล่าสุดที่ซิงค์แล้วของแหล่งข้อมูล"""
+        with self.read() as conn:
+            cursor = conn.execute(
+                "SELECT watermark FROM sync_state WHERE source = ?",
+                (source,)
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def set_sync_watermark(self, source, watermark, count=0):
+        """บันทึก metadata_modified ล่าสุดที่ซิงค์แล้วของแหล่งข้อมูล"""
+        try:
+            with self.write() as conn:
+                conn.execute("""
+                    INSERT INTO sync_state (source, watermark, last_synced, last_count)
+                    VALUES (?, ?, datetime('now'), ?)
+                    ON CONFLICT(source) DO UPDATE SET
+                        watermark = excluded.watermark,
+                        last_synced = excluded.last_synced,
+                        last_count = excluded.last_count
+                """, (source, watermark, count))
+            return True
+        except Exception as e:
+            print(f"Error saving sync watermark: {str(e)}")
+            return False
+    
     def init_sample_data(self, data):
         """เพิ่มข้อมูลตัวอย่าง"""
         try:
-            # เพิ่มข้อมูล datasets
-            for dataset in data['datasets']:
-                self.conn.execute("""
-                    INSERT OR REPLACE INTO datasets 
-                    (package_id, title, organization, url, resource_count, file_types, last_updated)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    dataset['package_id'],
-                    dataset['title'],
-                    dataset['organization'],
-                    dataset['url'],
-                    dataset['resource_count'],
-                    dataset['file_types'],
-                    dataset['last_updated']
-                ))
-            
-            # เพิ่มข้อมูล resources
-            for resource in data['resources']:
-                self.conn.execute("""
-                    INSERT OR REPLACE INTO resources 
-                    (dataset_id, file_name, format, url, description, ranking)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    resource['dataset_id'],
-                    resource['file_name'],
-                    resource['format'],
-                    resource['url'],
-                    resource['description'],
-                    resource['ranking']
-                ))
-            
-            self.conn.commit()
+            with self.write() as conn:
+                # เพิ่มข้อมูล datasets
+                for dataset in data['datasets']:
+                    conn.execute("""
+                        INSERT OR REPLACE INTO datasets
+                        (package_id, title, organization, url, resource_count, file_types, last_updated)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (
+                        dataset['package_id'],
+                        dataset['title'],
+                        dataset['organization'],
+                        dataset['url'],
+                        dataset['resource_count'],
+                        dataset['file_types'],
+                        dataset['last_updated']
+                    ))
+                
+                # เพิ่มข้อมูล resources
+                for resource in data['resources']:
+                    conn.execute("""
+                        INSERT OR REPLACE INTO resources
+                        (dataset_id, file_name, format, url, description, ranking, ranking_manual)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (
+                        resource['dataset_id'],
+                        resource['file_name'],
+                        resource['format'],
+                        resource['url'],
+                        resource['description'],
+                        resource['ranking'],
+                        1 if resource['ranking'] else 0
+                    ))
+                
+                self._refresh_max_ranking(conn)
+                _index_search_text(conn)
+                _index_formats(conn)
+                _rebuild_stats(conn)
+                self._bump_generation(conn)
+            self._ranking_index.invalidate()
             return True
         except Exception as e:
             print(f"Error initializing sample data: {str(e)}")
@@ -238,28 +1611,135 @@ class Database:
     def clear_database(self):
         """ล้างข้อมูลทั้งหมดในฐานข้อมูล"""
         try:
-            self.conn.execute("DELETE FROM resources")
-            self.conn.execute("DELETE FROM datasets")
-            self.conn.commit()
+            with self.write() as conn:
+                conn.execute("DELETE FROM resources")
+                conn.execute("DELETE FROM datasets")
+                conn.execute("DELETE FROM datasets_fts")
+                conn.execute("DELETE FROM dataset_formats")
+                conn.execute("DELETE FROM resource_health")
+                for table in STATS_SOURCE_SQL:
+                    conn.execute(f"DELETE FROM {table}")
+                self._bump_generation(conn)
+            self._ranking_index.invalidate()
             return True
         except Exception as e:
             print(f"Error clearing database: {str(e)}")
             return False
     
-    def get_dataset_rankings(self, package_ids):
-        """ดึง ranking สูงสุดของหลาย datasets พร้อมกัน"""
+    def query_datasets(self, filters=None, sort_column=None, ascending=True, limit=None, offset=0):
+        """ดึงชุดข้อมูลตามตัวกรอง เรียงลำดับ และแบ่งหน้าใน SQL"""
+        sql, params, _, _ = build_dataset_query(filters, sort_column, ascending, limit, offset)
         try:
-            # สร้าง placeholders สำหรับ IN clause
-            placeholders = ','.join('?' * len(package_ids))
-            cursor = self.conn.execute(f"""
-                SELECT dataset_id, MAX(ranking) as max_ranking
-                FROM resources
-                WHERE dataset_id IN ({placeholders})
-                GROUP BY dataset_id
-            """, package_ids)
-            
-            # สร้าง dictionary ของ package_id -> ranking
+            with self.read() as conn:
+                cursor = conn.execute(sql, params)
+                columns = [description[0] for description in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except sqlite3.OperationalError as e:
+            print(f"Error querying datasets: {str(e)}")
+            return []
+    
+    def count_datasets(self, filters=None):
+        """นับจำนวนชุดข้อมูลที่ตรงกับตัวกรอง"""
+        _, _, count_sql, count_params = build_dataset_query(filters)
+        try:
+            with self.read() as conn:
+                return conn.execute(count_sql, count_params).fetchone()[0]
+        except sqlite3.OperationalError as e:
+            print(f"Error counting datasets: {str(e)}")
+            return 0
+    
+    def get_file_types(self):
+        """ดึงรายการประเภทไฟล์ทั้งหมดที่มีในฐานข้อมูล"""
+        with self.read() as conn:
+            cursor = conn.execute("SELECT DISTINCT format FROM dataset_formats ORDER BY format")
+            return [row[0] for row in cursor.fetchall()]
+    
+    def get_format_counts(self, organization=None):
+        """นับจำนวนชุดข้อมูลของแต่ละประเภทไฟล์ (เฉพาะหน่วยงานถ้าระบุ) เรียงจากมากไปน้อย"""
+        with self.read() as conn:
+            if organization is None:
+                cursor = conn.execute("""
+                    SELECT format, dataset_count
+                    FROM format_stats
+                    ORDER BY dataset_count DESC, format
+                """)
+            else:
+                cursor = conn.execute("""
+                    SELECT f.format, COUNT(*) AS dataset_count
+                    FROM dataset_formats f
+                    JOIN datasets d ON d.package_id = f.dataset_id
+                    WHERE d.organization = ?
+                    GROUP BY f.format
+                    ORDER BY dataset_count DESC, f.format
+                """, (organization,))
             return {row[0]: row[1] for row in cursor.fetchall()}
+    
+    def get_org_stats(self, limit=None):
+        """ดึงจำนวนชุดข้อมูลและทรัพยากรของแต่ละหน่วยงานจากตารางสรุป เรียงจากมากไปน้อย"""
+        sql = """
+            SELECT organization, dataset_count, resource_count
+            FROM org_stats
+            ORDER BY dataset_count DESC, organization
+        """
+        params = []
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.read() as conn:
+            cursor = conn.execute(sql, params)
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def get_ranking_counts(self):
+        """ดึงจำนวนชุดข้อมูลของแต่ละ ranking จากตารางสรุป"""
+        with self.read() as conn:
+            cursor = conn.execute("SELECT ranking, dataset_count FROM ranking_stats ORDER BY ranking")
+            return {row[0]: row[1] for row in cursor.fetchall()}
+    
+    def search_datasets(self, query, limit=None):
+        """ค้นหาชุดข้อมูลด้วยดัชนี FTS5 และคืน package_id เรียงตามคะแนน BM25"""
+        match = build_match_query(query)
+        if not match:
+            return []
+        weights = ', '.join(str(w) for w in SEARCH_WEIGHTS)
+        sql = f"""
+            SELECT package_id
+            FROM datasets_fts
+            WHERE datasets_fts MATCH ?
+            ORDER BY bm25(datasets_fts, {weights})
+        """
+        params = [match]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        try:
+            with self.read() as conn:
+                return [row[0] for row in conn.execute(sql, params).fetchall()]
+        except sqlite3.OperationalError as e:
+            print(f"Error searching datasets: {str(e)}")
+            return []
+    
+    def get_dataset_rankings(self, package_ids):
+        """ดึง ranking สูงสุดของหลาย datasets พร้อมกันจากดัชนีในหน่วยความจำ"""
+        try:
+            return self._ranking_index.get_many(package_ids, self.get_generation, self._load_rankings)
         except Exception as e:
             print(f"Error getting dataset rankings: {str(e)}")
-            return {} 
\ No newline at end of file
+            return {}
+    
+    def get_dataset_ids_by_ranking(self, ranking):
+        """ดึง package_id ของ datasets ที่มี ranking สูงสุดเท่ากับค่าที่ระบุ"""
+        with self.read() as conn:
+            cursor = conn.execute(
+                "SELECT package_id FROM datasets WHERE max_ranking = ?",
+                (ranking,)
+            )
+            return [row[0] for row in cursor.fetchall()]
+    
+    def _load_rankings(self):
+        """โหลด ranking สูงสุดของทุก dataset พร้อม generation ที่อ่านใน transaction เดียวกัน"""
+        with self.read() as conn:
+            # อ่าน generation ก่อน ถ้ามีการเขียนแทรกระหว่างนี้ ดัชนีจะถูกสร้างใหม่เมื่อตรวจครั้งถัดไป
+            generation = _read_generation(conn)
+            cursor = conn.execute("SELECT package_id, max_ranking FROM datasets")
+            return generation, {row[0]: row[1] or 0 for row in cursor.fetchall()}
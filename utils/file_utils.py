@@ -1,111 +1,71 @@
-import json
 import streamlit as st
-from utils.data_utils import get_dataset_files
+
+# กำหนดสีและไอคอนสำหรับแต่ละประเภทไฟล์
+FILE_TYPE_STYLES = {
+    'CSV': {'color': '#28a745', 'icon': '📊'},
+    'JSON': {'color': '#ffc107', 'icon': '📝'},
+    'XML': {'color': '#17a2b8', 'icon': '📋'},
+    'XLS': {'color': '#28a745', 'icon': '📗'},
+    'XLSX': {'color': '#28a745', 'icon': '📗'},
+    'PDF': {'color': '#dc3545', 'icon': '📕'},
+    'DOC': {'color': '#007bff', 'icon': '📘'},
+    'DOCX': {'color': '#007bff', 'icon': '📘'},
+    'ZIP': {'color': '#6c757d', 'icon': '📦'},
+    'RAR': {'color': '#6c757d', 'icon': '📦'},
+    'TXT': {'color': '#6c757d', 'icon': '📄'},
+    'HTML': {'color': '#e83e8c', 'icon': '🌐'},
+    'KML': {'color': '#20c997', 'icon': '🗺️'},
+    'KMZ': {'color': '#20c997', 'icon': '🗺️'},
+    'SHP': {'color': '#6f42c1', 'icon': '🗺️'},
+    'GDB': {'color': '#6f42c1', 'icon': '🗺️'},
+    'GEOJSON': {'color': '#20c997', 'icon': '🗺️'},
+    'SQL': {'color': '#fd7e14', 'icon': '💾'},
+    'MDB': {'color': '#fd7e14', 'icon': '💾'},
+    'ACCDB': {'color': '#fd7e14', 'icon': '💾'},
+    'ODS': {'color': '#28a745', 'icon': '📊'},
+    'ODB': {'color': '#fd7e14', 'icon': '💾'},
+    'ODT': {'color': '#007bff', 'icon': '📘'},
+    'JPG': {'color': '#e83e8c', 'icon': '🖼️'},
+    'JPEG': {'color': '#e83e8c', 'icon': '🖼️'},
+    'PNG': {'color': '#e83e8c', 'icon': '🖼️'},
+    'GIF': {'color': '#e83e8c', 'icon': '🖼️'},
+    'SVG': {'color': '#e83e8c', 'icon': '🖼️'},
+    'MP4': {'color': '#6f42c1', 'icon': '🎥'},
+    'MP3': {'color': '#6f42c1', 'icon': '🎵'},
+    'WAV': {'color': '#6f42c1', 'icon': '🎵'}
+}
 
 def get_file_type_icon(file_type):
     """แปลงประเภทไฟล์เป็นไอคอน"""
-    icon_map = {
-        'PDF': '📄',
-        'JSON': '📋',
-        'CSV': '📊',
-        'XLSX': '📑',
-        'XLS': '📑',
-        'DOC': '📝',
-        'DOCX': '📝',
-        'XML': '📰',
-        'ZIP': '📦',
-        'RAR': '📦',
-        'TXT': '📝',
-    }
-    return icon_map.get(file_type.upper(), '📎')
+    return FILE_TYPE_STYLES.get(file_type.upper(), {'icon': '📎'})['icon']
 
-def format_file_types(row):
-    """จัดรูปแบบการแสดงผลประเภทไฟล์"""
-    if not row.get('ประเภทไฟล์'):
-        return ""
+def build_format_link_columns(package_ids, file_urls):
+    """
+    สร้างคอลัมน์ลิงก์ดาวน์โหลดแยกตามประเภทไฟล์สำหรับตารางชุดข้อมูล
+    
+    Args:
+        package_ids (list): package_id ของแต่ละแถวในตาราง
+        file_urls (dict): {package_id: {FORMAT: url}} จาก get_dataset_file_urls
     
-    # กำหนดสีและไอคอนสำหรับแต่ละประเภทไฟล์
-    file_type_styles = {
-        'CSV': {'color': '#28a745', 'icon': '📊'},
-        'JSON': {'color': '#ffc107', 'icon': '📝'},
-        'XML': {'color': '#17a2b8', 'icon': '📋'},
-        'XLS': {'color': '#28a745', 'icon': '📗'},
-        'XLSX': {'color': '#28a745', 'icon': '📗'},
-        'PDF': {'color': '#dc3545', 'icon': '📕'},
-        'DOC': {'color': '#007bff', 'icon': '📘'},
-        'DOCX': {'color': '#007bff', 'icon': '📘'},
-        'ZIP': {'color': '#6c757d', 'icon': '📦'},
-        'RAR': {'color': '#6c757d', 'icon': '📦'},
-        'TXT': {'color': '#6c757d', 'icon': '📄'},
-        'HTML': {'color': '#e83e8c', 'icon': '🌐'},
-        'KML': {'color': '#20c997', 'icon': '🗺️'},
-        'KMZ': {'color': '#20c997', 'icon': '🗺️'},
-        'SHP': {'color': '#6f42c1', 'icon': '🗺️'},
-        'GDB': {'color': '#6f42c1', 'icon': '🗺️'},
-        'GEOJSON': {'color': '#20c997', 'icon': '🗺️'},
-        'SQL': {'color': '#fd7e14', 'icon': '💾'},
-        'MDB': {'color': '#fd7e14', 'icon': '💾'},
-        'ACCDB': {'color': '#fd7e14', 'icon': '💾'},
-        'ODS': {'color': '#28a745', 'icon': '📊'},
-        'ODB': {'color': '#fd7e14', 'icon': '💾'},
-        'ODT': {'color': '#007bff', 'icon': '📘'},
-        'JPG': {'color': '#e83e8c', 'icon': '🖼️'},
-        'JPEG': {'color': '#e83e8c', 'icon': '🖼️'},
-        'PNG': {'color': '#e83e8c', 'icon': '🖼️'},
-        'GIF': {'color': '#e83e8c', 'icon': '🖼️'},
-        'SVG': {'color': '#e83e8c', 'icon': '🖼️'},
-        'MP4': {'color': '#6f42c1', 'icon': '🎥'},
-        'MP3': {'color': '#6f42c1', 'icon': '🎵'},
-        'WAV': {'color': '#6f42c1', 'icon': '🎵'}
-    }
+    Returns:
+        tuple: (dict ของคอลัมน์ {ชื่อคอลัมน์: รายการ URL}, column_config ของคอลัมน์เหล่านั้น)
+            เรียงประเภทไฟล์ที่พบบ่อยในหน้านี้ก่อน
+    """
+    counts = {}
+    for urls in file_urls.values():
+        for file_type in urls:
+            counts[file_type] = counts.get(file_type, 0) + 1
+    file_types = sorted(counts, key=lambda file_type: (-counts[file_type], file_type))
     
-    try:
-        # ดึงข้อมูลไฟล์ของ dataset นี้
-        dataset_files = get_dataset_files(row['package_id'])
-        file_urls = {f['format'].upper(): f['url'] for f in dataset_files if f.get('format') and f.get('url')}
-        
-        # แยกประเภทไฟล์และสร้าง HTML
-        file_types = [t.strip().upper() for t in str(row['ประเภทไฟล์']).split(',')]
-        formatted_types = []
-        
-        for file_type in file_types:
-            if not file_type:  # ข้ามถ้าเป็นค่าว่าง
-                continue
-                
-            style = file_type_styles.get(file_type, {'color': '#6c757d', 'icon': '📄'})
-            url = file_urls.get(file_type, '')
-            
-            if url:
-                formatted_types.append(
-                    f"""<a href="{url}" target="_blank" style="text-decoration: none;">
-                        <span style="
-                            display: inline-block;
-                            padding: 2px 8px;
-                            margin: 2px;
-                            border-radius: 12px;
-                            background-color: {style['color']};
-                            color: white;
-                            font-size: 0.8em;
-                            white-space: nowrap;
-                            cursor: pointer;
-                        ">{style['icon']} {file_type}</span>
-                    </a>"""
-                )
-            else:
-                formatted_types.append(
-                    f"""<span style="
-                        display: inline-block;
-                        padding: 2px 8px;
-                        margin: 2px;
-                        border-radius: 12px;
-                        background-color: {style['color']};
-                        color: white;
-                        font-size: 0.8em;
-                        white-space: nowrap;
-                    ">{style['icon']} {file_type}</span>"""
-                )
-        
-        return ' '.join(formatted_types)
-    except Exception as e:
-        print(f"Error in format_file_types: {str(e)}")
-        return ""  # คืนค่าว่างถ้าเกิดข้อผิดพลาด 
\ No newline at end of file
+    columns = {}
+    column_config = {}
+    for file_type in file_types:
+        column = f"format_{file_type}"
+        columns[column] = [file_urls.get(package_id, {}).get(file_type) for package_id in package_ids]
+        column_config[column] = st.column_config.LinkColumn(
+            file_type,
+            display_text=f"{get_file_type_icon(file_type)} {file_type}",
+            help=f"ดาวน์โหลดไฟล์ {file_type}",
+            width="small"
+        )
+    return columns, column_config
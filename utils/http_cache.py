@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+import requests
+from .db_utils import get_pool, increment_counters
+
+# ไฟล์ SQLite ที่เก็บ response ของ CKAN API (แยกจากฐานข้อมูลหลัก)
+HTTP_CACHE_PATH = Path('data/http_cache.sqlite')
+
+# ขนาดรวมสูงสุดของ response ที่เก็บไว้ (เกินแล้วจะลบรายการที่ไม่ได้ใช้นานที่สุดก่อน)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# ถ้าเก็บ response ไว้ไม่เกินกี่วินาทีให้ใช้ได้ทันทีโดยไม่ต้องถามเซิร์ฟเวอร์
+DEFAULT_TTL = 60
+
+# ตัวนับสถิติที่เก็บในตาราง http_cache_stats (size_bytes คือขนาดรวมของ response ที่เก็บอยู่)
+STAT_KEYS = ('hits', 'revalidations', 'misses', 'evictions', 'bytes_served', 'bytes_downloaded', 'size_bytes')
+
+class HttpCache:
+    """
+    cache ของ response จาก CKAN API บนดิสก์ (SQLite) ใช้ร่วมกันได้หลาย thread และหลาย process
+    
+    response ที่เก็บไว้ไม่เกิน TTL จะถูกใช้ทันทีโดยไม่ส่ง request ถ้าเก่ากว่านั้นจะตรวจสอบกับเซิร์ฟเวอร์
+    ด้วย conditional request (ETag/Last-Modified) ถ้าข้อมูลไม่เปลี่ยนเซิร์ฟเวอร์จะตอบ 304 โดยไม่ส่งข้อมูลซ้ำ
+    """
+    
+    def __init__(self, path=HTTP_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._pool = get_pool(str(self.path))
+        self._create_tables()
+    
+    def _create_tables(self):
+        """สร้างตารางของ cache"""
+        with self._pool.writer() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_type TEXT,
+                    validated_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS http_cache_stats (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID
+            """)
+    
+    def _get_entry(self, url):
+        """ดึง response ที่เก็บไว้ของ URL (None ถ้าไม่มี)"""
+        with self._pool.reader() as conn:
+            row = conn.execute("""
+                SELECT body, size, etag, last_modified, validated_at
+                FROM responses WHERE url = ?
+            """, (url,)).fetchone()
+        return dict(zip(('body', 'size', 'etag', 'last_modified', 'validated_at'), row)) if row else None
+    
+    def _hit(self, url, entry, revalidated=False):
+        """บันทึกการใช้ response จาก cache และคืนเนื้อหา"""
+        now = time.time()
+        with self._pool.transaction() as conn:
+            if revalidated:
+                conn.execute(
+                    "UPDATE responses SET last_access = ?, validated_at = ? WHERE url = ?",
+                    (now, now, url)
+                )
+            else:
+                conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (now, url))
+            increment_counters(conn, 'http_cache_stats', hits=1, revalidations=int(revalidated), bytes_served=entry['size'])
+        return entry['body']
+    
+    def _store(self, url, response):
+        """เก็บ response (สถานะ 200) แล้วลบรายการเก่าถ้าขนาดรวมเกิน max_bytes"""
+        body = response.content
+        now = time.time()
+        with self._pool.transaction() as conn:
+            row = conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            conn.execute("""
+                INSERT OR REPLACE INTO responses
+                (url, body, size, etag, last_modified, content_type, validated_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                url, body, len(body),
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified'),
+                response.headers.get('Content-Type'),
+                now, now
+            ))
+            increment_counters(conn, 'http_cache_stats', misses=1, bytes_downloaded=len(body), size_bytes=len(body) - (row[0] if row else 0))
+            self._evict(conn)
+        return body
+    
+    def _evict(self, conn):
+        """ลบ response ที่ไม่ได้ใช้นานที่สุดจนขนาดรวมไม่เกิน max_bytes โดยไม่ commit"""
+        row = conn.execute("SELECT value FROM http_cache_stats WHERE key = 'size_bytes'").fetchone()
+        total = row[0] if row else 0
+        if total <= self.max_bytes:
+            return 0
+        evicted = []
+        freed = 0
+        for url, size in conn.execute("SELECT url, size FROM responses ORDER BY last_access"):
+            if total - freed <= self.max_bytes:
+                break
+            evicted.append((url,))
+            freed += size
+        conn.executemany("DELETE FROM responses WHERE url = ?", evicted)
+        increment_counters(conn, 'http_cache_stats', evictions=len(evicted), size_bytes=-freed)
+        return len(evicted)
+    
+    def get(self, url, params=None, ttl=None, timeout=10, session=None):
+        """
+        ดึงเนื้อหาของ GET request จาก cache หรือจากเซิร์ฟเวอร์
+        
+        Args:
+            url (str): URL ของ API
+            params (dict): query string
+            ttl (float): ถ้าเก็บไว้ไม่เกินกี่วินาทีให้ใช้ทันที (ค่าเริ่มต้นคือ self.ttl, 0 = ตรวจสอบทุกครั้ง)
+            timeout (float): เวลารอสูงสุดของ request (วินาที)
+            session (requests.Session): session ที่ใช้ส่ง request
+        
+        Returns:
+            bytes: เนื้อหาของ response
+        
+        Raises:
+            requests.HTTPError: เซิร์ฟเวอร์ตอบสถานะผิดพลาด (response ผิดพลาดจะไม่ถูกเก็บ)
+        """
+        session = session or requests
+        url = requests.Request('GET', url, params=params).prepare().url
+        ttl = self.ttl if ttl is None else ttl
+        
+        entry = self._get_entry(url)
+        if entry and time.time() - entry['validated_at'] <= ttl:
+            return self._hit(url, entry)
+        
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        response = session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and entry:
+            return self._hit(url, entry, revalidated=True)
+        response.raise_for_status()
+        return self._store(url, response)
+    
+    def get_json(self, url, params=None, ttl=None, timeout=10, session=None):
+        """ดึง response ที่เป็น JSON ผ่าน cache (ดู HttpCache.get)"""
+        return json.loads(self.get(url, params=params, ttl=ttl, timeout=timeout, session=session))
+    
+    def invalidate(self, url, params=None):
+        """ลบ response ที่เก็บไว้ของ URL (เช่น เมื่อ API ตอบว่าไม่สำเร็จ)"""
+        url = requests.Request('GET', url, params=params).prepare().url
+        with self._pool.transaction() as conn:
+            row = conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                increment_counters(conn, 'http_cache_stats', size_bytes=-row[0])
+    
+    def stats(self):
+        """สถิติของ cache: ตัวนับ hit/miss/bytes และจำนวน/ขนาด response ปัจจุบัน"""
+        with self._pool.reader() as conn:
+            stats = dict.fromkeys(STAT_KEYS, 0)
+            stats.update(conn.execute("SELECT key, value FROM http_cache_stats").fetchall())
+            stats['responses'] = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        requests_total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / requests_total if requests_total else 0.0
+        stats['max_bytes'] = self.max_bytes
+        stats['ttl'] = self.ttl
+        return stats
+    
+    def clear(self):
+        """ลบ response ทั้งหมดที่เก็บไว้ (รวมถึงสถิติ)"""
+        with self._pool.transaction() as conn:
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM http_cache_stats")
+
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+def get_http_cache():
+    """ดึง HttpCache ที่ใช้ร่วมกันทั้ง process (ตั้งค่าได้ด้วย HTTP_CACHE_TTL และ HTTP_CACHE_MAX_BYTES)"""
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HttpCache(
+                max_bytes=int(os.getenv("HTTP_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                ttl=float(os.getenv("HTTP_CACHE_TTL", DEFAULT_TTL))
+            )
+        return _http_cache
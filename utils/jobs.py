@@ -0,0 +1,136 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from .data_utils import db, refresh_dataset, harvest_datasets, sync_catalog, check_resource_health
+from .ranking_engine import rank_resources
+
+# ช่วงเวลาขั้นต่ำระหว่างการบันทึกความคืบหน้าของงานลงฐานข้อมูล (วินาที)
+PROGRESS_INTERVAL = 0.5
+
+# ช่วงเวลาระหว่าง heartbeat ของงานที่กำลังทำ และเวลาที่ไม่มี heartbeat แล้วถือว่า process เจ้าของหยุดไปแล้ว (วินาที)
+HEARTBEAT_INTERVAL = 10
+STALE_AFTER = 60
+
+def _run_refresh(params, progress):
+    """งานอัพเดทข้อมูลชุดข้อมูลเดียว"""
+    return refresh_dataset(params['package_id'], api_url=params.get('api_url'), progress=progress)
+
+def _run_harvest(params, progress):
+    """งานอัพเดทข้อมูลหลายชุดข้อมูลพร้อมกัน"""
+    return harvest_datasets(
+        params['package_ids'],
+        max_workers=params.get('max_workers', 8),
+        batch_size=params.get('batch_size', 50),
+        api_url=params.get('api_url'),
+        progress_callback=lambda done, total: progress(done / total, f"ดึงข้อมูลแล้ว {done}/{total} รายการ")
+    )
+
+def _run_sync(params, progress):
+    """งานซิงค์ข้อมูลที่เปลี่ยนแปลงจาก CKAN"""
+    progress(0.0, "กำลังซิงค์ข้อมูล...")
+    return sync_catalog(api_url=params.get('api_url'), full=params.get('full', False))
+
+def _run_probe(params, progress):
+    """งานตรวจสอบลิงก์ของ resources"""
+    return check_resource_health(
+        limit=params.get('limit'),
+        max_workers=params.get('max_workers', 16),
+        per_host=params.get('per_host', 4),
+        progress_callback=lambda done, total: progress(done / total, f"ตรวจสอบแล้ว {done}/{total} ลิงก์")
+    )
+
+def _run_rank(params, progress):
+    """งานคำนวณ ranking อัตโนมัติของ resources"""
+    return rank_resources(db, dry_run=params.get('dry_run', False), progress=progress)
+
+# ประเภทงาน -> ฟังก์ชันที่รับ (params, progress) และคืนผลลัพธ์ที่แปลงเป็น JSON ได้
+JOB_HANDLERS = {
+    'refresh_dataset': _run_refresh,
+    'harvest': _run_harvest,
+    'sync': _run_sync,
+    'probe_urls': _run_probe,
+    'rank_resources': _run_rank
+}
+
+class JobQueue:
+    """
+    คิวงานเบื้องหลังที่เก็บสถานะในตาราง jobs และรันด้วย thread pool ของ process
+    
+    งานทำงานแยกจาก thread ของ Streamlit จึงไม่บล็อก session ที่สั่งงาน และดูสถานะต่อได้หลังรีโหลดหน้า
+    งานที่รับไปจะบันทึก owner ของคิวและ heartbeat ทุก HEARTBEAT_INTERVAL วินาที เมื่อสร้าง JobQueue ใหม่
+    จะส่งกลับเข้าคิวเฉพาะงานที่ไม่มี heartbeat เกิน STALE_AFTER วินาที (งานของ process อื่นที่ยังทำงานอยู่ไม่ถูกรันซ้ำ)
+    """
+    
+    def __init__(self, database, max_workers=4, heartbeat_interval=HEARTBEAT_INTERVAL, stale_after=STALE_AFTER):
+        self.db = database
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.heartbeat_interval = heartbeat_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name='job-heartbeat', daemon=True)
+        self._heartbeat.start()
+        for job_id in self.db.requeue_interrupted_jobs(stale_after):
+            self._executor.submit(self._run, job_id)
+    
+    def _heartbeat_loop(self):
+        """บันทึก heartbeat ของงานที่คิวนี้กำลังทำเป็นระยะ"""
+        while True:
+            time.sleep(self.heartbeat_interval)
+            try:
+                self.db.heartbeat_jobs(self.owner)
+            except Exception as e:
+                print(f"⚠️ บันทึก heartbeat ของงานไม่สำเร็จ: {str(e)}")
+    
+    def submit(self, kind, params=None):
+        """เพิ่มงานเข้าคิวและคืน id ของงาน"""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"ไม่รู้จักประเภทงาน {kind}")
+        job_id = self.db.create_job(kind, params)
+        self._executor.submit(self._run, job_id)
+        return job_id
+    
+    def _run(self, job_id):
+        """รันงานหนึ่งงานใน worker thread และบันทึกผลลงตาราง jobs"""
+        if not self.db.claim_job(job_id, self.owner):
+            return
+        job = self.db.get_job(job_id)
+        last_report = 0.0
+        
+        def progress(fraction, message=None):
+            # บันทึกไม่ถี่เกินไปเพื่อไม่ให้แย่ง lock การเขียนกับงานอื่น
+            nonlocal last_report
+            now = time.monotonic()
+            if fraction < 1 and now - last_report < PROGRESS_INTERVAL:
+                return
+            last_report = now
+            self.db.update_job_progress(job_id, fraction, message)
+        
+        try:
+            result = JOB_HANDLERS[job['kind']](job['params'], progress)
+            self.db.finish_job(job_id, 'done', "✅ เสร็จสิ้น", result)
+        except Exception as e:
+            print(f"❌ งาน #{job_id} ({job['kind']}) ผิดพลาด: {str(e)}")
+            self.db.finish_job(job_id, 'failed', f"❌ {str(e)}")
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """ดึงคิวงานที่ใช้ร่วมกันทั้ง process (สร้างและรับงานที่ค้างเมื่อเรียกครั้งแรก)"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(db)
+        return _job_queue
+
+def submit_job(kind, params=None):
+    """เพิ่มงานเบื้องหลังเข้าคิว และคืน id ของงาน"""
+    return get_job_queue().submit(kind, params)
+
+def get_jobs(limit=50):
+    """ดึงงานล่าสุดพร้อมสถานะและความคืบหน้า"""
+    # เริ่มคิวงาน (ถ้ายังไม่เริ่ม) เพื่อรับงานที่ค้างจาก process ก่อนหน้าไปทำต่อ
+    get_job_queue()
+    return db.get_jobs(limit)
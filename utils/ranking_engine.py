@@ -0,0 +1,123 @@
+import time
+import numpy as np
+import pandas as pd
+
+# คะแนนของประเภทไฟล์ (ไฟล์ที่เครื่องอ่านได้และเป็นมาตรฐานเปิดได้คะแนนสูงสุด)
+FORMAT_SCORES = {
+    'CSV': 1.0, 'JSON': 1.0, 'GEOJSON': 1.0, 'XML': 1.0, 'API': 1.0, 'TSV': 1.0,
+    'RDF': 1.0, 'KML': 1.0, 'ODS': 0.75, 'XLSX': 0.75, 'SHP': 0.75, 'XLS': 0.5,
+    'ZIP': 0.25, 'PDF': 0.0, 'DOC': 0.0, 'DOCX': 0.0, 'JPG': 0.0, 'JPEG': 0.0, 'PNG': 0.0
+}
+# คะแนนของประเภทไฟล์ที่ไม่อยู่ในรายการ
+UNKNOWN_FORMAT_SCORE = 0.25
+
+# น้ำหนักของแต่ละเกณฑ์ (รวมกันเป็น 1)
+WEIGHTS = {'format': 0.4, 'reachability': 0.2, 'freshness': 0.2, 'completeness': 0.2}
+
+# คะแนนของลิงก์ที่ยังไม่เคยตรวจสอบ
+UNKNOWN_REACHABILITY_SCORE = 0.5
+
+# ข้อมูลที่ปรับปรุงภายในวันนี้ได้คะแนนความใหม่เต็ม และลดลงเป็นเส้นตรงจนเป็น 0 เมื่อเก่ากว่า 3 ปี
+FRESHNESS_HORIZON_DAYS = 3 * 365
+
+# จำนวนช่อง metadata ที่ใช้วัดความครบถ้วน (file_name, description, url, format ของ resource
+# และ title, organization ของชุดข้อมูล)
+COMPLETENESS_FIELDS = 6
+
+# คะแนนขั้นต่ำของ ranking 1-4 ดาว (ต่ำกว่าขั้นแรกได้ 0)
+RANK_THRESHOLDS = [0.2, 0.4, 0.6, 0.8]
+
+def score_resources(resources, datasets, now=None):
+    """
+    คำนวณคะแนนคุณภาพ (0-1) และ ranking (0-4) ของ resources ด้วยการคำนวณทีละคอลัมน์
+    
+    เกณฑ์ที่ใช้ ได้แก่ ประเภทไฟล์, ลิงก์ใช้งานได้หรือไม่ (จากตาราง resource_health),
+    ความใหม่ของ last_updated และความครบถ้วนของ metadata โดย resource ที่ลิงก์เสียจะได้ 0 เสมอ
+    
+    Args:
+        resources (DataFrame): resources จาก Database.get_auto_ranking_frames
+        datasets (DataFrame): ชุดข้อมูลจาก Database.get_auto_ranking_frames
+        now (Timestamp): เวลาอ้างอิงสำหรับคำนวณความใหม่ (ค่าเริ่มต้นคือเวลาปัจจุบัน)
+    
+    Returns:
+        DataFrame: คอลัมน์ score และ new_ranking (index เดียวกับ resources)
+    """
+    now = now or pd.Timestamp.now(tz='UTC')
+    
+    # คำนวณค่าระดับชุดข้อมูลครั้งเดียวต่อชุดข้อมูล แล้วจับคู่กับ resources ด้วย dataset_id
+    datasets = datasets.set_index('package_id')
+    last_updated = pd.to_datetime(datasets['last_updated'], errors='coerce', format='ISO8601', utc=True)
+    age_days = (now - last_updated).dt.total_seconds() / 86400
+    dataset_freshness = (1 - age_days / FRESHNESS_HORIZON_DAYS).clip(0, 1).fillna(0)
+    dataset_codes = datasets.index.get_indexer(resources['dataset_id'])
+    known = dataset_codes >= 0
+    freshness = np.where(known, dataset_freshness.to_numpy()[dataset_codes], 0.0)
+    dataset_filled = np.where(known, datasets['filled'].to_numpy()[dataset_codes], 0)
+    
+    # ประเภทไฟล์มีไม่กี่ค่า จึงแปลงเป็น categorical แล้วคำนวณคะแนนครั้งเดียวต่อประเภท
+    # และกระจายกลับด้วยรหัสของแต่ละแถว แทนการแปลงตัวพิมพ์และค้น dict ทุกแถว
+    formats = resources['format'].fillna('').astype('category')
+    category_scores = formats.cat.categories.astype(str).str.upper().map(FORMAT_SCORES).fillna(UNKNOWN_FORMAT_SCORE)
+    format_score = pd.Series(
+        category_scores.to_numpy(dtype='float64')[formats.cat.codes.to_numpy()],
+        index=resources.index
+    )
+    
+    url_ok = pd.to_numeric(resources['url_ok'], errors='coerce')
+    reachability = url_ok.fillna(UNKNOWN_REACHABILITY_SCORE).astype('float64')
+    
+    completeness = (resources['filled'].to_numpy() + dataset_filled) / COMPLETENESS_FIELDS
+    
+    score = (
+        WEIGHTS['format'] * format_score
+        + WEIGHTS['reachability'] * reachability
+        + WEIGHTS['freshness'] * freshness
+        + WEIGHTS['completeness'] * completeness
+    )
+    ranking = np.searchsorted(RANK_THRESHOLDS, score.to_numpy(), side='right')
+    ranking = np.where(url_ok.to_numpy() == 0, 0, ranking)
+    return pd.DataFrame({'score': score, 'new_ranking': ranking.astype('int8')}, index=resources.index)
+
+def rank_resources(database, dry_run=False, progress=None):
+    """
+    คำนวณ ranking อัตโนมัติของ resources ทั้งหมดที่ไม่ได้กำหนด ranking เอง แล้วบันทึกใน transaction เดียว
+    
+    Args:
+        database (Database): ฐานข้อมูลที่ใช้
+        dry_run (bool): ถ้าเป็น True จะคำนวณอย่างเดียวโดยไม่บันทึก
+        progress (callable): เรียกด้วย (สัดส่วนความคืบหน้า 0-1, ข้อความ) ระหว่างทำงาน
+    
+    Returns:
+        dict: สรุปผล {'scored', 'changed', 'distribution', 'load_seconds', 'score_seconds', 'write_seconds'}
+    """
+    progress = progress or (lambda fraction, message=None: None)
+    stats = {'scored': 0, 'changed': 0, 'distribution': {}}
+    
+    progress(0.0, "กำลังโหลด resources...")
+    start = time.perf_counter()
+    resources, datasets = database.get_auto_ranking_frames()
+    stats['load_seconds'] = time.perf_counter() - start
+    
+    progress(0.4, f"กำลังคำนวณคะแนน {len(resources):,} resources...")
+    start = time.perf_counter()
+    scores = score_resources(resources, datasets)
+    changed = resources.loc[scores['new_ranking'].to_numpy() != resources['ranking'].fillna(0).to_numpy()]
+    stats['score_seconds'] = time.perf_counter() - start
+    stats['scored'] = len(resources)
+    stats['distribution'] = {int(rank): int(count) for rank, count in scores['new_ranking'].value_counts().sort_index().items()}
+    
+    start = time.perf_counter()
+    if not dry_run and len(changed):
+        progress(0.7, f"กำลังบันทึก ranking ที่เปลี่ยน {len(changed):,} รายการ...")
+        stats['changed'] = database.apply_auto_rankings(zip(
+            changed['id'].tolist(),
+            changed['dataset_id'].tolist(),
+            scores.loc[changed.index, 'new_ranking'].tolist()
+        ))
+    else:
+        stats['changed'] = len(changed)
+    stats['write_seconds'] = time.perf_counter() - start
+    
+    print(f"⭐ คำนวณ ranking อัตโนมัติ {stats['scored']:,} resources เปลี่ยน {stats['changed']:,} รายการ "
+          f"(โหลด {stats['load_seconds']:.1f}s, คำนวณ {stats['score_seconds']:.1f}s, บันทึก {stats['write_seconds']:.1f}s)")
+    return stats
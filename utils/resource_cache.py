@@ -0,0 +1,338 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+from .db_utils import get_pool, increment_counters
+
+# ที่เก็บไฟล์ cache: objects/<sha256[:2]>/<sha256> และไฟล์ที่ดาวน์โหลดไม่ครบใน partial/
+CACHE_DIR = Path('data/resource_cache')
+
+# ขนาดรวมสูงสุดของไฟล์ใน cache (เกินแล้วจะลบไฟล์ที่ไม่ได้ใช้นานที่สุดก่อน)
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# ขนาดของแต่ละช่วงที่อ่านจาก response และเขียนลงไฟล์
+CHUNK_SIZE = 64 * 1024
+
+# ตัวนับสถิติที่เก็บในตาราง cache_stats
+STAT_KEYS = ('hits', 'misses', 'revalidations', 'resumes', 'evictions', 'bytes_served', 'bytes_downloaded')
+
+# requests.Session แยกตาม thread สำหรับดาวน์โหลดไฟล์
+_download_local = threading.local()
+
+def get_download_session():
+    """ดึง requests.Session ของ thread ปัจจุบันสำหรับดาวน์โหลดไฟล์ (keep-alive)"""
+    session = getattr(_download_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _download_local.session = session
+    return session
+
+class CachedResource:
+    """ไฟล์ resource ที่อยู่ใน cache"""
+    
+    def __init__(self, url, path, sha256, size, content_type, from_cache):
+        self.url = url
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.content_type = content_type
+        self.from_cache = from_cache
+    
+    def __repr__(self):
+        return f"CachedResource({self.url!r}, sha256={self.sha256[:12]}, size={self.size}, from_cache={self.from_cache})"
+
+class ResourceCache:
+    """
+    cache ของไฟล์ resource ที่ดาวน์โหลดจาก resources.url โดยเก็บไฟล์ตาม SHA-256 ของเนื้อหา
+    
+    URL หลายรายการที่ได้เนื้อหาเดียวกันจะใช้ไฟล์เดียวกัน ไฟล์ที่อยู่ใน cache จะถูกตรวจสอบกับ
+    เซิร์ฟเวอร์ด้วย conditional request (ETag/Last-Modified) ก่อนใช้ ถ้าดาวน์โหลดไม่ครบ
+    ครั้งถัดไปจะดาวน์โหลดต่อจากส่วนที่ได้แล้วด้วย Range request
+    ดัชนีของ cache เก็บในไฟล์ SQLite แยกจากฐานข้อมูลหลัก (index.sqlite)
+    """
+    
+    def __init__(self, root=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.objects_dir = self.root / 'objects'
+        self.partial_dir = self.root / 'partial'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        self._pool = get_pool(str(self.root / 'index.sqlite'))
+        self._url_locks = {}
+        self._url_locks_lock = threading.Lock()
+        self._create_tables()
+    
+    def _create_tables(self):
+        """สร้างตารางดัชนีของ cache"""
+        with self._pool.writer() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_last_access ON blobs(last_access)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    url TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_type TEXT,
+                    fetched_at REAL NOT NULL,
+                    validated_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_sha256 ON entries(sha256)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS partials (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_type TEXT
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_stats (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID
+            """)
+    
+    @contextmanager
+    def _url_lock(self, url):
+        """lock ต่อ URL เพื่อไม่ให้หลาย thread ดาวน์โหลดไฟล์เดียวกันพร้อมกัน"""
+        with self._url_locks_lock:
+            lock = self._url_locks.setdefault(url, threading.Lock())
+        with lock:
+            yield
+    
+    def object_path(self, sha256):
+        """ที่อยู่ไฟล์ใน cache ของเนื้อหาที่มี SHA-256 ที่ระบุ"""
+        return self.objects_dir / sha256[:2] / sha256
+    
+    def _partial_path(self, url):
+        """ที่อยู่ไฟล์ที่ดาวน์โหลดไม่ครบของ URL"""
+        return self.partial_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.part"
+    
+    def _get_entry(self, url):
+        """ดึงข้อมูล cache ของ URL (None ถ้าไม่มีหรือไฟล์ถูกลบไปแล้ว)"""
+        with self._pool.reader() as conn:
+            row = conn.execute("""
+                SELECT e.sha256, b.size, e.etag, e.last_modified, e.content_type, e.validated_at
+                FROM entries e JOIN blobs b ON b.sha256 = e.sha256
+                WHERE e.url = ?
+            """, (url,)).fetchone()
+        if row is None or not self.object_path(row[0]).exists():
+            return None
+        return dict(zip(('sha256', 'size', 'etag', 'last_modified', 'content_type', 'validated_at'), row))
+    
+    def _hit(self, url, entry, revalidated=False):
+        """บันทึกการใช้ไฟล์จาก cache และคืน CachedResource"""
+        now = time.time()
+        with self._pool.transaction() as conn:
+            conn.execute("UPDATE blobs SET last_access = ? WHERE sha256 = ?", (now, entry['sha256']))
+            if revalidated:
+                conn.execute("UPDATE entries SET validated_at = ? WHERE url = ?", (now, url))
+            increment_counters(conn, 'cache_stats', hits=1, revalidations=int(revalidated), bytes_served=entry['size'])
+        return CachedResource(
+            url, self.object_path(entry['sha256']), entry['sha256'],
+            entry['size'], entry['content_type'], from_cache=True
+        )
+    
+    def fetch(self, url, max_age=None, timeout=30):
+        """
+        ดึงไฟล์ของ URL จาก cache หรือดาวน์โหลดใหม่ถ้าไม่มี/ไฟล์บนเซิร์ฟเวอร์เปลี่ยนไป
+        
+        Args:
+            url (str): URL ของไฟล์
+            max_age (float): ถ้าตรวจสอบกับเซิร์ฟเวอร์ไว้ไม่เกินกี่วินาที ให้ใช้ไฟล์ใน cache ทันที
+                (None = ตรวจสอบด้วย conditional request ทุกครั้ง)
+            timeout (float): เวลารอสูงสุดของการเชื่อมต่อ (วินาที)
+        
+        Returns:
+            CachedResource: ข้อมูลไฟล์พร้อม path บนดิสก์
+        """
+        with self._url_lock(url):
+            entry = self._get_entry(url)
+            if entry and max_age is not None and time.time() - entry['validated_at'] <= max_age:
+                return self._hit(url, entry)
+            
+            headers = {}
+            if entry:
+                if entry['etag']:
+                    headers['If-None-Match'] = entry['etag']
+                if entry['last_modified']:
+                    headers['If-Modified-Since'] = entry['last_modified']
+            
+            partial_path = self._partial_path(url)
+            partial = self._get_partial(url) if partial_path.exists() else None
+            offset = partial_path.stat().st_size if partial else 0
+            # ดาวน์โหลดต่อเฉพาะเมื่อมีตัวระบุเวอร์ชันของไฟล์ (If-Range) เพื่อไม่ให้ต่อไฟล์คนละเวอร์ชัน
+            validator = partial and (partial['etag'] or partial['last_modified'])
+            if offset and validator:
+                headers['Range'] = f"bytes={offset}-"
+                headers['If-Range'] = validator
+            
+            response = get_download_session().get(url, headers=headers, timeout=timeout, stream=True)
+            if response.status_code == 416 and 'Range' in headers:
+                # ไฟล์ partial ไม่ตรงกับไฟล์บนเซิร์ฟเวอร์แล้ว ให้ดาวน์โหลดใหม่ทั้งไฟล์
+                response.close()
+                partial_path.unlink()
+                del headers['Range'], headers['If-Range']
+                response = get_download_session().get(url, headers=headers, timeout=timeout, stream=True)
+            try:
+                if response.status_code == 304 and entry:
+                    return self._hit(url, entry, revalidated=True)
+                response.raise_for_status()
+                return self._download(url, response, partial_path, offset if response.status_code == 206 else 0)
+            finally:
+                response.close()
+    
+    def _get_partial(self, url):
+        """ดึง ETag/Last-Modified ของไฟล์ที่ดาวน์โหลดไม่ครบ"""
+        with self._pool.reader() as conn:
+            row = conn.execute(
+                "SELECT etag, last_modified, content_type FROM partials WHERE url = ?",
+                (url,)
+            ).fetchone()
+        return dict(zip(('etag', 'last_modified', 'content_type'), row)) if row else None
+    
+    def _download(self, url, response, partial_path, offset):
+        """เขียน response ลงไฟล์ partial (ต่อท้ายถ้า offset > 0) แล้วย้ายเข้า cache ตาม SHA-256"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        content_type = response.headers.get('Content-Type')
+        with self._pool.transaction() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO partials (url, etag, last_modified, content_type)
+                VALUES (?, ?, ?, ?)
+            """, (url, etag, last_modified, content_type))
+        
+        digest = hashlib.sha256()
+        if offset:
+            # คำนวณ hash ของส่วนที่ดาวน์โหลดไว้แล้วก่อนเขียนต่อ
+            with open(partial_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+        
+        downloaded = 0
+        with open(partial_path, 'ab' if offset else 'wb') as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                digest.update(chunk)
+                downloaded += len(chunk)
+        
+        sha256 = digest.hexdigest()
+        size = offset + downloaded
+        path = self.object_path(sha256)
+        if path.exists():
+            # เนื้อหาเดียวกับไฟล์ที่มีอยู่แล้ว (จาก URL อื่นหรือเวอร์ชันก่อน)
+            partial_path.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(partial_path, path)
+        
+        now = time.time()
+        with self._pool.transaction() as conn:
+            conn.execute("DELETE FROM partials WHERE url = ?", (url,))
+            conn.execute("""
+                INSERT INTO blobs (sha256, size, last_access) VALUES (?, ?, ?)
+                ON CONFLICT(sha256) DO UPDATE SET last_access = excluded.last_access
+            """, (sha256, size, now))
+            conn.execute("""
+                INSERT OR REPLACE INTO entries
+                (url, sha256, etag, last_modified, content_type, fetched_at, validated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (url, sha256, etag, last_modified, content_type, now, now))
+            increment_counters(conn, 'cache_stats', misses=1, resumes=int(offset > 0), bytes_downloaded=downloaded)
+        print(f"📥 ดาวน์โหลด {url} ({size:,} bytes{f', ต่อจาก {offset:,} bytes' if offset else ''})")
+        
+        # ไม่ลบไฟล์ที่เพิ่งดาวน์โหลดเพราะผู้เรียกกำลังจะใช้ (ไฟล์ที่ใหญ่กว่า max_bytes จะถูกลบเมื่อดาวน์โหลดไฟล์ถัดไป)
+        self.evict(keep=sha256)
+        return CachedResource(url, path, sha256, size, content_type, from_cache=False)
+    
+    def evict(self, max_bytes=None, keep=None):
+        """
+        ลบไฟล์ที่ไม่ได้ใช้นานที่สุดจนขนาดรวมไม่เกิน max_bytes และคืนจำนวนไฟล์ที่ลบ
+        
+        Args:
+            max_bytes (int): ขนาดรวมสูงสุด (ค่าเริ่มต้นคือ self.max_bytes)
+            keep (str): SHA-256 ของไฟล์ที่ห้ามลบ (เช่น ไฟล์ที่เพิ่งดาวน์โหลดและกำลังจะคืนให้ผู้เรียก)
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._pool.transaction() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= max_bytes:
+                return 0
+            evicted = []
+            for sha256, size in conn.execute(
+                "SELECT sha256, size FROM blobs WHERE sha256 IS NOT ? ORDER BY last_access", (keep,)
+            ):
+                if total <= max_bytes:
+                    break
+                evicted.append(sha256)
+                total -= size
+            for sha256 in evicted:
+                conn.execute("DELETE FROM entries WHERE sha256 = ?", (sha256,))
+                conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+            increment_counters(conn, 'cache_stats', evictions=len(evicted))
+        if not evicted:
+            return 0
+        for sha256 in evicted:
+            try:
+                self.object_path(sha256).unlink()
+            except FileNotFoundError:
+                pass
+        print(f"🧹 ลบไฟล์ออกจาก cache {len(evicted)} ไฟล์")
+        return len(evicted)
+    
+    def stats(self):
+        """สถิติของ cache: ตัวนับ hit/miss/bytes และจำนวน/ขนาดไฟล์ปัจจุบัน"""
+        with self._pool.reader() as conn:
+            stats = dict.fromkeys(STAT_KEYS, 0)
+            stats.update(conn.execute("SELECT key, value FROM cache_stats").fetchall())
+            stats['files'], stats['size_bytes'] = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs"
+            ).fetchone()
+            stats['urls'] = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        requests_total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / requests_total if requests_total else 0.0
+        stats['max_bytes'] = self.max_bytes
+        return stats
+    
+    def clear(self):
+        """ลบไฟล์และดัชนีทั้งหมดของ cache (รวมถึงสถิติ)"""
+        with self._pool.transaction() as conn:
+            for table in ('entries', 'blobs', 'partials', 'cache_stats'):
+                conn.execute(f"DELETE FROM {table}")
+        shutil.rmtree(self.objects_dir, ignore_errors=True)
+        shutil.rmtree(self.partial_dir, ignore_errors=True)
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+
+_resource_cache = None
+_resource_cache_lock = threading.Lock()
+
+def get_resource_cache():
+    """ดึง ResourceCache ที่ใช้ร่วมกันทั้ง process (ขนาดสูงสุดตั้งได้ด้วย RESOURCE_CACHE_MAX_BYTES)"""
+    global _resource_cache
+    with _resource_cache_lock:
+        if _resource_cache is None:
+            max_bytes = int(os.getenv("RESOURCE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+            _resource_cache = ResourceCache(max_bytes=max_bytes)
+        return _resource_cache
+
+def fetch_resource(url, max_age=None, timeout=30):
+    """ดึงไฟล์ resource ผ่าน cache (ดู ResourceCache.fetch)"""
+    return get_resource_cache().fetch(url, max_age=max_age, timeout=timeout)
@@ -0,0 +1,216 @@
+import codecs
+import csv
+import io
+import threading
+from collections import OrderedDict
+import pandas as pd
+from .url_prober import get_probe_session
+from .resource_cache import fetch_resource
+
+try:
+    import openpyxl
+except ImportError:  # ไม่มี openpyxl ให้แสดงตัวอย่างได้เฉพาะไฟล์ CSV
+    openpyxl = None
+
+# จำนวน byte ที่ขอในครั้งแรกและจำนวนสูงสุดที่อ่านเพื่อแสดงตัวอย่าง CSV (ขอด้วย Range request)
+PREVIEW_INITIAL_BYTES = 32 * 1024
+PREVIEW_MAX_BYTES = 256 * 1024
+
+# ขนาดของแต่ละช่วงที่อ่านจาก response
+PREVIEW_CHUNK_SIZE = 16 * 1024
+
+# จำนวนตัวอย่างที่เก็บไว้ในหน่วยความจำ (แยกตาม URL และจำนวนแถว)
+PREVIEW_CACHE_SIZE = 128
+
+# encoding ที่ลองตามลำดับเมื่อไม่มี BOM (cp874 ครอบคลุม TIS-620 และอักขระเพิ่มเติมของ Windows)
+FALLBACK_ENCODINGS = ('utf-8', 'cp874', 'tis_620')
+
+# ตัวคั่นคอลัมน์ที่พบในไฟล์ CSV/TSV ของหน่วยงาน
+CSV_DELIMITERS = ',;\t|'
+
+CSV_FORMATS = {'CSV', 'TSV', 'TXT'}
+EXCEL_FORMATS = {'XLSX', 'XLSM'}
+
+_preview_cache = OrderedDict()
+_preview_cache_lock = threading.Lock()
+
+def detect_encoding(sample, final=True):
+    """
+    ตรวจหา encoding ของข้อความจากตัวอย่าง byte ช่วงต้นไฟล์
+    
+    Args:
+        sample (bytes): byte ช่วงต้นไฟล์
+        final (bool): False ถ้าตัวอย่างถูกตัดกลางไฟล์ (ยอมให้ตัวอักษรสุดท้ายไม่ครบ)
+    
+    Returns:
+        str: ชื่อ encoding ที่ใช้ decode ได้ (utf-8-sig, utf-8, cp874 หรือ tis_620)
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=final)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+def detect_delimiter(text):
+    """ตรวจหาตัวคั่นคอลัมน์จากบรรทัดแรก ๆ (ใช้ , ถ้าตรวจไม่ได้ เช่น ไฟล์ที่มีคอลัมน์เดียว)"""
+    try:
+        return csv.Sniffer().sniff(text[:PREVIEW_INITIAL_BYTES], delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        return ','
+
+def _cached_preview(key):
+    """ดึงตัวอย่างที่เก็บไว้ (และเลื่อนเป็นรายการที่ใช้ล่าสุด)"""
+    with _preview_cache_lock:
+        entry = _preview_cache.get(key)
+        if entry is not None:
+            _preview_cache.move_to_end(key)
+        return entry
+
+def _store_preview(key, entry):
+    """เก็บตัวอย่างไว้ใช้ซ้ำ โดยลบรายการที่ไม่ได้ใช้นานที่สุดเมื่อเกิน PREVIEW_CACHE_SIZE"""
+    with _preview_cache_lock:
+        _preview_cache[key] = entry
+        _preview_cache.move_to_end(key)
+        while len(_preview_cache) > PREVIEW_CACHE_SIZE:
+            _preview_cache.popitem(last=False)
+
+def _read_head(response, buffer, rows, max_bytes):
+    """อ่าน response ต่อท้าย buffer ทีละช่วงจนได้จำนวนบรรทัดที่ต้องการหรือครบ max_bytes แล้วหยุดทันที"""
+    for chunk in response.iter_content(PREVIEW_CHUNK_SIZE):
+        buffer += chunk
+        # บรรทัดหัวตาราง + จำนวนแถวที่ต้องการ
+        if buffer.count(b'\n') > rows or len(buffer) >= max_bytes:
+            del buffer[max_bytes:]
+            return False
+    return True
+
+def _range_total(response):
+    """ขนาดไฟล์ทั้งหมดจาก Content-Range ของ response แบบ 206 (None ถ้าไม่ระบุ)"""
+    total = response.headers.get('Content-Range', '').rsplit('/', 1)[-1].strip()
+    return int(total) if total.isdigit() else None
+
+def preview_csv(url, rows=20, max_bytes=PREVIEW_MAX_BYTES, timeout=15):
+    """
+    แสดงตัวอย่าง N แถวแรกของไฟล์ CSV โดยอ่านเฉพาะช่วงต้นไฟล์
+    
+    ขอเฉพาะ byte แรก ๆ ด้วย Range request (เริ่มจาก PREVIEW_INITIAL_BYTES แล้วขอช่วงถัดไปเป็นสองเท่า
+    จนได้จำนวนแถวที่ต้องการหรือครบ max_bytes) ถ้าเซิร์ฟเวอร์ไม่รองรับ Range จะหยุดอ่านทันที
+    เมื่อได้จำนวนแถวที่ต้องการ ตัวอย่างถูกเก็บไว้ตาม ETag/Last-Modified ของไฟล์
+    และตรวจสอบด้วย conditional request ถ้าไฟล์ไม่เปลี่ยนจะได้ 304 โดยไม่ต้องอ่านข้อมูลซ้ำ
+    
+    Returns:
+        dict: {'data' (DataFrame), 'encoding', 'bytes_read', 'complete', 'from_cache'}
+    """
+    key = ('csv', url, rows, max_bytes)
+    cached = _cached_preview(key)
+    headers = {'Accept-Encoding': 'identity'}
+    if cached:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+    
+    session = get_probe_session()
+    buffer = bytearray()
+    size = min(PREVIEW_INITIAL_BYTES, max_bytes)
+    while True:
+        headers['Range'] = f"bytes={len(buffer)}-{size - 1}"
+        response = session.get(url, headers=headers, timeout=timeout, stream=True)
+        try:
+            if response.status_code == 304 and cached:
+                return {**cached['preview'], 'bytes_read': 0, 'from_cache': True}
+            response.raise_for_status()
+            if not buffer:
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                # ขอช่วงถัดไปเฉพาะไฟล์เวอร์ชันเดียวกับช่วงแรก
+                headers.pop('If-None-Match', None)
+                headers.pop('If-Modified-Since', None)
+                if etag or last_modified:
+                    headers['If-Range'] = etag or last_modified
+            elif response.status_code != 206:
+                # ไฟล์เปลี่ยนระหว่างอ่าน (หรือเซิร์ฟเวอร์ส่งทั้งไฟล์) ให้เริ่มอ่านใหม่จากต้นไฟล์
+                buffer.clear()
+            ended = _read_head(response, buffer, rows, max_bytes)
+            total = _range_total(response) if response.status_code == 206 else None
+        finally:
+            response.close()
+        
+        # ได้ทั้งไฟล์เมื่อเซิร์ฟเวอร์ส่งทั้งไฟล์มา (200) หรือช่วงที่ได้ครอบคลุมขนาดไฟล์ทั้งหมด
+        complete = ended and (total is None or total <= len(buffer))
+        if complete or not ended or len(buffer) >= max_bytes:
+            break
+        size = min(size * 2, max_bytes)
+    sample = bytes(buffer)
+    
+    if not complete:
+        # ตัดบรรทัดสุดท้ายที่อาจอ่านมาไม่ครบ
+        sample = sample[:sample.rfind(b'\n') + 1] or sample
+    encoding = detect_encoding(sample, final=complete)
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample, final=True)
+    
+    data = pd.read_csv(
+        io.StringIO(text),
+        sep=detect_delimiter(text),
+        nrows=rows,
+        dtype=str,
+        keep_default_na=False,
+        on_bad_lines='skip'
+    )
+    preview = {'data': data, 'encoding': encoding, 'bytes_read': len(sample), 'complete': complete}
+    if etag or last_modified:
+        _store_preview(key, {'etag': etag, 'last_modified': last_modified, 'preview': preview})
+    return {**preview, 'from_cache': False}
+
+def preview_excel(url, rows=20, timeout=30):
+    """
+    แสดงตัวอย่าง N แถวแรกของ sheet แรกในไฟล์ XLSX
+    
+    ไฟล์ XLSX เป็น zip ที่มีสารบัญอยู่ท้ายไฟล์ จึงต้องดาวน์โหลดทั้งไฟล์ผ่าน cache ของ resource
+    (ครั้งถัดไปจะใช้ไฟล์ใน cache ถ้า ETag ไม่เปลี่ยน) แล้วอ่านเฉพาะแถวแรก ๆ ด้วย openpyxl แบบ read_only
+    
+    Returns:
+        dict: {'data' (DataFrame), 'encoding', 'bytes_read', 'complete', 'from_cache'}
+    """
+    if openpyxl is None:
+        raise RuntimeError("ต้องติดตั้ง openpyxl เพื่อแสดงตัวอย่างไฟล์ Excel")
+    resource = fetch_resource(url, timeout=timeout)
+    key = ('excel', resource.sha256, rows)
+    cached = _cached_preview(key)
+    if cached:
+        return {**cached['preview'], 'bytes_read': 0 if resource.from_cache else resource.size, 'from_cache': True}
+    
+    workbook = openpyxl.load_workbook(resource.path, read_only=True, data_only=True)
+    try:
+        values = list(workbook.active.iter_rows(max_row=rows + 1, values_only=True))
+    finally:
+        workbook.close()
+    header = [str(value) if value is not None else f"คอลัมน์ {i + 1}" for i, value in enumerate(values[0])] if values else []
+    data = pd.DataFrame(values[1:], columns=header) if header else pd.DataFrame()
+    
+    preview = {'data': data, 'encoding': None, 'complete': True}
+    _store_preview(key, {'preview': preview})
+    return {**preview, 'bytes_read': 0 if resource.from_cache else resource.size, 'from_cache': resource.from_cache}
+
+def preview_resource(url, file_format, rows=20):
+    """
+    แสดงตัวอย่างแถวแรก ๆ ของไฟล์ resource ตามประเภทไฟล์
+    
+    Args:
+        url (str): URL ของไฟล์
+        file_format (str): ประเภทไฟล์ใน resources.format (CSV, XLSX, ...)
+        rows (int): จำนวนแถวที่ต้องการ
+    
+    Returns:
+        dict: {'data' (DataFrame), 'encoding', 'bytes_read', 'complete', 'from_cache'}
+    """
+    file_format = (file_format or '').upper()
+    if file_format in CSV_FORMATS:
+        return preview_csv(url, rows=rows)
+    if file_format in EXCEL_FORMATS:
+        return preview_excel(url, rows=rows)
+    raise ValueError(f"ไม่รองรับการแสดงตัวอย่างไฟล์ประเภท {file_format or 'ไม่ระบุ'}")
@@ -0,0 +1,62 @@
+import re
+
+try:
+    from pythainlp.tokenize import word_tokenize
+except ImportError:  # ไม่มี pythainlp ให้ใช้การตัดแบบ bigram แทน
+    word_tokenize = None
+
+# ช่วงตัวอักษรไทย และสระ/วรรณยุกต์ที่ต้องอยู่ติดกับพยัญชนะตัวหน้า
+THAI_RUN_PATTERN = re.compile(r'[\u0E00-\u0E7F]+')
+THAI_COMBINING_PATTERN = re.compile(r'[\u0E31\u0E34-\u0E3A\u0E47-\u0E4E]')
+TOKEN_PATTERN = re.compile(r'[\u0E00-\u0E7F]+|[^\W_]+')
+
+# ชื่อวิธีตัดคำที่ใช้อยู่ (ถ้าเปลี่ยนต้องสร้างดัชนีค้นหาใหม่)
+SEGMENTER = 'pythainlp-newmm' if word_tokenize else 'thai-bigram'
+
+def _thai_clusters(run):
+    """แยกข้อความไทยเป็นกลุ่มตัวอักษร (พยัญชนะพร้อมสระ/วรรณยุกต์ที่ซ้อนอยู่)"""
+    clusters = []
+    for char in run:
+        if clusters and THAI_COMBINING_PATTERN.match(char):
+            clusters[-1] += char
+        else:
+            clusters.append(char)
+    return clusters
+
+def _segment_thai(run):
+    """ตัดข้อความไทยที่ไม่มีช่องว่างเป็นคำ"""
+    if word_tokenize:
+        return [t for t in word_tokenize(run, engine='newmm', keep_whitespace=False) if t.strip()]
+    clusters = _thai_clusters(run)
+    if len(clusters) < 2:
+        return clusters
+    return [clusters[i] + clusters[i + 1] for i in range(len(clusters) - 1)]
+
+def segment_terms(text):
+    """แยกข้อความเป็นรายการคำค้น โดยแต่ละคำค้นคือรายการ token ที่ต้องเรียงติดกัน"""
+    terms = []
+    for match in TOKEN_PATTERN.finditer(str(text or '').lower()):
+        token = match.group(0)
+        if THAI_RUN_PATTERN.fullmatch(token):
+            if word_tokenize:
+                terms.extend([t] for t in _segment_thai(token))
+            else:
+                terms.append(_segment_thai(token))
+        else:
+            terms.append([token])
+    return terms
+
+def segment_text(text):
+    """ตัดคำแล้วคืนข้อความที่คั่นทุก token ด้วยช่องว่าง (สำหรับเก็บในดัชนี FTS5)"""
+    return ' '.join(token for term in segment_terms(text) for token in term)
+
+def build_match_query(text):
+    """สร้าง FTS5 MATCH query จากคำค้น (ทุกคำต้องพบ และคำสุดท้ายค้นแบบขึ้นต้นด้วย)"""
+    phrases = []
+    for term in segment_terms(text):
+        phrase = ' '.join(token.replace('"', '""') for token in term)
+        phrases.append(f'"{phrase}"')
+    if not phrases:
+        return None
+    phrases[-1] += '*'
+    return ' '.join(phrases)
@@ -1,20 +1,27 @@
 import streamlit as st
-import time
-from .data_utils import update_dataset
-import json
+import pandas as pd
+from .data_utils import get_dataset_rankings, update_rankings, get_dataset_files, get_dataset_file_urls
+from .jobs import submit_job
+from .db_utils import split_file_types
+from .file_utils import build_format_link_columns
+from .resource_preview import preview_resource, CSV_FORMATS, EXCEL_FORMATS
 
-def create_action_cell(row):
-    """สร้างปุ่มกดในตาราง"""
-    col1, col2 = st.columns([1, 2])
-    with col1:
-        st.markdown(f'<a href="{row["url"]}" target="_blank">🔗</a>', unsafe_allow_html=True)
-    with col2:
-        if st.button("Load", key=f"load_{row['package_id']}", help=f"อัพเดทข้อมูล"):
-            result = update_dataset(row['package_id'])
-            st.toast(result)
-            if "✅" in result:
-                time.sleep(1)
-                st.rerun()
+# ตัวเลือก ranking ที่แสดง -> ค่าที่เก็บในฐานข้อมูล
+RANKING_OPTIONS = {
+    "⭐⭐⭐⭐": 4,
+    "⭐⭐⭐": 3,
+    "⭐⭐": 2,
+    "⭐": 1,
+    "ไม่มี": 0
+}
+RANKING_LABELS = {value: label for label, value in RANKING_OPTIONS.items()}
+
+# จำนวนแถวที่แสดงพร้อมกันในตาราง (แถวที่เหลือเลื่อนดูได้โดยไม่ต้องสร้าง widget เพิ่ม)
+TABLE_VISIBLE_ROWS = 15
+TABLE_ROW_HEIGHT = 35
+
+# จำนวนแถวที่แสดงในตัวอย่างไฟล์
+PREVIEW_ROWS = 20
 
 def apply_custom_css():
     """ใส่ CSS สำหรับตกแต่งหน้าเว็บ"""
@@ -31,74 +38,174 @@ def apply_custom_css():
         background-color: rgba(0, 0, 0, 0.05);
         white-space: nowrap;
     }
-
+    
     /* ปรับแต่งลิงก์ */
     [data-testid="column"]:nth-child(4) a {
         text-decoration: none;
         color: inherit;
         transition: all 0.2s;
     }
-
+    
     [data-testid="column"]:nth-child(4) a:hover {
         background-color: rgba(0, 0, 0, 0.1);
     }
-
+    
     /* ปรับแต่งข้อความประเภทไฟล์ */
     .format-text {
         font-size: 0.9em;
         color: #666;
     }
-
+    
     /* ... rest of your CSS ... */
     </style>
     """, unsafe_allow_html=True)
 
-def create_ranking_selector(row):
-    """สร้าง dropdown สำหรับเลือก ranking"""
-    ranking_options = {
-        "⭐⭐⭐⭐": 4,
-        "⭐⭐⭐": 3,
-        "⭐⭐": 2,
-        "⭐": 1,
-        "ไม่มี": 0
-    }
+@st.fragment
+def create_dataset_table(df, key, show_organization=True):
+    """
+    แสดงรายการชุดข้อมูลทั้งหน้าเป็นตารางเดียว (st.data_editor ที่ render แบบ virtual scroll)
     
-    # อ่านค่า ranking ปัจจุบัน
-    current_ranking = 0
-    try:
-        with open('data/dataset_files.json', 'r', encoding='utf-8') as f:
-            all_files = json.load(f)
-            for file in all_files:
-                if file['dataset_id'] == row['package_id']:
-                    current_ranking = file.get('ranking', 0)
-                    break
-    except:
-        pass
+    แก้ไขได้เฉพาะคอลัมน์ ranking และ Load โดย Streamlit ส่งกลับมาเฉพาะเซลล์ที่เปลี่ยน
+    ไฟล์แต่ละประเภทแสดงเป็นคอลัมน์ลิงก์ดาวน์โหลด (ดึง URL ของทั้งหน้าด้วย query เดียว)
+    แทนการสร้าง selectbox และปุ่มแยกทุกแถว ตารางอยู่ใน fragment จึง rerun เฉพาะตาราง
+    (อ่าน ranking ล่าสุดจากฐานข้อมูล) ไม่ต้องรันทั้งหน้าใหม่
     
-    # แปลงค่า ranking เป็นตัวเลือก
-    current_option = next(
-        (k for k, v in ranking_options.items() if v == current_ranking),
-        "ไม่มี"
-    )
+    Args:
+        df (DataFrame): ชุดข้อมูลของหน้าที่แสดง (คอลัมน์ตามตาราง datasets)
+        key (str): key ของตาราง (ต้องไม่ซ้ำกันในหน้าเดียวกัน)
+        show_organization (bool): แสดงคอลัมน์หน่วยงานหรือไม่
+    """
+    df = df.reset_index(drop=True)
+    package_ids = df['package_id'].tolist()
+    rankings = get_dataset_rankings(package_ids)
+    format_columns, format_column_config = build_format_link_columns(package_ids, get_dataset_file_urls(package_ids))
     
-    # สร้าง dropdown
-    selected = st.selectbox(
-        "⭐",
-        options=list(ranking_options.keys()),
-        index=list(ranking_options.keys()).index(current_option),
-        label_visibility="collapsed",
-        key=f"rank_{row['package_id']}"
-    )
+    table = pd.DataFrame({
+        'title': df['title'],
+        'organization': df['organization'],
+        'resource_count': df['resource_count'],
+        'file_types': [split_file_types(v) if isinstance(v, str) else [] for v in df['file_types']],
+        **format_columns,
+        'last_updated': pd.to_datetime(df['last_updated'], errors='coerce', format='ISO8601'),
+        'ranking': [RANKING_LABELS.get(rankings.get(package_id) or 0, "ไม่มี") for package_id in package_ids],
+        'url': df['url'],
+        'load': False
+    })
+    if not show_organization:
+        table = table.drop(columns=['organization'])
     
-    # เมื่อมีการเปลี่ยนแปลง
-    if selected != current_option:
-        from .data_utils import update_dataset_ranking
-        if update_dataset_ranking(row['package_id'], ranking_options[selected]):
-            st.toast(f"✅ อัพเดท ranking เป็น {selected} สำเร็จ")
-            time.sleep(1)
-            st.rerun()
-        else:
+    # เปลี่ยน key หลังบันทึกการแก้ไขทุกครั้ง เพื่อเริ่มตารางใหม่จากข้อมูลล่าสุดในฐานข้อมูล
+    version = st.session_state.get(f"{key}_version", 0)
+    widget_key = f"{key}_{version}"
+    
+    st.data_editor(
+        table,
+        key=widget_key,
+        on_change=_apply_table_edits,
+        args=(key, widget_key, package_ids),
+        column_config={
+            'title': st.column_config.TextColumn("ชื่อชุดข้อมูล", width="large"),
+            'organization': st.column_config.TextColumn("หน่วยงาน", width="medium"),
+            'resource_count': st.column_config.NumberColumn("จำนวนทรัพยากร", width="small"),
+            'file_types': st.column_config.ListColumn("ประเภทไฟล์", width="medium"),
+            **format_column_config,
+            'last_updated': st.column_config.DateColumn("ปรับปรุงล่าสุด", format="YYYY-MM-DD", width="small"),
+            'ranking': st.column_config.SelectboxColumn(
+                "⭐",
+                options=list(RANKING_OPTIONS),
+                required=True,
+                width="small"
+            ),
+            'url': st.column_config.LinkColumn("ลิงก์", display_text="🔗", width="small"),
+            'load': st.column_config.CheckboxColumn("Load", help="อัพเดทข้อมูลจาก API", width="small")
+        },
+        disabled=[column for column in table.columns if column not in ('ranking', 'load')],
+        hide_index=True,
+        use_container_width=True,
+        num_rows="fixed",
+        height=(min(len(table), TABLE_VISIBLE_ROWS) + 1) * TABLE_ROW_HEIGHT + 3
+    )
+
+def _apply_table_edits(key, widget_key, package_ids):
+    """บันทึกเซลล์ที่แก้ไขในตารางชุดข้อมูล (เรียกจาก on_change ก่อน rerun)"""
+    edited_rows = st.session_state[widget_key]['edited_rows']
+    # รวมการแก้ ranking ทุกแถวเป็น transaction เดียว
+    edits = [
+        {'dataset_id': package_ids[int(row_index)], 'ranking': RANKING_OPTIONS[changes['ranking']]}
+        for row_index, changes in edited_rows.items()
+        if 'ranking' in changes
+    ]
+    if edits:
+        try:
+            update_rankings(edits)
+            if len(edits) == 1:
+                st.toast(f"✅ อัพเดท ranking เป็น {RANKING_LABELS[edits[0]['ranking']]} สำเร็จ")
+            else:
+                st.toast(f"✅ อัพเดท ranking {len(edits)} ชุดข้อมูลสำเร็จ")
+        except Exception as e:
+            print(f"Error updating rankings: {str(e)}")
             st.toast("❌ ไม่สามารถอัพเดท ranking ได้")
+    for row_index, changes in edited_rows.items():
+        if changes.get('load'):
+            _submit_refresh(package_ids[int(row_index)])
+    st.session_state[f"{key}_version"] = st.session_state.get(f"{key}_version", 0) + 1
+
+def _submit_refresh(package_id):
+    """ส่งงานอัพเดทข้อมูลชุดข้อมูลเข้าคิวงานเบื้องหลัง"""
+    job_id = submit_job('refresh_dataset', {'package_id': package_id})
+    st.toast(f"🕒 เพิ่มงานอัพเดทข้อมูล #{job_id} เข้าคิวแล้ว (ดูสถานะได้ที่หน้า Administrator)")
+
+@st.fragment
+def create_resource_preview(df, key):
+    """
+    แสดงตัวอย่างแถวแรก ๆ ของไฟล์ CSV/XLSX ของชุดข้อมูลในหน้าที่แสดง โดยไม่ต้องดาวน์โหลดทั้งไฟล์
+    
+    Args:
+        df (DataFrame): ชุดข้อมูลของหน้าที่แสดง (ต้องมีคอลัมน์ package_id และ title)
+        key (str): key ของ widget (ต้องไม่ซ้ำกันในหน้าเดียวกัน)
+    """
+    with st.expander("👀 ดูตัวอย่างข้อมูลในไฟล์"):
+        titles = dict(zip(df['package_id'], df['title']))
+        package_id = st.selectbox(
+            "ชุดข้อมูล",
+            options=list(titles),
+            format_func=lambda package_id: titles[package_id],
+            key=f"{key}_preview_dataset"
+        )
+        if package_id is None:
+            return
+        
+        files = [
+            f for f in get_dataset_files(package_id)
+            if f.get('url') and (f.get('format') or '').upper() in CSV_FORMATS | EXCEL_FORMATS
+        ]
+        if not files:
+            st.info("ชุดข้อมูลนี้ไม่มีไฟล์ CSV หรือ Excel ที่แสดงตัวอย่างได้")
+            return
+        
+        selected = st.selectbox(
+            "ไฟล์",
+            options=range(len(files)),
+            format_func=lambda i: f"{files[i]['file_name']} ({files[i]['format']})",
+            key=f"{key}_preview_file"
+        )
+        if not st.button("👀 แสดงตัวอย่าง", key=f"{key}_preview_button"):
+            return
+        
+        resource = files[selected]
+        try:
+            with st.spinner("กำลังอ่านตัวอย่างข้อมูล..."):
+                preview = preview_resource(resource['url'], resource['format'], rows=PREVIEW_ROWS)
+        except Exception as e:
+            st.error(f"ไม่สามารถแสดงตัวอย่างไฟล์ได้: {str(e)}")
+            return
+        
+        st.dataframe(preview['data'], hide_index=True, use_container_width=True)
+        details = [f"{len(preview['data'])} แถวแรก"]
+        if preview['encoding']:
+            details.append(f"encoding {preview['encoding']}")
+        details.append("ใช้ตัวอย่างที่เก็บไว้" if preview['from_cache'] else f"อ่านข้อมูล {preview['bytes_read'] / 1024:,.1f} KB")
+        st.caption(" | ".join(details))
 
 def toggle_theme():
     """สลับ theme ระหว่าง light และ dark"""
@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+# สถานะที่แสดงว่าเซิร์ฟเวอร์ไม่รองรับ HEAD (ให้ลองใหม่ด้วย GET แบบขอแค่ byte แรก)
+HEAD_FALLBACK_STATUSES = {400, 403, 405, 501}
+
+# requests.Session แยกตาม thread สำหรับตรวจสอบลิงก์
+_probe_local = threading.local()
+
+def get_probe_session(pool_size=4):
+    """ดึง requests.Session ของ thread ปัจจุบันสำหรับตรวจสอบลิงก์ (keep-alive)"""
+    session = getattr(_probe_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'User-Agent': 'data-go-th-catalog-link-checker',
+            'Accept-Encoding': 'identity'
+        })
+        _probe_local.session = session
+    return session
+
+def _content_length(response):
+    """อ่านขนาดไฟล์จาก Content-Range (ตอบแบบ 206) หรือ Content-Length"""
+    content_range = response.headers.get('Content-Range', '')
+    if '/' in content_range:
+        total = content_range.rsplit('/', 1)[1].strip()
+        if total.isdigit():
+            return int(total)
+    if response.status_code == 206:
+        return None
+    length = response.headers.get('Content-Length', '')
+    return int(length) if length.isdigit() else None
+
+def probe_url(url, etag=None, last_modified=None, timeout=10, session=None):
+    """
+    ตรวจสอบลิงก์หนึ่งรายการด้วย HEAD (หรือ GET เฉพาะ byte แรกถ้าเซิร์ฟเวอร์ไม่รองรับ HEAD)
+    
+    ถ้ามี ETag/Last-Modified จากการตรวจครั้งก่อนจะส่งเป็น conditional request
+    ซึ่งเซิร์ฟเวอร์จะตอบ 304 โดยไม่ส่งข้อมูลไฟล์เมื่อไฟล์ไม่เปลี่ยนแปลง
+    
+    Args:
+        url (str): URL ที่ต้องการตรวจสอบ
+        etag (str): ETag จากการตรวจครั้งก่อน
+        last_modified (str): Last-Modified จากการตรวจครั้งก่อน
+        timeout (float): เวลารอสูงสุดต่อ request (วินาที)
+        session (requests.Session): session ที่ใช้ (ค่าเริ่มต้นคือ session ของ thread)
+    
+    Returns:
+        dict: {'url', 'status_code', 'ok', 'latency_ms', 'content_length', 'content_type',
+               'etag', 'last_modified', 'error', 'method'}
+    """
+    session = session or get_probe_session()
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    
+    result = {
+        'url': url, 'status_code': None, 'ok': False, 'latency_ms': None,
+        'content_length': None, 'content_type': None, 'etag': None,
+        'last_modified': None, 'error': None, 'method': 'HEAD'
+    }
+    start = time.perf_counter()
+    try:
+        response = session.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+        if response.status_code in HEAD_FALLBACK_STATUSES:
+            # ขอแค่ byte แรกและไม่อ่าน body เพื่อให้ใช้ bandwidth น้อยที่สุด
+            result['method'] = 'GET'
+            response = session.get(
+                url,
+                headers={**headers, 'Range': 'bytes=0-0'},
+                timeout=timeout,
+                allow_redirects=True,
+                stream=True
+            )
+            response.close()
+    except requests.RequestException as e:
+        result['latency_ms'] = (time.perf_counter() - start) * 1000
+        result['error'] = f"{type(e).__name__}: {str(e)}"
+        return result
+    
+    result['latency_ms'] = (time.perf_counter() - start) * 1000
+    result['status_code'] = response.status_code
+    result['ok'] = response.status_code < 400
+    if response.status_code != 304:
+        result['content_length'] = _content_length(response)
+        result['content_type'] = response.headers.get('Content-Type')
+    result['etag'] = response.headers.get('ETag')
+    result['last_modified'] = response.headers.get('Last-Modified')
+    if not result['ok']:
+        result['error'] = f"HTTP {response.status_code}"
+    return result
+
+def _interleave_by_host(entries):
+    """เรียง URL สลับกันตาม host เพื่อให้ worker กระจายไปหลาย host แทนการรอคิว host เดียว"""
+    queues = defaultdict(deque)
+    for entry in entries:
+        queues[urlsplit(entry['url']).netloc.lower()].append(entry)
+    ordered = []
+    while queues:
+        for host in list(queues):
+            ordered.append(queues[host].popleft())
+            if not queues[host]:
+                del queues[host]
+    return ordered
+
+def probe_urls(entries, max_workers=16, per_host=4, timeout=10, progress_callback=None):
+    """
+    ตรวจสอบหลายลิงก์พร้อมกัน โดยจำกัดจำนวน request พร้อมกันต่อ host
+    
+    Args:
+        entries (list): [{'url', 'etag', 'last_modified'}, ...] (etag/last_modified ไม่บังคับ)
+        max_workers (int): จำนวน thread สูงสุดที่ตรวจสอบพร้อมกัน
+        per_host (int): จำนวน request พร้อมกันสูงสุดต่อ host
+        timeout (float): เวลารอสูงสุดต่อ request (วินาที)
+        progress_callback (callable): เรียกด้วย (ผลตรวจสอบ, จำนวนที่เสร็จ, จำนวนทั้งหมด) ทุกครั้งที่ตรวจเสร็จหนึ่งรายการ
+    
+    Returns:
+        list: ผลตรวจสอบของแต่ละลิงก์ (รูปแบบเดียวกับ probe_url)
+    """
+    entries = _interleave_by_host(entries)
+    total = len(entries)
+    host_limits = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+    host_limits_lock = threading.Lock()
+    
+    def probe(entry):
+        host = urlsplit(entry['url']).netloc.lower()
+        with host_limits_lock:
+            limit = host_limits[host]
+        with limit:
+            return probe_url(
+                entry['url'],
+                etag=entry.get('etag'),
+                last_modified=entry.get('last_modified'),
+                timeout=timeout,
+                session=get_probe_session(per_host)
+            )
+    
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='probe') as executor:
+        futures = [executor.submit(probe, entry) for entry in entries]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+            if progress_callback:
+                progress_callback(result, done, total)
+    return results